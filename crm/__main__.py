@@ -1,33 +1,85 @@
-"""Module contenant le point d'entrée principal de l'application."""
+"""Module contenant le point d'entrée principal de l'application.
+Sans argument, l'interface graphique est lancée. Suivi d'une commande (voir crm.cli),
+l'application s'exécute en ligne de commande sans importer PySide6.
+Avec --profile-startup, la durée de chaque étape du démarrage est affichée
+jusqu'au premier affichage de la fenêtre, puis l'application se ferme :
+le code de retour vaut 1 si le budget de démarrage est dépassé.
+Avec --profile-theme, la durée de chaque changement de thème est affichée."""
 
 import sys
 
-from PySide6.QtGui import QIcon, QPixmap
-from PySide6.QtWidgets import QApplication
+from crm.startup import startup_profile
+from crm.cli import COMMANDS, main as cli_main
 
-from crm.database.client import init_database_structure, init_database_tag
-from crm.window.main_window import Crm
-from crm.api.utils import RESOURCE_DIR, get_theme_application, DATA_FILE
+GUI_OPTIONS = ("--profile-startup", "--profile-theme")
 
 
 def check_start():
-    """Vérifie la présence d'une base de données.
-    La crée et lui insére des données par défauts si elle n'existe pas."""
-    if not DATA_FILE.exists():
-        init_database_structure()
-        init_database_tag()
+    """Vérifie la présence du fichier de paramétrage et d'une base de données.
+    Les crée avec les données par défaut s'ils n'existent pas.
+    Applique ensuite les migrations de schéma manquantes et élague le journal des modifications."""
+    from crm.api.utils import settings
+    from crm.database.migrations import check_database
+    from crm.database.watcher import prune_change_journal
+
+    settings.ensure_file()
+
+    for migration, duration in check_database():
+        print(f"Migration {migration.version} ({migration.description}) appliquée en {duration * 1000:.1f} ms")
+    prune_change_journal()
 
 
 def main():
     """Point d'entrée de l'application."""
+    args = sys.argv[1:]
+    if args and args[0] not in GUI_OPTIONS and (args[0] in COMMANDS or args[0].startswith("-")):
+        sys.exit(cli_main(args))
+
+    if "--profile-startup" in args:
+        startup_profile.enable()
+
+    from PySide6.QtCore import QEvent, QObject, QTimer
+    from PySide6.QtGui import QIcon, QPixmap
+    from PySide6.QtWidgets import QApplication
+    startup_profile.mark("Import de PySide6")
+
+    from crm.api.utils import RESOURCE_DIR
+    from crm.window.main_window import Crm
+    from crm.window.theme import theme_engine
+    startup_profile.mark("Import de la fenêtre principale")
+
     check_start()
+    startup_profile.mark("Vérification de la base de données")
 
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon(QPixmap(RESOURCE_DIR / "book_address.ico")))
-    app.setStyleSheet(get_theme_application())
+    theme_engine.apply(app, theme_engine.saved_theme())
+    startup_profile.mark("Création de QApplication et du thème")
+
     window = Crm(app)
+
+    if "--profile-theme" in args:
+        theme_engine.on_switch = lambda theme, apply_duration, total_duration: print(
+            f"Thème {theme} : appliqué en {apply_duration * 1000:.1f} ms, "
+            f"affiché en {total_duration * 1000:.1f} ms", file=sys.stderr)
+    # L'autre feuille de style est préparée une fois la fenêtre affichée
+    QTimer.singleShot(0, theme_engine.preload)
+
+    class FirstPaint(QObject):
+        """Clôt le chronométrage au premier affichage de la fenêtre."""
+        def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+            if event.type() == QEvent.Paint:
+                window.removeEventFilter(self)
+                startup_profile.mark("Premier affichage")
+                status = 0 if startup_profile.report() else 1
+                QTimer.singleShot(0, lambda: app.exit(status))
+            return False
+
+    if startup_profile.enabled:
+        first_paint = FirstPaint(window)
+        window.installEventFilter(first_paint)
     window.show()
-    app.exec()
+    sys.exit(app.exec())
 
 
 if __name__ == '__main__':
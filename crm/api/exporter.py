@@ -0,0 +1,175 @@
+"""Module d'export des contacts (CSV, vCard, JSON Lines).
+Les contacts sont lus par une seule requête et écrits au fil de la lecture :
+la mémoire utilisée ne dépend pas du nombre de contacts."""
+
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple, TextIO
+
+from crm.api.importer import NO_BIRTHDAY
+from crm.database.client import ContactBundle, count_contacts, get_tags_by_category, iter_contact_bundles, \
+    read_snapshot
+
+# Nombre de contacts écrits entre deux signalements de progression
+PROGRESS_INTERVAL = 1_000
+
+FILE_FORMATS = {".csv": "csv", ".vcf": "vcard", ".vcard": "vcard", ".jsonl": "jsonl"}
+
+# Types vCard des tags par défaut, inverses de importer.VCARD_TAGS
+VCARD_TYPES = {
+    "phone": {"Travail": "work", "Personnel": "cell"},
+    "mail": {"Travail": "work", "Personnel": "home"},
+    "address": {"Travail": "work", "Domicile": "home"},
+}
+
+# Longueur maximale d'une ligne vCard avant repli
+VCARD_LINE_LENGTH = 75
+
+
+class ExportReport(NamedTuple):
+    """Avancement d'un export : contacts écrits, part des contacts traitée (entre 0 et 1)
+    et interruption éventuelle par l'utilisateur."""
+    contacts: int = 0
+    progress: float = 0.0
+    cancelled: bool = False
+
+
+def birthday(bundle: ContactBundle) -> str:
+    return "" if bundle.birthday in (None, NO_BIRTHDAY) else bundle.birthday
+
+
+#############
+#    CSV    #
+#############
+
+def write_csv(bundles: Iterable[ContactBundle], stream: TextIO) -> Iterable[ContactBundle]:
+    """Écrit les contacts dans les colonnes lues par importer.read_csv :
+    une colonne par tag pour les numéros, mails et adresses (ex : 'phone:Travail'),
+    plusieurs valeurs d'une même cellule étant séparées par un retour à la ligne.
+    Les colonnes sont lues en base : appelée dans la transaction qui lit bundles (voir export_file),
+    elles couvrent tous les tags des contacts. Un tag sans colonne lève une ValueError."""
+    tags = get_tags_by_category()
+    columns = [(category, tag) for category in ("phone", "mail", "address") for tag in tags.get(category, [])]
+    writer = csv.writer(stream)
+    writer.writerow(["firstname", "lastname", "birthday", "company", "job", "groups"]
+                    + [f"{category}:{tag}" for category, tag in columns])
+    for bundle in bundles:
+        cells = {column: [] for column in columns}
+        for category, values in (("phone", bundle.phones), ("mail", bundle.mails), ("address", bundle.addresses)):
+            for _, tag, value in values:
+                if (category, tag) not in cells:
+                    raise ValueError(f"Tag {category}:{tag} absent des colonnes du fichier")
+                cells[category, tag].append(value)
+        writer.writerow([bundle.firstname, bundle.lastname, birthday(bundle), bundle.company, bundle.job,
+                         ", ".join(bundle.groups)]
+                        + ["\n".join(cells[column]) for column in columns])
+        yield bundle
+
+
+#############
+#   VCARD   #
+#############
+
+def escape(value: str) -> str:
+    return (value or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def fold(line: str) -> str:
+    """Replie une ligne vCard trop longue : les lignes suivantes commencent par un espace."""
+    parts = [line[i:i + VCARD_LINE_LENGTH] for i in range(0, len(line), VCARD_LINE_LENGTH)] or [""]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def vcard_property(name: str, category: str, tag: str) -> str:
+    type_ = VCARD_TYPES[category].get(tag)
+    return f"{name};TYPE={type_}" if type_ else name
+
+
+def write_vcard(bundles: Iterable[ContactBundle], stream: TextIO) -> Iterable[ContactBundle]:
+    """Écrit une vCard 3.0 par contact."""
+    for bundle in bundles:
+        lines = ["BEGIN:VCARD",
+                 "VERSION:3.0",
+                 f"N:{escape(bundle.lastname)};{escape(bundle.firstname)};;;",
+                 f"FN:{escape(' '.join(name for name in (bundle.firstname, bundle.lastname) if name))}"]
+        if birthday(bundle):
+            lines.append(f"BDAY:{birthday(bundle)}")
+        if bundle.company:
+            lines.append(f"ORG:{escape(bundle.company)}")
+        if bundle.job:
+            lines.append(f"TITLE:{escape(bundle.job)}")
+        lines += [f"{vcard_property('TEL', 'phone', tag)}:{escape(number)}" for _, tag, number in bundle.phones]
+        lines += [f"{vcard_property('EMAIL', 'mail', tag)}:{escape(mail)}" for _, tag, mail in bundle.mails]
+        lines += [f"{vcard_property('ADR', 'address', tag)}:;;{escape(address)};;;;"
+                  for _, tag, address in bundle.addresses]
+        if bundle.groups:
+            lines.append(f"CATEGORIES:{','.join(escape(group) for group in bundle.groups)}")
+        lines.append("END:VCARD")
+        stream.write("".join(fold(line) for line in lines))
+        yield bundle
+
+
+#############
+#   JSONL   #
+#############
+
+def write_jsonl(bundles: Iterable[ContactBundle], stream: TextIO) -> Iterable[ContactBundle]:
+    """Écrit un objet JSON par ligne et par contact."""
+    for bundle in bundles:
+        contact = {
+            "id": bundle.id,
+            "firstname": bundle.firstname,
+            "lastname": bundle.lastname,
+            "birthday": birthday(bundle) or None,
+            "company": bundle.company,
+            "job": bundle.job,
+            "groups": list(bundle.groups),
+            "phones": [{"tag": tag, "number": number} for _, tag, number in bundle.phones],
+            "mails": [{"tag": tag, "mail": mail} for _, tag, mail in bundle.mails],
+            "addresses": [{"tag": tag, "address": address} for _, tag, address in bundle.addresses],
+        }
+        stream.write(json.dumps(contact, ensure_ascii=False) + "\n")
+        yield bundle
+
+
+WRITERS = {"csv": write_csv, "vcard": write_vcard, "jsonl": write_jsonl}
+
+
+#############
+#  EXPORT   #
+#############
+
+def export_file(path: Path,
+                file_format: str = None,
+                progress: Callable[[ExportReport], None] = None,
+                cancelled: Callable[[], bool] = None) -> ExportReport:
+    """Exporte tous les contacts dans un fichier CSV, vCard ou JSON Lines,
+    le format étant déduit de l'extension à défaut d'être précisé.
+    Le fichier est écrit à côté puis renommé une fois complet : un export annulé
+    ou interrompu ne laisse pas de fichier partiel.
+    Les contacts sont lus dans une seule transaction : l'export reflète un seul état de la base."""
+    path = Path(path)
+    file_format = file_format or FILE_FORMATS.get(path.suffix.lower())
+    if file_format not in WRITERS:
+        raise ValueError(f"Format de fichier non pris en charge : {file_format or path.suffix}")
+
+    written = 0
+    partial_path = path.with_name(path.name + ".part")
+    try:
+        with read_snapshot(), open(partial_path, "w", encoding="utf-8", newline="") as f:
+            total = count_contacts() or 1
+            for _ in WRITERS[file_format](iter_contact_bundles(), f):
+                written += 1
+                if written % PROGRESS_INTERVAL:
+                    continue
+                report = ExportReport(contacts=written, progress=min(written / total, 1.0))
+                if cancelled and cancelled():
+                    return report._replace(cancelled=True)
+                if progress:
+                    progress(report)
+        os.replace(partial_path, path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+    return ExportReport(contacts=written, progress=1.0)
@@ -0,0 +1,341 @@
+"""Module d'import de carnets d'adresses (CSV, vCard 3 et 4).
+Les fichiers sont lus ligne à ligne et les contacts insérés par lots validés un à un :
+la mémoire utilisée ne dépend pas de la taille du fichier."""
+
+import csv
+import re
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, TextIO
+
+from unidecode import unidecode
+
+from crm.api.utils import DEFAULT_TAGS
+from crm.database.cache import tag_cache
+from crm.database.client import add_tag, add_contacts_bulk, add_phones_bulk, add_mails_bulk, add_addresses_bulk, \
+    add_tag_groups_bulk, paused_search_index
+
+# Nombre de contacts insérés par transaction
+CHUNK_SIZE = 1_000
+
+# Date enregistrée par la fenêtre de saisie lorsqu'aucune date de naissance n'est renseignée
+NO_BIRTHDAY = "1899-12-31"
+
+CATEGORIES = ("group", "phone", "mail", "address")
+
+# Tag attribué aux numéros, mails et adresses importés sans tag : le premier tag par défaut de la catégorie
+DEFAULT_TAG = {tag["category"]: tag["tag"] for tag in reversed(DEFAULT_TAGS)}
+
+# Correspondance entre les types vCard (TYPE=work, ...) et les tags par défaut de chaque catégorie
+VCARD_TAGS = {
+    "phone": {"work": "Travail", "home": "Personnel", "cell": "Personnel"},
+    "mail": {"work": "Travail", "home": "Personnel"},
+    "address": {"work": "Travail", "home": "Domicile"},
+}
+
+# Colonnes CSV reconnues pour chaque champ d'un contact (comparées sans accent ni majuscule)
+CSV_FIELDS = {
+    "firstname": ("firstname", "prenom"),
+    "lastname": ("lastname", "nom"),
+    "birthday": ("birthday", "date de naissance"),
+    "company": ("company", "entreprise"),
+    "job": ("job", "poste"),
+    "groups": ("groups", "groupes"),
+    "phone": ("phone", "telephone"),
+    "mail": ("mail", "email"),
+    "address": ("address", "adresse"),
+}
+
+FILE_FORMATS = {".csv": "csv", ".vcf": "vcard", ".vcard": "vcard"}
+
+
+class ContactRecord(NamedTuple):
+    """Contact lu dans un fichier. Les numéros, mails et adresses sont des couples (tag, valeur),
+    le tag valant None s'il n'est pas précisé."""
+    firstname: str = ""
+    lastname: str = ""
+    birthday: str = NO_BIRTHDAY
+    company: str = ""
+    job: str = ""
+    phones: tuple[tuple[str | None, str], ...] = ()
+    mails: tuple[tuple[str | None, str], ...] = ()
+    addresses: tuple[tuple[str | None, str], ...] = ()
+    groups: tuple[str, ...] = ()
+
+
+class ImportReport(NamedTuple):
+    """Avancement d'un import : contacts insérés, tags créés, part du fichier lue (entre 0 et 1)
+    et interruption éventuelle par l'utilisateur."""
+    contacts: int = 0
+    tags: int = 0
+    progress: float = 0.0
+    cancelled: bool = False
+
+
+def normalize(text: str) -> str:
+    """Forme d'un texte utilisée pour les comparaisons (sans accent, en minuscules)."""
+    return unidecode(text).strip().lower()
+
+
+def parse_birthday(value: str) -> str:
+    """Retourne la date au format de la base (AAAA-MM-JJ), ou NO_BIRTHDAY si elle n'est pas reconnue."""
+    value = value.strip()
+    for pattern, length in (("%Y-%m-%d", 10), ("%d/%m/%Y", 10), ("%Y%m%d", 8)):
+        try:
+            return datetime.strptime(value[:length], pattern).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return NO_BIRTHDAY
+
+
+def split_values(cell: str) -> list[str]:
+    """Valeurs d'une cellule CSV, une par ligne."""
+    return [value.strip() for value in cell.splitlines() if value.strip()]
+
+
+#############
+#    CSV    #
+#############
+
+def read_csv(stream: TextIO) -> Iterator[ContactRecord]:
+    """Lit un fichier CSV dont la première ligne contient le nom des colonnes.
+    Les colonnes phone, mail et address peuvent préciser un tag (ex : 'phone:Travail').
+    Une cellule peut contenir plusieurs valeurs, une par ligne, et la colonne groups
+    plusieurs groupes séparés par des virgules."""
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(stream, dialect)
+
+    header = next(reader, None)
+    if header is None:
+        return
+    aliases = {alias: field for field, names in CSV_FIELDS.items() for alias in names}
+    columns = []
+    for name in header:
+        field, _, tag = name.partition(":")
+        columns.append((aliases.get(normalize(field)), tag.strip() or None))
+
+    for row in reader:
+        values = {"phone": [], "mail": [], "address": [], "groups": []}
+        for (field, tag), cell in zip(columns, row):
+            if field is None or not cell.strip():
+                continue
+            if field in ("phone", "mail", "address"):
+                values[field] += [(tag, value) for value in split_values(cell)]
+            elif field == "groups":
+                values[field] += [group.strip() for group in re.split(r"[,\n]", cell) if group.strip()]
+            else:
+                values[field] = cell.strip()
+        if not any(values.values()):
+            continue
+        yield ContactRecord(firstname=values.get("firstname", ""),
+                            lastname=values.get("lastname", ""),
+                            birthday=parse_birthday(values.get("birthday", "")),
+                            company=values.get("company", ""),
+                            job=values.get("job", ""),
+                            phones=tuple(values["phone"]),
+                            mails=tuple(values["mail"]),
+                            addresses=tuple(values["address"]),
+                            groups=tuple(values["groups"]))
+
+
+#############
+#   VCARD   #
+#############
+
+def unfold(stream: TextIO) -> Iterator[str]:
+    """Lignes logiques d'un fichier vCard : une ligne commençant par un espace
+    ou une tabulation prolonge la précédente."""
+    current = None
+    for line in stream:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def split_escaped(value: str, separator: str | None) -> list[str]:
+    """Découpe une valeur vCard sur les séparateurs non échappés puis retire les échappements."""
+    parts, current, chars = [], [], iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            current.append("\n" if escaped in ("n", "N") else escaped)
+        elif char == separator:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def unescape(value: str) -> str:
+    return split_escaped(value, None)[0].strip()
+
+
+def parse_property(line: str) -> tuple[str, set[str], str]:
+    """Retourne le nom, les types (paramètre TYPE) et la valeur brute d'une ligne vCard."""
+    name, _, value = line.partition(":")
+    name, *params = name.split(";")
+    types = set()
+    for param in params:
+        key, sep, param_value = param.partition("=")
+        if not sep:
+            # Forme abrégée de vCard 2.1 : TEL;WORK:...
+            key, param_value = "TYPE", key
+        if key.upper() == "TYPE":
+            types.update(t.strip('"').lower() for t in param_value.split(","))
+    # Préfixe de regroupement éventuel : item1.TEL
+    return name.rpartition(".")[2].upper(), types, value
+
+
+def vcard_tag(category: str, types: set[str]) -> str | None:
+    for type_ in sorted(types):
+        if tag := VCARD_TAGS[category].get(type_):
+            return tag
+    return None
+
+
+def read_vcard(stream: TextIO) -> Iterator[ContactRecord]:
+    """Lit un fichier contenant une ou plusieurs vCard (versions 3 et 4)."""
+    card = None
+    for line in unfold(stream):
+        if not line.strip():
+            continue
+        name, types, value = parse_property(line)
+        if name == "BEGIN" and value.upper() == "VCARD":
+            card = {"phones": [], "mails": [], "addresses": [], "groups": []}
+        elif card is None:
+            continue
+        elif name == "END":
+            if not card.get("firstname") and not card.get("lastname") and "fn" in card:
+                card["firstname"], _, card["lastname"] = card["fn"].partition(" ")
+            card.pop("fn", None)
+            yield ContactRecord(**{key: tuple(value) if isinstance(value, list) else value
+                                   for key, value in card.items()})
+            card = None
+        elif name == "N":
+            lastname, firstname, *_ = split_escaped(value, ";") + [""]
+            card["lastname"], card["firstname"] = lastname.strip(), firstname.strip()
+        elif name == "FN":
+            card["fn"] = unescape(value)
+        elif name == "BDAY":
+            card["birthday"] = parse_birthday(value)
+        elif name == "ORG":
+            card["company"] = split_escaped(value, ";")[0].strip()
+        elif name == "TITLE":
+            card["job"] = unescape(value)
+        elif name == "TEL":
+            number = value.removeprefix("tel:").strip()
+            if number:
+                card["phones"].append((vcard_tag("phone", types), number))
+        elif name == "EMAIL":
+            mail = unescape(value)
+            if mail:
+                card["mails"].append((vcard_tag("mail", types), mail))
+        elif name == "ADR":
+            _, extended, street, city, region, code, country, *_ = split_escaped(value, ";") + [""] * 7
+            address = " ".join(part.strip() for part in (street, extended, code, city, region, country)
+                               if part.strip())
+            if address:
+                card["addresses"].append((vcard_tag("address", types), address))
+        elif name == "CATEGORIES":
+            card["groups"] += [group.strip() for group in split_escaped(value, ",") if group.strip()]
+
+
+#############
+#  IMPORT   #
+#############
+
+class TagResolver:
+    """Associe le nom d'un tag à son id dans une catégorie et crée les tags manquants.
+    Les noms sont comparés sans accent ni majuscule, comme dans la fenêtre de saisie des tags."""
+    def __init__(self):
+        self.created = 0
+        self.tags: dict[tuple[str, str], int] = {}
+        for category in CATEGORIES:
+            for id_tag, tag in tag_cache.category(category):
+                self.tags.setdefault((category, normalize(tag)), id_tag)
+
+    def resolve(self, category: str, tag: str | None) -> int:
+        tag = tag or DEFAULT_TAG[category]
+        key = (category, normalize(tag))
+        if key not in self.tags:
+            self.tags[key] = add_tag(tag=tag, category=category)
+            self.created += 1
+        return self.tags[key]
+
+
+def insert_records(records: list[ContactRecord], tags: TagResolver, touched: set[int]):
+    """Insertion d'un lot de contacts avec leurs numéros, mails, adresses et groupes."""
+    ids = add_contacts_bulk({"firstname": record.firstname.capitalize(),
+                             "lastname": record.lastname.upper(),
+                             "birthday": record.birthday,
+                             "company": record.company,
+                             "job": record.job} for record in records)
+    touched.update(ids)
+    add_phones_bulk({"number": number, "contact_id": id_contact, "tag_id": tags.resolve("phone", tag)}
+                    for id_contact, record in zip(ids, records) for tag, number in record.phones)
+    add_mails_bulk({"mail": mail, "contact_id": id_contact, "tag_id": tags.resolve("mail", tag)}
+                   for id_contact, record in zip(ids, records) for tag, mail in record.mails)
+    add_addresses_bulk({"address": address, "contact_id": id_contact, "tag_id": tags.resolve("address", tag)}
+                       for id_contact, record in zip(ids, records) for tag, address in record.addresses)
+    add_tag_groups_bulk({"contact_id": id_contact, "tag_id": id_tag}
+                        for id_contact, record in zip(ids, records)
+                        for id_tag in dict.fromkeys(tags.resolve("group", group) for group in record.groups))
+
+
+def import_contacts(records: Iterable[ContactRecord],
+                    chunk_size: int = CHUNK_SIZE,
+                    progress: Callable[[ImportReport], None] = None,
+                    cancelled: Callable[[], bool] = None,
+                    position: Callable[[], float] = None) -> ImportReport:
+    """Insère les contacts par lots de chunk_size, chacun dans sa propre transaction.
+    progress est appelé après chaque lot validé, position retournant la part des données lue.
+    Si cancelled retourne vrai, l'import s'arrête avant le lot suivant : les lots déjà
+    validés sont conservés."""
+    records = iter(records)
+    tags = TagResolver()
+    report = ImportReport()
+    while chunk := list(islice(records, chunk_size)):
+        if cancelled and cancelled():
+            return report._replace(cancelled=True)
+        with paused_search_index() as touched:
+            insert_records(chunk, tags, touched)
+        report = ImportReport(contacts=report.contacts + len(chunk),
+                              tags=tags.created,
+                              progress=position() if position else 0.0)
+        if progress:
+            progress(report)
+    return report._replace(progress=1.0)
+
+
+def import_file(path: Path,
+                chunk_size: int = CHUNK_SIZE,
+                progress: Callable[[ImportReport], None] = None,
+                cancelled: Callable[[], bool] = None) -> ImportReport:
+    """Importe un fichier CSV (.csv) ou vCard (.vcf, .vcard)."""
+    path = Path(path)
+    file_format = FILE_FORMATS.get(path.suffix.lower())
+    if file_format is None:
+        raise ValueError(f"Format de fichier non pris en charge : {path.suffix}")
+
+    size = path.stat().st_size or 1
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        records = read_csv(f) if file_format == "csv" else read_vcard(f)
+        return import_contacts(records,
+                               chunk_size,
+                               progress,
+                               cancelled,
+                               position=lambda: min(f.buffer.tell() / size, 1.0))
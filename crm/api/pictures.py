@@ -0,0 +1,70 @@
+"""Module d'enregistrement des photos de profil.
+Chaque photo est décodée une seule fois puis conservée sous forme de miniatures carrées
+de tailles fixes, sans métadonnées, nommées d'après le contenu du fichier d'origine :
+une même photo importée plusieurs fois n'est stockée qu'une fois.
+PIL n'est importé qu'à l'enregistrement d'une nouvelle photo."""
+
+import hashlib
+import io
+import os
+import re
+from pathlib import Path
+
+from crm.api.utils import RESOURCE_DIR
+
+PICTURES_DIR = RESOURCE_DIR / "pictures"
+THUMBNAIL_SIZES = (64, 128, 256)
+DEFAULT_PICTURE = "pp_00000.png"
+JPEG_QUALITY = 85
+
+# Valeur de contact.profile_picture désignant un jeu de miniatures : empreinte SHA-256 et extension
+PICTURE_KEY = re.compile(r"^[0-9a-f]{64}\.(jpg|png)$")
+
+
+def picture_path(profile_picture: str, size: int = 128) -> Path:
+    """Retourne le fichier à afficher pour la valeur de contact.profile_picture.
+    Les photos enregistrées avant les miniatures (ex : 'pp_00012.png') sont lues dans RESOURCE_DIR."""
+    if PICTURE_KEY.match(profile_picture):
+        key, extension = profile_picture.split(".")
+        size = min(THUMBNAIL_SIZES, key=lambda thumbnail_size: (thumbnail_size < size, abs(thumbnail_size - size)))
+        return PICTURES_DIR / key[:2] / f"{key}_{size}.{extension}"
+    return RESOURCE_DIR / profile_picture
+
+
+def ingest_picture(source: Path) -> str:
+    """Enregistre les miniatures de l'image source si elles n'existent pas déjà.
+    Retourne la valeur à enregistrer dans contact.profile_picture."""
+    data = Path(source).read_bytes()
+    key = hashlib.sha256(data).hexdigest()
+    for extension in ("jpg", "png"):
+        if all(picture_path(f"{key}.{extension}", size).exists() for size in THUMBNAIL_SIZES):
+            return f"{key}.{extension}"
+
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Décodage JPEG directement à une résolution réduite, proche de la plus grande miniature
+        image.draft("RGB", (max(THUMBNAIL_SIZES),) * 2)
+        image = ImageOps.exif_transpose(image)
+        transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if transparent else "RGB")
+    # Les métadonnées (EXIF, profil de couleur, ...) ne sont pas recopiées
+    image.info = {}
+    extension = "png" if transparent else "jpg"
+    name = f"{key}.{extension}"
+
+    for size in sorted(THUMBNAIL_SIZES, reverse=True):
+        # Chaque miniature est calculée à partir de la précédente, plus grande
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        destination = picture_path(name, size)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        if transparent:
+            image.save(buffer, "PNG", optimize=True)
+        else:
+            image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        # Écriture puis renommage : une miniature n'est jamais lue incomplète
+        partial_path = destination.with_name(destination.name + ".part")
+        partial_path.write_bytes(buffer.getvalue())
+        os.replace(partial_path, destination)
+    return name
@@ -0,0 +1,163 @@
+"""Module contenant le service de paramétrage : settings.json est lu une seule fois
+puis servi depuis la mémoire, et enregistré de manière atomique."""
+
+import copy
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from time import monotonic
+from typing import Any
+
+# Délai regroupant les modifications successives en un seul enregistrement (secondes)
+SAVE_DELAY = 0.5
+# Intervalle minimal entre deux vérifications d'une modification extérieure du fichier (secondes)
+CHECK_INTERVAL = 1.0
+
+
+def merge_defaults(data: dict, defaults: dict) -> bool:
+    """Complète data, récursivement, des clés de defaults qui y manquent.
+    Retourne True si une clé a été ajoutée."""
+    merged = False
+    for key, value in defaults.items():
+        if key not in data:
+            data[key] = copy.deepcopy(value)
+            merged = True
+        elif isinstance(value, dict) and isinstance(data[key], dict):
+            merged = merge_defaults(data[key], value) or merged
+    return merged
+
+
+class SettingsService:
+    """Paramétrage conservé en mémoire.
+    Les modifications sont enregistrées après SAVE_DELAY secondes sans nouvelle modification,
+    et au plus tard à la fermeture de l'application. Le fichier est écrit à côté puis renommé :
+    une interruption pendant l'écriture ne le corrompt pas. Une modification du fichier par
+    un autre programme est détectée par sa date de modification et rechargée."""
+    def __init__(self, path: Path, defaults: dict, save_delay: float = SAVE_DELAY):
+        self.path = Path(path)
+        self.defaults = defaults
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._data: dict | None = None
+        self._pending: dict = {}
+        self._mtime: int | None = None
+        self._checked = 0.0
+        # Le fichier lu ne contenait pas toutes les clés du paramétrage par défaut
+        self._incomplete = False
+        self._timer: threading.Timer | None = None
+        self.metrics = {"loads": 0, "writes": 0, "external_reloads": 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return copy.deepcopy(self._current().get(key, default))
+
+    def all(self) -> dict:
+        """Retourne une copie de l'ensemble du paramétrage."""
+        with self._lock:
+            return copy.deepcopy(self._current())
+
+    def set(self, key: str, value: Any):
+        """Modifie un paramètre. L'enregistrement est différé (voir SAVE_DELAY)."""
+        self.update({key: value})
+
+    def update(self, values: dict):
+        with self._lock:
+            self._current().update(copy.deepcopy(values))
+            self._pending.update(copy.deepcopy(values))
+            self._schedule()
+
+    def replace(self, content: dict):
+        """Remplace l'ensemble du paramétrage et l'enregistre immédiatement."""
+        with self._lock:
+            self._current()
+            self._data = copy.deepcopy(content)
+            self._pending = copy.deepcopy(content)
+            self.flush()
+
+    def flush(self):
+        """Enregistre immédiatement les modifications en attente."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            self._check_external_change()
+            self._write(self._data)
+            self._pending.clear()
+
+    def ensure_file(self):
+        """Crée le fichier avec le paramétrage par défaut s'il n'existe pas,
+        ou le complète des paramètres par défaut qui y manquent."""
+        with self._lock:
+            self._current()
+            if not self.path.exists() or self._incomplete:
+                self._write(self._data)
+                self._incomplete = False
+
+    def _current(self) -> dict:
+        if self._data is None:
+            self._load()
+        elif monotonic() - self._checked >= CHECK_INTERVAL:
+            self._check_external_change()
+        return self._data
+
+    def _load(self):
+        data = None
+        try:
+            self._mtime = self.path.stat().st_mtime_ns
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self._mtime = None
+        except (OSError, ValueError):
+            pass
+        if isinstance(data, dict):
+            # Les paramètres absents du fichier, y compris dans une section (ex : storage), gardent leur défaut
+            self._incomplete = merge_defaults(data, self.defaults)
+        else:
+            # Fichier absent ou illisible : le paramétrage par défaut sera réenregistré à la prochaine modification
+            data = copy.deepcopy(self.defaults)
+            self._incomplete = False
+        self._data = data
+        self._checked = monotonic()
+        self.metrics["loads"] += 1
+
+    def _check_external_change(self):
+        """Recharge le fichier s'il a été modifié par un autre programme.
+        Les modifications en attente d'enregistrement sont conservées."""
+        self._checked = monotonic()
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        self._load()
+        self._data.update(copy.deepcopy(self._pending))
+        self.metrics["external_reloads"] += 1
+
+    def _schedule(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.save_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _write(self, content: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, partial_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".part")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(content, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial_path, self.path)
+        except BaseException:
+            Path(partial_path).unlink(missing_ok=True)
+            raise
+        self._mtime = self.path.stat().st_mtime_ns
+        self.metrics["writes"] += 1
+
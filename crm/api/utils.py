@@ -1,9 +1,11 @@
 """Module qui gère le paramétrage de l'application : chemins, settings.json et fonctions de validations"""
 
+import atexit
 import re
 from pathlib import Path
 from datetime import datetime
-import json
+
+from crm.api.settings import SettingsService
 
 CUR_FILE = Path(__file__)
 BASE_DIR = CUR_FILE.parent.parent.parent
@@ -11,10 +13,33 @@ DATA_FILE = BASE_DIR / "db.sqlite3"
 SETTINGS_FILE = BASE_DIR / "settings.json"
 RESOURCE_DIR = BASE_DIR / "resource"
 
+# Paramètrage SQLite appliqué à chaque connexion (voir crm.database.connection.storage_pragmas)
+DEFAULT_STORAGE = {
+    # WAL : les lectures ne bloquent pas l'écriture et inversement
+    "journal_mode": "WAL",
+    # En WAL, NORMAL ne synchronise le disque qu'aux checkpoints, sans risque de corruption
+    "synchronous": "NORMAL",
+    # Taille du cache de pages : négative en Kio, positive en pages
+    "cache_size": -16000,
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    # Attente maximale d'un verrou détenu par une autre connexion avant l'erreur 'database is locked'
+    "busy_timeout_ms": 5000,
+    # Checkpoint PASSIVE automatique dès que le journal dépasse ce nombre de pages
+    "wal_autocheckpoint": 1000,
+    # Taille à laquelle le journal est ramené après un checkpoint
+    "journal_size_limit": 16 * 1024 * 1024,
+}
+
 DEFAULT_SETTINGS = {
-    "theme": "dark"
+    "theme": "dark",
+    "storage": DEFAULT_STORAGE,
 }
 
+# Paramétrage lu une seule fois puis servi depuis la mémoire
+settings = SettingsService(SETTINGS_FILE, DEFAULT_SETTINGS)
+atexit.register(settings.flush)
+
 DEFAULT_TAGS = (
     {"tag": "Famille", "category": "group"},
     {"tag": "Collègue", "category": "group"},
@@ -41,42 +66,9 @@ def get_dark_style_sheet() -> str:
     return style
 
 
-def check_settings():
-    """Crée le fichier de paramètrage s'il n'existe pas et
-    insère le paramètrage par défaut"""
-    if not SETTINGS_FILE.exists():
-        write_settings(DEFAULT_SETTINGS)
-
-
-def write_settings(content: dict):
-    """Ecrase le contenu du fichier de paramètrage par le contenu du paramètre content"""
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(content, f, indent=4)
-
-
-def read_settings() -> dict:
-    """Retourne le contenu du fichier de paramètrage"""
-    with open(SETTINGS_FILE, "r") as f:
-        content = json.load(f)
-    return content
-
-
-def get_theme_application():
-    """Recupère le contenu du fichier de style en rapport avec le paramètrage"""
-    check_settings()
-    settings = read_settings()
-    theme = settings["theme"]
-    if theme == "light":
-        return get_light_style_sheet()
-    elif theme == "dark":
-        return get_dark_style_sheet()
-
-
 def update_theme_setting(theme: str):
     """Mise à jour du dans le paramètrage du style à utiliser"""
-    settings = read_settings()
-    settings["theme"] = theme
-    write_settings(settings)
+    settings.set("theme", theme)
 
 
 def check_phone_number_format(number: str) -> bool:
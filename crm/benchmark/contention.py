@@ -0,0 +1,166 @@
+"""Module mesurant le comportement de la base lorsque plusieurs processus y accèdent en même temps
+(deux instances de l'application, un export planifié...).
+Des processus écrivains et lecteurs exécutent les fonctions du client pendant une durée donnée,
+puis le débit, les latences, l'attente des verrous et les nouvelles tentatives sont rapportés.
+Utilisation : python -m crm.benchmark.contention --writers 4 --readers 4 --duration 10 --output contention.json"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+from crm.benchmark.dataset import generate_database
+from crm.benchmark.runner import SEARCH_QUERIES, summarize
+from crm.database import client
+from crm.database.connection import connection_manager
+
+DEFAULT_SIZE = 10_000
+DEFAULT_WRITERS = 2
+DEFAULT_READERS = 2
+DEFAULT_DURATION = 10.0
+# Délai laissé aux processus pour démarrer avant le début commun des mesures (secondes)
+START_DELAY = 2.0
+
+CONTACT = {"firstname": "Bench", "lastname": "MARK", "birthday": "2000-01-01", "company": "", "job": ""}
+
+
+def writer_operations(rng: random.Random, size: int) -> dict:
+    """Opérations d'un écrivain, pondérées comme une saisie : surtout des modifications."""
+    phone_tag = client.get_tag_to_category_phone()[1][0]
+    mail_tag = client.get_tag_to_category_mail()[1][0]
+    return {
+        "add_contact": (1, lambda: client.add_contact(**CONTACT)),
+        "add_phone": (2, lambda: client.add_phone(number="0600000000", contact_id=rng.randint(1, size),
+                                                  tag_id=phone_tag)),
+        "add_mail": (2, lambda: client.add_mail(mail="bench@mark.fr", contact_id=rng.randint(1, size),
+                                                tag_id=mail_tag)),
+        "update_contact": (4, lambda: client.update_contact(**CONTACT, id_contact=rng.randint(1, size))),
+        "update_number_phone": (3, lambda: client.update_number_phone("0611111111", phone_tag,
+                                                                      rng.randint(1, size))),
+        "update_mail": (3, lambda: client.update_mail("update@mark.fr", mail_tag, rng.randint(1, size))),
+    }
+
+
+def reader_operations(rng: random.Random, size: int) -> dict:
+    """Opérations d'un lecteur : recherche, affichage d'un contact et défilement de la liste."""
+    return {
+        "search_contacts": (2, lambda: client.search_contacts(rng.choice(SEARCH_QUERIES), limit=100)),
+        "load_contact_bundle": (3, lambda: client.load_contact_bundle(rng.randint(1, size))),
+        "get_contact_page": (2, lambda: client.get_contact_page(1, False, 256, offset=rng.randint(0, size))),
+    }
+
+
+def run_worker(role: str, path: str, size: int, seed: int, start_at: float, duration: float) -> dict:
+    """Exécuté dans un processus dédié : enchaîne les opérations du rôle de start_at à start_at + duration.
+    Retourne les durées par opération, les erreurs et les compteurs de connection_manager."""
+    connection_manager.open(Path(path))
+    rng = random.Random(seed)
+    operations = (writer_operations if role == "writer" else reader_operations)(rng, size)
+    names = list(operations)
+    weights = [operations[name][0] for name in names]
+    timings = {name: [] for name in names}
+    errors = Counter()
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = perf_counter() + duration
+    while perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        start = perf_counter()
+        try:
+            operations[name][1]()
+        except sqlite3.Error as error:
+            errors[f"{name}: {error}"] += 1
+            continue
+        timings[name].append(perf_counter() - start)
+    metrics = dict(connection_manager.metrics)
+    connection_manager.close_all()
+    return {"role": role, "timings": timings, "errors": dict(errors), "metrics": metrics}
+
+
+def report_role(results: list[dict], duration: float) -> dict:
+    """Agrège les résultats des processus d'un même rôle."""
+    timings, errors, metrics = {}, Counter(), Counter()
+    for result in results:
+        for name, values in result["timings"].items():
+            timings.setdefault(name, []).extend(values)
+        errors.update(result["errors"])
+        metrics.update(result["metrics"])
+    every = [value for values in timings.values() for value in values]
+    report = {
+        "processes": len(results),
+        "operations": len(every),
+        "ops_per_s": len(every) / duration,
+        "errors": sum(errors.values()),
+        "lock_wait_s": metrics["lock_wait_s"],
+        "busy_retries": metrics["busy_retries"],
+        "busy_failures": metrics["busy_failures"],
+        "retry_wait_s": metrics["retry_wait_s"],
+    }
+    if every:
+        report["latency"] = summarize(every)
+        report["functions"] = {name: summarize(values) for name, values in timings.items() if values}
+    if errors:
+        report["error_messages"] = dict(errors.most_common(10))
+    return report
+
+
+def run_contention(writers: int, readers: int, duration: float, size: int, seed: int,
+                   directory: Path = None) -> dict:
+    """Génère une base de size contacts puis y fait accéder simultanément writers processus
+    écrivains et readers processus lecteurs pendant duration secondes."""
+    previous_database = connection_manager.database
+    roles = ["writer"] * writers + ["reader"] * readers
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = Path(tmp) / "contention.sqlite3"
+        try:
+            generate_database(path, size, seed)
+            connection_manager.close_all()
+            # 'spawn' : chaque processus ouvre ses propres connexions, comme une instance indépendante
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(roles), mp_context=context) as executor:
+                start_at = time.time() + START_DELAY
+                futures = [executor.submit(run_worker, role, str(path), size, seed + i, start_at, duration)
+                           for i, role in enumerate(roles)]
+                results = [future.result() for future in futures]
+        finally:
+            connection_manager.open(previous_database)
+    return {role: report_role([result for result in results if result["role"] == role], duration)
+            for role in ("writer", "reader") if role in roles}
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Mesure des accès concurrents de plusieurs processus à la base")
+    parser.add_argument("--writers", type=int, default=DEFAULT_WRITERS, help="nombre de processus écrivains")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="nombre de processus lecteurs")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="durée des mesures (secondes)")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="nombre de contacts générés")
+    parser.add_argument("--seed", type=int, default=0, help="graine du générateur de données")
+    parser.add_argument("--output", type=Path, help="fichier JSON de sortie (sinon affichage)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "size": args.size,
+        "duration_s": args.duration,
+        "roles": run_contention(args.writers, args.readers, args.duration, args.size, args.seed),
+    }
+    content = json.dumps(report, indent=4)
+    if args.output:
+        args.output.write_text(content)
+    else:
+        print(content)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Module générant un jeu de données synthétique et reproductible pour les mesures de performance"""
+
+import random
+from pathlib import Path
+
+from crm.database.client import init_database_structure, init_database_tag, add_contacts_bulk, add_phones_bulk, \
+    add_mails_bulk, add_addresses_bulk, add_tag_groups_bulk, paused_search_index, get_tag_to_category_group, \
+    get_tag_to_category_phone, get_tag_to_category_mail, get_tag_to_category_address
+from crm.database.connection import connection_manager
+from crm.database.migrations import migrate
+
+FIRSTNAMES = ("Jean", "Marie", "Pierre", "Sophie", "Luc", "Camille", "Paul", "Julie", "Hugo", "Léa",
+              "Louis", "Chloé", "Nathan", "Emma", "Thomas", "Inès", "Lucas", "Manon", "Éric", "Anaïs")
+LASTNAMES = ("MARTIN", "BERNARD", "DUBOIS", "THOMAS", "ROBERT", "RICHARD", "PETIT", "DURAND", "LEROY", "MOREAU",
+             "SIMON", "LAURENT", "LEFEBVRE", "MICHEL", "GARCIA", "DAVID", "BERTRAND", "ROUX", "VINCENT", "FOURNIER")
+COMPANIES = ("Docstring", "Rocket", "Acme", "Initech", "Globex", "Umbrella", "Hooli", "Soylent", "", "")
+JOBS = ("Développeur", "Comptable", "Commercial", "Directeur", "Technicien", "Consultant", "Graphiste", "", "")
+STREETS = ("rue de la Paix", "avenue Jean Jaurès", "boulevard Victor Hugo", "place de la Mairie", "chemin des Vignes")
+CITIES = ("75001 Paris", "69002 Lyon", "13001 Marseille", "38000 Grenoble", "33000 Bordeaux", "59000 Lille")
+DOMAINS = ("gmail.com", "orange.fr", "free.fr", "docstring.fr", "laposte.net")
+
+# Nombre de contacts insérés par transaction
+CHUNK_SIZE = 10_000
+
+
+def generate_contact(rng: random.Random) -> dict:
+    """Retourne les données aléatoires d'un contact."""
+    return {
+        "firstname": rng.choice(FIRSTNAMES),
+        "lastname": rng.choice(LASTNAMES),
+        "birthday": f"{rng.randint(1940, 2010)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}",
+        "company": rng.choice(COMPANIES),
+        "job": rng.choice(JOBS),
+    }
+
+
+def generate_database(path: Path, size: int, seed: int = 0):
+    """Crée au chemin path une base contenant size contacts avec leurs numéros,
+    mails, adresses et groupes, répartis sur les tags par défaut (DEFAULT_TAGS).
+    La base devient celle utilisée par le client.
+    Une même graine produit toujours les mêmes données."""
+    if path.exists():
+        path.unlink()
+    connection_manager.open(path)
+    init_database_structure()
+    init_database_tag()
+    migrate()
+
+    rng = random.Random(seed)
+    groups = [id_tag for _, id_tag in get_tag_to_category_group()]
+    phone_tags = get_tag_to_category_phone()[1]
+    mail_tags = get_tag_to_category_mail()[1]
+    address_tags = get_tag_to_category_address()[1]
+
+    for start in range(0, size, CHUNK_SIZE):
+        contacts = [generate_contact(rng) for _ in range(min(CHUNK_SIZE, size - start))]
+        phones, mails, addresses, contact_groups = [], [], [], []
+        with paused_search_index() as touched:
+            ids = add_contacts_bulk(contacts)
+            touched.update(ids)
+            for id_contact, contact in zip(ids, contacts):
+                for _ in range(rng.randint(0, 3)):
+                    phones.append({"number": f"0{rng.randint(1, 7)}{rng.randint(0, 99_999_999):08}",
+                                   "contact_id": id_contact,
+                                   "tag_id": rng.choice(phone_tags)})
+                for _ in range(rng.randint(0, 2)):
+                    user = f"{contact['firstname']}.{contact['lastname']}{rng.randint(1, 999)}".lower()
+                    mails.append({"mail": f"{user}@{rng.choice(DOMAINS)}",
+                                  "contact_id": id_contact,
+                                  "tag_id": rng.choice(mail_tags)})
+                for _ in range(rng.randint(0, 2)):
+                    addresses.append({"address": f"{rng.randint(1, 150)} {rng.choice(STREETS)} {rng.choice(CITIES)}",
+                                      "contact_id": id_contact,
+                                      "tag_id": rng.choice(address_tags)})
+                for id_tag in rng.sample(groups, rng.randint(0, len(groups))):
+                    contact_groups.append({"contact_id": id_contact, "tag_id": id_tag})
+            add_phones_bulk(phones)
+            add_mails_bulk(mails)
+            add_addresses_bulk(addresses)
+            add_tag_groups_bulk(contact_groups)
+
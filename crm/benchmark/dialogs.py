@@ -0,0 +1,119 @@
+"""Module mesurant la durée d'ouverture des fenêtres de détails, de l'appel jusqu'au premier affichage.
+Chaque fenêtre est mesurée reconstruite à chaque ouverture, puis réutilisée par DialogPool.
+Utilisation : python -m crm.benchmark.dialogs --size 10000 --iterations 50 --output dialogs.json
+Sans affichage disponible, la plateforme Qt 'offscreen' est utilisée."""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+from crm.benchmark.dataset import generate_database
+from crm.benchmark.runner import select_ids, summarize
+from crm.database.connection import connection_manager
+
+DEFAULT_SIZE = 10_000
+DEFAULT_ITERATIONS = 50
+# Durée maximale d'attente du premier affichage d'une fenêtre (secondes)
+PAINT_TIMEOUT = 5.0
+
+
+def wait_visible(app, timer) -> float:
+    """Traite les événements jusqu'au premier affichage mesuré par timer. Retourne la durée mesurée."""
+    durations = []
+    timer.on_visible = durations.append
+    deadline = perf_counter() + PAINT_TIMEOUT
+    while not durations:
+        if perf_counter() > deadline:
+            raise TimeoutError("La fenêtre ne s'est pas affichée")
+        app.processEvents()
+    return durations[0]
+
+
+def run_dialogs(size: int, iterations: int, seed: int, directory: Path = None) -> dict:
+    """Génère une base de size contacts puis mesure l'ouverture de chaque fenêtre de détails."""
+    from PySide6.QtWidgets import QApplication
+
+    from crm.window.address_details import DetailsAddress
+    from crm.window.contact_details import DetailsContact
+    from crm.window.dialogs import DialogPool, VisibleTimer
+    from crm.window.mail_details import DetailsMail
+    from crm.window.phone_details import DetailsPhone
+    from crm.window.sql import qt_connections
+
+    app = QApplication.instance() or QApplication([])
+    previous_database = connection_manager.database
+    results = {}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        try:
+            generate_database(Path(tmp) / "dialogs.sqlite3", size, seed)
+            rng = random.Random(seed)
+            phones = select_ids("SELECT id FROM phone")
+            mails = select_ids("SELECT id FROM mail")
+            addresses = select_ids("SELECT id FROM address")
+            # Fenêtre et arguments de l'ouverture d'un enregistrement pris au hasard
+            dialogs = {
+                "contact": (DetailsContact, lambda: ("modify", rng.randint(1, size))),
+                "phone": (DetailsPhone, lambda: (rng.choice(phones), "modify")),
+                "mail": (DetailsMail, lambda: (rng.choice(mails), "modify")),
+                "address": (DetailsAddress, lambda: (rng.choice(addresses), "modify")),
+            }
+
+            pool = DialogPool()
+            for name, (factory, record) in dialogs.items():
+                fresh = []
+                for _ in range(iterations):
+                    timer = VisibleTimer(None)
+                    timer.start()
+                    dialog = factory(*record())
+                    dialog.installEventFilter(timer)
+                    dialog.show()
+                    fresh.append(wait_visible(app, timer))
+                    dialog.close()
+                    del dialog
+
+                pooled = []
+                for _ in range(iterations):
+                    dialog = pool.open(name, factory, *record())
+                    pooled.append(wait_visible(app, pool.timers[name]))
+                    dialog.close()
+                    del dialog
+                results[name] = {"rebuilt": summarize(fresh), "pooled": summarize(pooled)}
+            pool.clear()
+            qt_connections.close_all()
+        finally:
+            connection_manager.open(previous_database)
+    return results
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Mesure de la durée d'ouverture des fenêtres de détails")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE, help="nombre de contacts générés")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="ouvertures mesurées par fenêtre")
+    parser.add_argument("--seed", type=int, default=0, help="graine du générateur de données")
+    parser.add_argument("--output", type=Path, help="fichier JSON de sortie (sinon affichage)")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY") and platform.system() == "Linux":
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "size": args.size,
+        "iterations": args.iterations,
+        "dialogs": run_dialogs(args.size, args.iterations, args.seed),
+    }
+    content = json.dumps(report, indent=4)
+    if args.output:
+        args.output.write_text(content)
+    else:
+        print(content)
+
+
+if __name__ == '__main__':
+    main()
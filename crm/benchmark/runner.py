@@ -0,0 +1,231 @@
+"""Module mesurant les performances du client de la base de données sur des jeux de données synthétiques.
+Utilisation : python -m crm.benchmark.runner --sizes 1000 10000 --output bench.json"""
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from crm.api.exporter import WRITERS, export_file
+from crm.benchmark.dataset import generate_database
+from crm.database import client
+from crm.database.connection import connection_manager
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_ITERATIONS = 200
+SEARCH_QUERIES = ("mar", "dubois", "lyon", "06", "famille", "e", "docstring.fr", "jean")
+
+# Requête de la barre de recherche avant l'index plein texte, conservée comme point de comparaison
+LEGACY_SEARCH = """
+    SELECT DISTINCT contact.id, firstname, lastname FROM contact
+    LEFT OUTER JOIN mail ON contact.id = mail.contact_id
+    LEFT OUTER JOIN phone ON contact.id = phone.contact_id
+    LEFT OUTER JOIN address ON contact.id = address.contact_id
+    LEFT OUTER JOIN group_ ON contact.id = group_.contact_id
+    LEFT OUTER JOIN tag ON group_.tag_id = tag.id
+    WHERE lastname LIKE :pattern
+    OR firstname LIKE :pattern
+    OR mail LIKE :pattern
+    OR number LIKE :pattern
+    OR address LIKE :pattern
+    OR tag LIKE :pattern
+"""
+# La requête historique parcourt le produit des jointures : quelques mesures suffisent
+LEGACY_ITERATIONS = 3
+
+
+def summarize(timings: list[float]) -> dict:
+    """Statistiques en millisecondes d'une série de durées exprimées en secondes."""
+    timings = sorted(t * 1000 for t in timings)
+    return {
+        "iterations": len(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "max_ms": timings[-1],
+    }
+
+
+def measure(func: Callable, calls: list[tuple[tuple, dict]]) -> tuple[dict, list]:
+    """Exécute func pour chaque couple (args, kwargs) de calls.
+    Retourne les statistiques des durées et les valeurs retournées."""
+    timings, results = [], []
+    for args, kwargs in calls:
+        start = perf_counter()
+        results.append(func(*args, **kwargs))
+        timings.append(perf_counter() - start)
+    return summarize(timings), results
+
+
+def select_ids(query: str, params: dict = None) -> list[int]:
+    c = connection_manager.connection().cursor()
+    c.execute(query, params or {})
+    return [row[0] for row in c.fetchall()]
+
+
+def legacy_search(pattern: str) -> list[tuple]:
+    c = connection_manager.connection().cursor()
+    c.execute(LEGACY_SEARCH, {"pattern": f"%{pattern}%"})
+    return c.fetchall()
+
+
+def measure_exports(directory: Path, size: int) -> dict:
+    """Durée, débit et taille de l'export complet de la base dans chaque format."""
+    exports = {}
+    for file_format in WRITERS:
+        path = directory / f"export_{size}.{file_format}"
+        start = perf_counter()
+        report = export_file(path, file_format)
+        duration = perf_counter() - start
+        exports[file_format] = {
+            "seconds": duration,
+            "contacts_per_s": report.contacts / duration if duration else 0.0,
+            "bytes": path.stat().st_size,
+        }
+        path.unlink()
+    return exports
+
+
+def run_size(path: Path, size: int, iterations: int, seed: int, legacy: bool) -> dict:
+    """Génère une base de size contacts puis mesure chaque fonction du client."""
+    start = perf_counter()
+    generate_database(path, size, seed)
+    generation = perf_counter() - start
+
+    rng = random.Random(seed)
+    n = iterations
+    group_tag = client.get_tag_to_category_group()[0][1]
+    phone_tag = client.get_tag_to_category_phone()[1][0]
+    mail_tag = client.get_tag_to_category_mail()[1][0]
+    address_tag = client.get_tag_to_category_address()[1][0]
+    existing = [rng.randint(1, size) for _ in range(n)]
+    phones = rng.choices(select_ids("SELECT id FROM phone"), k=n)
+    mails = rng.choices(select_ids("SELECT id FROM mail"), k=n)
+    addresses = rng.choices(select_ids("SELECT id FROM address"), k=n)
+    contact = {"firstname": "Bench", "lastname": "MARK", "birthday": "2000-01-01", "company": "", "job": ""}
+    queries = [SEARCH_QUERIES[i % len(SEARCH_QUERIES)] for i in range(n)]
+
+    results = {}
+
+    def bench(name: str, func: Callable, calls: list[tuple[tuple, dict]]) -> list:
+        results[name], values = measure(func, calls)
+        return values
+
+    # Création
+    new_contacts = bench("add_contact", client.add_contact, [((), contact)] * n)
+    bench("add_phone", client.add_phone,
+          [((), {"number": "0600000000", "contact_id": id_, "tag_id": phone_tag}) for id_ in new_contacts])
+    bench("add_mail", client.add_mail,
+          [((), {"mail": "bench@mark.fr", "contact_id": id_, "tag_id": mail_tag}) for id_ in new_contacts])
+    bench("add_address", client.add_address,
+          [((), {"address": "1 rue du Banc", "contact_id": id_, "tag_id": address_tag}) for id_ in new_contacts])
+    bench("add_tag_group_at_contact", client.add_tag_group_at_contact,
+          [((id_, group_tag), {}) for id_ in new_contacts])
+    new_tags = bench("add_tag", client.add_tag,
+                     [((), {"tag": f"Bench{i}", "category": "group"}) for i in range(n)])
+
+    # Lecture
+    bench("get_tag_to_category_group", client.get_tag_to_category_group, [((), {})] * n)
+    bench("get_tag_to_category_phone", client.get_tag_to_category_phone, [((), {})] * n)
+    bench("get_tag_to_category_mail", client.get_tag_to_category_mail, [((), {})] * n)
+    bench("get_tag_to_category_address", client.get_tag_to_category_address, [((), {})] * n)
+    bench("get_tag_to_category_group_by_contact", client.get_tag_to_category_group_by_contact,
+          [((id_,), {}) for id_ in existing])
+    bench("get_contact_informations", client.get_contact_informations, [((id_,), {}) for id_ in existing])
+    bench("get_contact_group", client.get_contact_group, [((id_,), {}) for id_ in existing])
+    bench("load_contact_bundle", client.load_contact_bundle, [((id_,), {}) for id_ in existing])
+    bench("search_contacts", client.search_contacts, [((query,), {}) for query in queries])
+    bench("search_contact_documents", client.search_contact_documents, [((query,), {}) for query in queries])
+    bench("count_contacts", client.count_contacts, [((), {})] * n)
+    bench("get_contact_page", client.get_contact_page,
+          [((1, False, 256), {"offset": rng.randint(0, size)}) for _ in range(n)])
+    if legacy:
+        bench("legacy_search", legacy_search,
+              [((query,), {}) for query in SEARCH_QUERIES[:LEGACY_ITERATIONS]])
+
+    exports = measure_exports(path.parent, size)
+
+    # Modification
+    bench("update_contact", client.update_contact, [((), dict(contact, id_contact=id_)) for id_ in existing])
+    bench("update_number_phone", client.update_number_phone, [(("0611111111", phone_tag, id_), {}) for id_ in phones])
+    bench("update_mail", client.update_mail, [(("update@mark.fr", mail_tag, id_), {}) for id_ in mails])
+    bench("update_address", client.update_address, [(("2 rue du Banc", address_tag, id_), {}) for id_ in addresses])
+    bench("update_profil_picture", client.update_profil_picture, [((id_, "pp_00000.png"), {}) for id_ in existing])
+    bench("update_tag", client.update_tag, [((), {"tag": f"Mark{id_}", "id_": id_}) for id_ in new_tags])
+
+    # Suppression
+    ids = {"ids": min(new_contacts)}
+    bench("del_group_of_contact", client.del_group_of_contact, [((id_, group_tag), {}) for id_ in new_contacts])
+    bench("del_phone_by_id", client.del_phone_by_id,
+          [((id_,), {}) for id_ in select_ids("SELECT id FROM phone WHERE contact_id >= :ids", ids)])
+    bench("del_mail_by_id", client.del_mail_by_id,
+          [((id_,), {}) for id_ in select_ids("SELECT id FROM mail WHERE contact_id >= :ids", ids)])
+    bench("del_address_by_id", client.del_address_by_id,
+          [((id_,), {}) for id_ in select_ids("SELECT id FROM address WHERE contact_id >= :ids", ids)])
+    bench("del_tag_by_id", client.del_tag_by_id, [((id_, "group"), {}) for id_ in new_tags])
+    bench("del_contact_by_id", client.del_contact_by_id, [((id_,), {}) for id_ in new_contacts])
+
+    return {
+        "size": size,
+        "generation_s": generation,
+        "database_bytes": path.stat().st_size,
+        "functions": results,
+        "exports": exports,
+    }
+
+
+def run_benchmark(sizes: list[int],
+                  iterations: int = DEFAULT_ITERATIONS,
+                  seed: int = 0,
+                  legacy: bool = True,
+                  label: str = "",
+                  directory: Path = None) -> dict:
+    """Exécute les mesures pour chaque taille de base et retourne un rapport sérialisable en JSON."""
+    report = {
+        "label": label,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "iterations": iterations,
+        "seed": seed,
+        "runs": [],
+    }
+    previous_database = connection_manager.database
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        try:
+            for size in sizes:
+                print(f"{size} contacts...", flush=True)
+                report["runs"].append(run_size(Path(tmp) / f"bench_{size}.sqlite3", size, iterations, seed, legacy))
+        finally:
+            connection_manager.open(previous_database)
+    return report
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Mesure des performances du client de la base de données")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="nombres de contacts générés")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="appels mesurés par fonction")
+    parser.add_argument("--seed", type=int, default=0, help="graine du générateur de données")
+    parser.add_argument("--no-legacy", action="store_true", help="ne pas mesurer l'ancienne requête de recherche")
+    parser.add_argument("--label", default="", help="libellé du rapport (ex : version de l'application)")
+    parser.add_argument("--output", type=Path, help="fichier JSON de sortie (sinon affichage)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.iterations, args.seed, not args.no_legacy, args.label)
+    content = json.dumps(report, indent=4)
+    if args.output:
+        args.output.write_text(content)
+    else:
+        print(content)
+
+
+if __name__ == '__main__':
+    main()
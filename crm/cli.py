@@ -0,0 +1,143 @@
+"""Module contenant l'interface en ligne de commande de l'application.
+Il n'importe ni PySide6 ni PIL : les commandes sont utilisables sans environnement graphique.
+Utilisation : python -m crm <commande> [options]"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+COMMANDS = ("search", "import", "export", "stats", "vacuum", "benchmark")
+
+
+def print_progress(report):
+    """Affiche l'avancement d'un import ou d'un export sur la sortie d'erreur d'un terminal."""
+    if sys.stderr.isatty():
+        print(f"\r{report.contacts} contacts ({report.progress:.0%})", end="", file=sys.stderr, flush=True)
+
+
+def end_progress():
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+
+
+def command_search(args) -> int:
+    from crm.api.exporter import write_jsonl
+    from crm.database.client import search_contacts, load_contact_bundle
+
+    bundles = (load_contact_bundle(id_) for id_ in search_contacts(args.query, args.limit))
+    if args.json:
+        for _ in write_jsonl(filter(None, bundles), sys.stdout):
+            pass
+        return 0
+    for bundle in filter(None, bundles):
+        print("\t".join((str(bundle.id),
+                         bundle.firstname or "",
+                         bundle.lastname or "",
+                         ", ".join(mail for _, _, mail in bundle.mails),
+                         ", ".join(number for _, _, number in bundle.phones))))
+    return 0
+
+
+def command_import(args) -> int:
+    from crm.api.importer import import_file
+
+    report = import_file(args.file, args.chunk_size, progress=print_progress)
+    end_progress()
+    print(f"{report.contacts} contacts importés, {report.tags} tags créés.")
+    return 0
+
+
+def command_export(args) -> int:
+    from crm.api.exporter import export_file
+
+    report = export_file(args.file, args.format, progress=print_progress)
+    end_progress()
+    print(f"{report.contacts} contacts exportés dans {args.file}.")
+    return 0
+
+
+def command_stats(args) -> int:
+    from crm.database.maintenance import database_stats
+
+    stats = database_stats()
+    if args.json:
+        print(json.dumps(stats, indent=4))
+    else:
+        for key, value in stats.items():
+            print(f"{key}: {value}")
+    return 0
+
+
+def command_vacuum(args) -> int:
+    from crm.database.maintenance import vacuum
+
+    before, after = vacuum()
+    print(f"Taille de la base : {before} -> {after} octets.")
+    return 0
+
+
+def command_benchmark(args) -> int:
+    from crm.benchmark.runner import main as benchmark_main
+
+    benchmark_main(args.options)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m crm", description="Gestion des contacts en ligne de commande")
+    parser.add_argument("--database", type=Path, help="fichier de la base de données (par défaut db.sqlite3)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="rechercher des contacts")
+    search.add_argument("query", help="texte recherché dans les noms, mails, numéros, adresses et groupes")
+    search.add_argument("--limit", type=int, default=20, help="nombre maximal de résultats (-1 : tous)")
+    search.add_argument("--json", action="store_true", help="un objet JSON par contact")
+    search.set_defaults(func=command_search)
+
+    import_ = subparsers.add_parser("import", help="importer un fichier CSV ou vCard")
+    import_.add_argument("file", type=Path)
+    import_.add_argument("--chunk-size", type=int, default=1_000, help="contacts insérés par transaction")
+    import_.set_defaults(func=command_import)
+
+    export = subparsers.add_parser("export", help="exporter les contacts en CSV, vCard ou JSON Lines")
+    export.add_argument("file", type=Path)
+    export.add_argument("--format", choices=("csv", "vcard", "jsonl"), help="par défaut, déduit de l'extension")
+    export.set_defaults(func=command_export)
+
+    stats = subparsers.add_parser("stats", help="afficher le contenu et la taille de la base")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(func=command_stats)
+
+    vacuum = subparsers.add_parser("vacuum", help="compacter la base de données")
+    vacuum.set_defaults(func=command_vacuum)
+
+    # Les options suivantes sont transmises telles quelles à crm.benchmark.runner
+    benchmark = subparsers.add_parser("benchmark", help="mesurer les performances (options de crm.benchmark.runner)")
+    benchmark.set_defaults(func=command_benchmark)
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    """Exécute la commande décrite par argv et retourne le code de sortie."""
+    parser = build_parser()
+    args, args.options = parser.parse_known_args(argv)
+    if args.options and args.command != "benchmark":
+        parser.error(f"arguments non reconnus : {' '.join(args.options)}")
+
+    from crm.database.connection import connection_manager
+    from crm.database.migrations import check_database
+
+    if args.database:
+        connection_manager.open(args.database)
+    # Les mesures de performance utilisent leurs propres bases
+    if args.command != "benchmark":
+        for migration, duration in check_database():
+            print(f"Migration {migration.version} ({migration.description}) appliquée en {duration * 1000:.1f} ms",
+                  file=sys.stderr)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as error:
+        end_progress()
+        print(f"Erreur : {error}", file=sys.stderr)
+        return 1
@@ -0,0 +1,60 @@
+"""Module contenant les caches en mémoire des données peu volumineuses de la base"""
+
+import threading
+from pathlib import Path
+
+from crm.database.connection import connection_manager
+
+
+class TagCache:
+    """Catalogue des tags par catégorie, chargé une seule fois puis tenu à jour
+    par les fonctions d'écriture du client."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags: dict[str, dict[int, str]] | None = None
+        self._database: Path | None = None
+
+    def _load(self):
+        """Chargement de tous les tags en une requête, regroupés par catégorie."""
+        c = connection_manager.connection().cursor()
+        c.execute("SELECT category, id, tag FROM tag ORDER BY category, id")
+        tags = {}
+        for category, id_tag, tag in c.fetchall():
+            tags.setdefault(category, {})[id_tag] = tag
+        self._tags = tags
+        self._database = connection_manager.database
+
+    def category(self, category: str) -> list[tuple[int, str]]:
+        """Retourne les tags (id, tag) d'une catégorie."""
+        with self._lock:
+            if self._tags is None or self._database != connection_manager.database:
+                self._load()
+            return list(self._tags.get(category, {}).items())
+
+    def add(self, id_tag: int, tag: str, category: str):
+        with self._lock:
+            if self._tags is not None:
+                self._tags.setdefault(category, {})[id_tag] = tag
+
+    def rename(self, id_tag: int, tag: str):
+        with self._lock:
+            if self._tags is None:
+                return
+            for tags in self._tags.values():
+                if id_tag in tags:
+                    tags[id_tag] = tag
+
+    def remove(self, id_tag: int):
+        with self._lock:
+            if self._tags is None:
+                return
+            for tags in self._tags.values():
+                tags.pop(id_tag, None)
+
+    def invalidate(self):
+        """Force le rechargement des tags à la prochaine lecture."""
+        with self._lock:
+            self._tags = None
+
+
+tag_cache = TagCache()
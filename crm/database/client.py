@@ -1,31 +1,21 @@
 """Module faisant le lien entre la base de données et l'application pour les opérations CRUD"""
 
-import sqlite3
-
-from crm.api.utils import DATA_FILE, DEFAULT_TAGS
+import json
+from contextlib import contextmanager
+from functools import partial, wraps
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, NamedTuple, Iterable, Iterator, Sequence
+
+from crm.api.utils import DEFAULT_TAGS
+from crm.database.cache import tag_cache
+from crm.database.connection import connection_manager, retry_on_busy
+from crm.database.events import INSERT, UPDATE, DELETE, JOURNAL_BULK, ORIGIN, notify
 
 ##############
 #   CREATE   #
 ##############
 
-QUERY_PHONE = """
-    SELECT phone.id, tag, number FROM phone
-    INNER JOIN tag ON phone.tag_id = tag.id
-    WHERE contact_id={id}
-"""
-
-QUERY_MAIL = """
-    SELECT mail.id, tag, mail FROM mail 
-    INNER JOIN tag ON mail.tag_id = tag.id 
-    WHERE contact_id={id}
-"""
-
-QUERY_ADDRESS = """
-    SELECT address.id, tag, address FROM address 
-    INNER JOIN tag ON address.tag_id = tag.id 
-    WHERE contact_id={id}
-"""
-
 CONTACT = """ CREATE TABLE IF NOT EXISTS contact (
                     id INTEGER PRIMARY KEY,
                     firstname TEXT,
@@ -88,307 +78,702 @@ GROUP = """
     );
 """
 
-def init_database_structure():
-    """Création de la base de données"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute(CONTACT)
-    c.execute(TAG)
-    c.execute(PHONE)
-    c.execute(MAIL)
-    c.execute(ADDRESS)
-    c.execute(GROUP)
-    conn.commit()
-    conn.close()
+SEARCH = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS contact_search USING fts5(
+        firstname,
+        lastname,
+        mail,
+        number,
+        address,
+        tag,
+        tokenize = 'trigram'
+    );
+"""
+
+# Indexation des contacts désignés par {ids}. Le rowid de contact_search est l'id du contact.
+INDEX_SEARCH = """
+    INSERT INTO contact_search (rowid, firstname, lastname, mail, number, address, tag)
+    SELECT id, firstname, lastname,
+           (SELECT group_concat(mail, ' ') FROM mail WHERE contact_id = contact.id),
+           (SELECT group_concat(number, ' ') FROM phone WHERE contact_id = contact.id),
+           (SELECT group_concat(address, ' ') FROM address WHERE contact_id = contact.id),
+           (SELECT group_concat(tag, ' ') FROM tag
+            INNER JOIN group_ ON tag.id = group_.tag_id
+            WHERE group_.contact_id = contact.id)
+    FROM contact WHERE id IN ({ids})
+"""
+
+UNINDEX_SEARCH = "DELETE FROM contact_search WHERE rowid IN ({ids})"
+REFRESH_SEARCH = UNINDEX_SEARCH + ";" + INDEX_SEARCH + ";"
+
+# Tant qu'elle contient une ligne, les triggers ne mettent plus à jour l'index de recherche.
+# Elle n'est remplie qu'à l'intérieur d'une transaction (voir paused_search_index).
+SEARCH_PAUSED = """
+    CREATE TABLE IF NOT EXISTS search_index_paused (
+        paused integer
+    );
+"""
 
+SEARCH_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+    WHEN NOT EXISTS (SELECT 1 FROM search_index_paused){when} BEGIN
+        {body}
+    END;
+"""
 
+
+def search_triggers() -> dict[str, str]:
+    """Retourne, par nom, les triggers maintenant l'index de recherche synchronisé avec les tables."""
+    triggers = [
+        ("contact_search_contact_ai", "INSERT", "contact", "",
+         REFRESH_SEARCH.format(ids="SELECT NEW.id")),
+        ("contact_search_contact_au", "UPDATE", "contact", "",
+         REFRESH_SEARCH.format(ids="SELECT NEW.id")),
+        ("contact_search_contact_ad", "DELETE", "contact", "",
+         "DELETE FROM contact_search WHERE rowid = OLD.id;"),
+        ("contact_search_tag_au", "UPDATE OF tag", "tag", " AND NEW.category = 'group'",
+         REFRESH_SEARCH.format(ids="SELECT contact_id FROM group_ WHERE tag_id = NEW.id")),
+    ]
+    for table in ("phone", "mail", "address", "group_"):
+        name = table.rstrip("_")
+        triggers += [
+            (f"contact_search_{name}_ai", "INSERT", table, "",
+             REFRESH_SEARCH.format(ids="SELECT NEW.contact_id")),
+            (f"contact_search_{name}_au", "UPDATE", table, "",
+             REFRESH_SEARCH.format(ids="SELECT OLD.contact_id UNION SELECT NEW.contact_id")),
+            (f"contact_search_{name}_ad", "DELETE", table, "",
+             REFRESH_SEARCH.format(ids="SELECT OLD.contact_id")),
+        ]
+    return {name: SEARCH_TRIGGER.format(name=name, event=event, table=table, when=when, body=body)
+            for name, event, table, when, body in triggers}
+
+
+@retry_on_busy
+def init_database_structure():
+    """Création de la base de données"""
+    with connection_manager.transaction() as c:
+        c.execute(CONTACT)
+        c.execute(TAG)
+        c.execute(PHONE)
+        c.execute(MAIL)
+        c.execute(ADDRESS)
+        c.execute(GROUP)
+
+
+@contextmanager
+def paused_search_index():
+    """Suspend la mise à jour de l'index de recherche par les triggers le temps d'une
+    transaction d'écritures en masse. Retourne un ensemble auquel ajouter l'id des
+    contacts créés ou modifiés : ils sont réindexés en une fois avant la validation.
+    Le journal des modifications n'en retient qu'une écriture en masse (JOURNAL_BULK)."""
+    with connection_manager.transaction() as c:
+        c.execute("INSERT INTO search_index_paused (paused) VALUES (1)")
+        contacts = set()
+        yield contacts
+        c.execute("DELETE FROM search_index_paused")
+        c.executemany(UNINDEX_SEARCH.format(ids="?"), ((id_,) for id_ in contacts))
+        c.executemany(INDEX_SEARCH.format(ids="?"), ((id_,) for id_ in contacts))
+        # Les triggers du journal des modifications étaient eux aussi suspendus
+        c.execute(JOURNAL_BULK, {"origin": ORIGIN})
+
+
+@retry_on_busy
+def rebuild_search_index():
+    """Reconstruction complète de l'index de recherche à partir des tables."""
+    with connection_manager.transaction() as c:
+        c.execute("DELETE FROM contact_search")
+        c.execute(INDEX_SEARCH.format(ids="SELECT id FROM contact"))
+
+
+@retry_on_busy
 def init_database_tag():
-    """Insertion de tags par défaut.
+    """Insertion de tags par défaut, en une transaction.
     À appeler après initialisation de la base de données."""
-    for tag in DEFAULT_TAGS:
-        add_tag(**tag)
+    with connection_manager.transaction():
+        for tag in DEFAULT_TAGS:
+            add_tag(**tag)
 
 
+@retry_on_busy
 def add_contact(**kwargs) -> int:
     """Insertion d'un nouveau contact. Retourne l'id correspondant."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""INSERT INTO contact 
-                 (firstname, lastname, profile_picture, birthday, company, job) 
-                 VALUES (:firstname, :lastname, 'pp_00000.png', :birthday, :company, :job)""", kwargs)
-    last_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("""INSERT INTO contact 
+                     (firstname, lastname, profile_picture, birthday, company, job) 
+                     VALUES (:firstname, :lastname, 'pp_00000.png', :birthday, :company, :job)""", kwargs)
+        last_id = c.lastrowid
+        notify("contact", last_id, INSERT, last_id)
     return last_id
 
 
+@retry_on_busy
 def add_phone(**kwargs):
     """Insertion d'un numéro de téléphone associé à un contact et à un tag."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""INSERT INTO phone 
-                 (number, contact_id, tag_id) 
-                 VALUES (:number, :contact_id, :tag_id)""", kwargs)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("""INSERT INTO phone 
+                     (number, contact_id, tag_id) 
+                     VALUES (:number, :contact_id, :tag_id)""", kwargs)
+        notify("phone", c.lastrowid, INSERT, kwargs["contact_id"])
 
 
+@retry_on_busy
 def add_mail(**kwargs):
     """Insertion d'un mail associé à un contact et à un tag."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""INSERT INTO mail 
-                 (mail, contact_id, tag_id) 
-                 VALUES (:mail, :contact_id, :tag_id)""", kwargs)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("""INSERT INTO mail 
+                     (mail, contact_id, tag_id) 
+                     VALUES (:mail, :contact_id, :tag_id)""", kwargs)
+        notify("mail", c.lastrowid, INSERT, kwargs["contact_id"])
 
 
+@retry_on_busy
 def add_address(**kwargs):
     """Insertion d'une adresse associée à un contact et à un tag."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""INSERT INTO address 
-                 (address, contact_id, tag_id) 
-                 VALUES (:address, :contact_id, :tag_id)""", kwargs)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("""INSERT INTO address 
+                     (address, contact_id, tag_id) 
+                     VALUES (:address, :contact_id, :tag_id)""", kwargs)
+        notify("address", c.lastrowid, INSERT, kwargs["contact_id"])
 
 
+@retry_on_busy
 def add_tag_group_at_contact(id_contact: int, id_tag: int):
     """Insertion d'un groupe associé à un contact et à un tag."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    values = {"id": None, "contact_id": id_contact, "tag_id": id_tag}
-    c.execute("INSERT INTO group_ VALUES (:id, :contact_id, :tag_id)", values)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        values = {"id": None, "contact_id": id_contact, "tag_id": id_tag}
+        c.execute("INSERT INTO group_ VALUES (:id, :contact_id, :tag_id)", values)
+        notify("group", c.lastrowid, INSERT, id_contact)
 
 
+@retry_on_busy
 def add_tag(**kwargs) -> int:
     """Insertion d'un nouveau tag avec sa catégorie. Retourne l'id correspondant."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO tag (tag, category) VALUES (:tag, :category)", kwargs)
-    last_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("INSERT INTO tag (tag, category) VALUES (:tag, :category)", kwargs)
+        last_id = c.lastrowid
+        connection_manager.after_commit(partial(tag_cache.add, last_id, kwargs["tag"], kwargs["category"]))
+        notify("tag", last_id, INSERT)
     return last_id
 
+
+def unit_of_work():
+    """Regroupe plusieurs opérations d'écriture dans une seule transaction :
+        with unit_of_work():
+            id_contact = add_contact(...)
+            add_phones_bulk(...)
+    Les fonctions appelées à l'intérieur ne valident plus individuellement."""
+    return connection_manager.transaction()
+
+
+def read_snapshot():
+    """Regroupe plusieurs lectures dans une seule transaction : elles lisent toutes le même état
+    de la base, même si d'autres connexions y écrivent entre-temps.
+        with read_snapshot():
+            tags = get_tags_by_category()
+            bundles = list(iter_contact_bundles())"""
+    return connection_manager.transaction(immediate=False)
+
+
+def materialized(func: Callable) -> Callable:
+    """Convertit en liste les lignes passées à une écriture en masse avant son appel :
+    réexécutée par retry_on_busy, elle doit retrouver les mêmes lignes, même fournies par un générateur."""
+    @wraps(func)
+    def wrapper(rows: Iterable[dict]):
+        return func(list(rows))
+    return wrapper
+
+
+@materialized
+@retry_on_busy
+def add_contacts_bulk(contacts: Iterable[dict]) -> list[int]:
+    """Insertion de plusieurs contacts en une transaction. Retourne les id correspondants."""
+    if not contacts:
+        return []
+    ids = []
+    with connection_manager.transaction() as c:
+        # L'id attribué par sqlite est relevé à chaque insertion : l'instruction préparée est
+        # réutilisée d'une ligne à l'autre, pour un coût proche de celui d'executemany
+        for contact in contacts:
+            c.execute("""INSERT INTO contact 
+                         (firstname, lastname, profile_picture, birthday, company, job) 
+                         VALUES (:firstname, :lastname, 'pp_00000.png', :birthday, :company, :job)""", contact)
+            ids.append(c.lastrowid)
+        notify("contact", None, INSERT)
+    return ids
+
+
+@materialized
+@retry_on_busy
+def add_phones_bulk(phones: Iterable[dict]):
+    """Insertion de plusieurs numéros de téléphone en une transaction."""
+    with connection_manager.transaction() as c:
+        c.executemany("""INSERT INTO phone 
+                         (number, contact_id, tag_id) 
+                         VALUES (:number, :contact_id, :tag_id)""", phones)
+        notify("phone", None, INSERT)
+
+
+@materialized
+@retry_on_busy
+def add_mails_bulk(mails: Iterable[dict]):
+    """Insertion de plusieurs mails en une transaction."""
+    with connection_manager.transaction() as c:
+        c.executemany("""INSERT INTO mail 
+                         (mail, contact_id, tag_id) 
+                         VALUES (:mail, :contact_id, :tag_id)""", mails)
+        notify("mail", None, INSERT)
+
+
+@materialized
+@retry_on_busy
+def add_addresses_bulk(addresses: Iterable[dict]):
+    """Insertion de plusieurs adresses en une transaction."""
+    with connection_manager.transaction() as c:
+        c.executemany("""INSERT INTO address 
+                         (address, contact_id, tag_id) 
+                         VALUES (:address, :contact_id, :tag_id)""", addresses)
+        notify("address", None, INSERT)
+
+
+@materialized
+@retry_on_busy
+def add_tag_groups_bulk(groups: Iterable[dict]):
+    """Insertion de plusieurs groupes (contact_id, tag_id) en une transaction."""
+    with connection_manager.transaction() as c:
+        c.executemany("INSERT INTO group_ (contact_id, tag_id) VALUES (:contact_id, :tag_id)", groups)
+        notify("group", None, INSERT)
+
 ##############
 #    READ    #
 ##############
 
+@retry_on_busy
 def get_tag_to_category_group() -> list[tuple[str, int]]:
     """Retourne une liste de tuple où chaque tuple est un tag de la catégorie 'group' et son id"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""SELECT tag.tag, tag.id FROM tag
-                 WHERE category='group'""")
-    values = c.fetchall()
-    conn.close()
-    return values
+    return [(tag, id_tag) for id_tag, tag in tag_cache.category("group")]
 
 
+@retry_on_busy
 def get_tag_to_category_group_by_contact(id_contact: int) -> tuple[tuple[str], tuple[int]]:
     """Retourne deux tuples pour un contact donné :
     L'un des tags associés à la catégrie 'group'.
     L'autre des id correspondants au premier."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute(f"""SELECT tag.tag, tag.id FROM tag
-                  INNER JOIN group_ ON tag.id = group_.tag_id
-                  WHERE category='group'
-                  AND contact_id={id_contact}""")
+    c = connection_manager.connection().cursor()
+    d = {"id_contact": id_contact}
+    c.execute("""SELECT tag.tag, tag.id FROM tag
+                 INNER JOIN group_ ON tag.id = group_.tag_id
+                 WHERE category='group'
+                 AND contact_id=:id_contact""", d)
     values = c.fetchall()
-    conn.close()
     return tuple(tag[0] for tag in values), tuple(idx[1] for idx in values)
 
 
+@retry_on_busy
+def get_tags_by_category() -> dict[str, list[str]]:
+    """Retourne les tags de chaque catégorie, lus en base plutôt que dans tag_cache :
+    ils correspondent à l'état lu par les autres requêtes de la transaction en cours."""
+    c = connection_manager.connection().cursor()
+    c.execute("SELECT category, tag FROM tag ORDER BY category, id")
+    tags = {}
+    for category, tag in c.fetchall():
+        tags.setdefault(category, []).append(tag)
+    return tags
+
+
+@retry_on_busy
 def get_tag_to_category_phone() -> tuple[list[str], list[int]]:
     """Retourne deux listes :
     L'une des tags associés à la catégrie 'phone'.
     L'autre des id correspondants à la première."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, tag FROM tag WHERE category='phone'")
-    values = c.fetchall()
-    conn.close()
+    values = tag_cache.category("phone")
     return [tag[1] for tag in values], [idx[0] for idx in values]
 
 
+@retry_on_busy
 def get_tag_to_category_mail() -> tuple[list[str], list[int]]:
     """Retourne deux listes :
     L'une des tags associés à la catégrie 'mail'.
     L'autre des id correspondants à la première."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, tag FROM tag WHERE category='mail'")
-    values = c.fetchall()
-    conn.close()
+    values = tag_cache.category("mail")
     return [tag[1] for tag in values], [idx[0] for idx in values]
 
 
+@retry_on_busy
 def get_tag_to_category_address() -> tuple[list[str], list[int]]:
     """Retourne deux listes :
     L'une des tags associés à la catégrie 'address'.
     L'autre des id correspondants à la première."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("SELECT id, tag FROM tag WHERE category='address'")
-    values = c.fetchall()
-    conn.close()
+    values = tag_cache.category("address")
     return [tag[1] for tag in values], [idx[0] for idx in values]
 
 
+@retry_on_busy
 def get_contact_informations(id_contact: int) -> tuple:
     """Retourne les données d'un contact"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
+    c = connection_manager.connection().cursor()
     d = {"id_contact": id_contact}
     c.execute("SELECT profile_picture, birthday, company, job FROM contact WHERE id=:id_contact", d)
     data = c.fetchone()
-    conn.close()
     return data
 
 
+@retry_on_busy
 def get_contact_group(id_contact: int) -> str:
     """Retourne les tags de la catégorie groupe d'un contact"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
+    c = connection_manager.connection().cursor()
     d = {"id_contact": id_contact}
     c.execute("SELECT tag FROM tag INNER JOIN group_ ON tag.id = group_.tag_id WHERE group_.contact_id=:id_contact", d)
     data = c.fetchall()
-    conn.close()
     return ", ".join([d[0] for d in data])
 
+def _search_contact_rows(query: str, limit: int, columns: str) -> list[tuple]:
+    """Exécute la recherche de query dans l'index et retourne les colonnes demandées."""
+    c = connection_manager.connection().cursor()
+    if len(query) >= 3:
+        # Recherche d'une sous-chaîne via l'index trigram
+        d = {"query": '"' + query.replace('"', '""') + '"', "limit": limit}
+        c.execute(f"""SELECT {columns} FROM contact_search
+                      WHERE contact_search MATCH :query
+                      ORDER BY rank LIMIT :limit""", d)
+    else:
+        # Moins de trois caractères : aucun trigram exploitable, parcours de l'index
+        # %, _ et \ saisis sont recherchés tels quels
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        d = {"query": f"%{escaped}%", "limit": limit}
+        c.execute(f"""SELECT {columns} FROM contact_search
+                      WHERE firstname LIKE :query ESCAPE '\\' OR lastname LIKE :query ESCAPE '\\'
+                      OR mail LIKE :query ESCAPE '\\' OR number LIKE :query ESCAPE '\\'
+                      OR address LIKE :query ESCAPE '\\' OR tag LIKE :query ESCAPE '\\'
+                      ORDER BY rowid LIMIT :limit""", d)
+    return c.fetchall()
+
+
+@retry_on_busy
+def search_contacts(query: str, limit: int = -1) -> list[int]:
+    """Retourne les id des contacts dont le nom, le prénom, un mail, un numéro,
+    une adresse ou un groupe contient query, les plus pertinents en premier.
+    Une limite négative retourne tous les résultats."""
+    return [row[0] for row in _search_contact_rows(query, limit, "rowid")]
+
+
+@retry_on_busy
+def search_contact_documents(query: str, limit: int = -1) -> list[tuple[int, str]]:
+    """Comme search_contacts, mais retourne pour chaque contact un tuple (id, texte indexé).
+    Le texte, en minuscules, permet d'affiner ensuite la recherche sans relire la base."""
+    rows = _search_contact_rows(query, limit, "rowid, firstname, lastname, mail, number, address, tag")
+    return [(row[0], "\n".join(value for value in row[1:] if value).lower()) for row in rows]
+
+
+# Expressions de tri des contacts par colonne affichée, couvertes par les index de la migration 3
+CONTACT_SORT_KEYS = {
+    0: "contact.id",
+    1: "IFNULL(firstname, '')",
+    2: "IFNULL(lastname, '')",
+}
+
+
+def _contact_filter(ids: Sequence[int] | None) -> tuple[str, dict]:
+    """Retourne la jointure restreignant les contacts aux id donnés, et son paramètre.
+    Les id sont transmis à chaque requête : toute connexion, de tout thread, lit la même liste."""
+    if ids is None:
+        return "", {}
+    return "INNER JOIN json_each(:ids) AS filter ON filter.value = contact.id", {"ids": json.dumps(list(ids))}
+
+
+@retry_on_busy
+def count_contacts(ids: Sequence[int] | None = None) -> int:
+    """Retourne le nombre de contacts, éventuellement restreint aux id donnés."""
+    join, d = _contact_filter(ids)
+    c = connection_manager.connection().cursor()
+    c.execute(f"SELECT COUNT(*) FROM contact {join}", d)
+    return c.fetchone()[0]
+
+
+@retry_on_busy
+def get_contact_page(column: int,
+                     descending: bool,
+                     limit: int,
+                     after: tuple | None = None,
+                     offset: int = 0,
+                     ids: Sequence[int] | None = None) -> list[tuple]:
+    """Retourne une page de contacts (id, firstname, lastname, clé de tri, profile_picture)
+    triée par la colonne donnée.
+    after est le couple (clé de tri, id) de la dernière ligne de la page précédente :
+    la page est alors lue directement dans l'index (pagination par clé).
+    À défaut, offset lignes sont sautées. ids restreint la liste aux contacts donnés."""
+    key = CONTACT_SORT_KEYS[column]
+    order, compare = ("DESC", "<") if descending else ("ASC", ">")
+    join, d = _contact_filter(ids)
+    where = ""
+    d.update(limit=limit, offset=offset)
+    if after is not None:
+        # Forme développée de (clé, id) > (:key, :id), exploitable par l'index de la clé de tri
+        where = f"WHERE {key} {compare}= :key AND ({key} {compare} :key OR contact.id {compare} :id)"
+        d.update(key=after[0], id=after[1], offset=0)
+
+    c = connection_manager.connection().cursor()
+    c.execute(f"""SELECT contact.id, firstname, lastname, {key}, profile_picture FROM contact {join} {where}
+                  ORDER BY {key} {order}, contact.id {order}
+                  LIMIT :limit OFFSET :offset""", d)
+    return c.fetchall()
+
+
+@retry_on_busy
+def get_contact_row(id_contact: int, column: int) -> tuple | None:
+    """Retourne la ligne d'un contact telle que la renvoie get_contact_page pour le tri par column."""
+    key = CONTACT_SORT_KEYS[column]
+    c = connection_manager.connection().cursor()
+    c.execute(f"SELECT contact.id, firstname, lastname, {key}, profile_picture FROM contact WHERE contact.id=:id",
+              {"id": id_contact})
+    return c.fetchone()
+
+
+@retry_on_busy
+def count_contacts_before(column: int, descending: bool, key: tuple, ids: Sequence[int] | None = None) -> int:
+    """Retourne la position dans la liste triée par column du contact dont la clé (clé de tri, id) est key,
+    c'est-à-dire le nombre de contacts qui le précèdent. Seul l'index de la clé de tri est parcouru."""
+    sort_key = CONTACT_SORT_KEYS[column]
+    compare = ">" if descending else "<"
+    join, d = _contact_filter(ids)
+    d.update(key=key[0], id=key[1])
+    c = connection_manager.connection().cursor()
+    c.execute(f"""SELECT COUNT(*) FROM contact {join}
+                  WHERE {sort_key} {compare}= :key AND ({sort_key} {compare} :key OR contact.id {compare} :id)""",
+              d)
+    return c.fetchone()[0]
+
+
+# Lignes (id, tag, valeur, contact_id) des données rattachées à un contact, comme dans ContactBundle
+CONTACT_DETAILS = {
+    "phone": "SELECT phone.id, tag, number, contact_id FROM phone INNER JOIN tag ON phone.tag_id = tag.id "
+             "WHERE phone.id=:id",
+    "mail": "SELECT mail.id, tag, mail, contact_id FROM mail INNER JOIN tag ON mail.tag_id = tag.id "
+            "WHERE mail.id=:id",
+    "address": "SELECT address.id, tag, address, contact_id FROM address INNER JOIN tag ON address.tag_id = tag.id "
+               "WHERE address.id=:id",
+}
+
+
+@retry_on_busy
+def get_contact_detail(entity: str, id_: int) -> tuple | None:
+    """Retourne la ligne (id, tag, valeur, contact_id) d'un téléphone, d'un mail ou d'une adresse."""
+    c = connection_manager.connection().cursor()
+    c.execute(CONTACT_DETAILS[entity], {"id": id_})
+    return c.fetchone()
+
+
+class ContactBundle(NamedTuple):
+    """Ensemble des données affichées pour un contact.
+    phones, mails et addresses contiennent des tuples (id, tag, valeur)."""
+    id: int
+    firstname: str
+    lastname: str
+    profile_picture: str
+    birthday: str
+    company: str
+    job: str
+    groups: tuple[str, ...]
+    phones: tuple[tuple[int, str, str], ...]
+    mails: tuple[tuple[int, str, str], ...]
+    addresses: tuple[tuple[int, str, str], ...]
+
+
+@retry_on_busy
+def load_contact_bundle(id_contact: int) -> ContactBundle | None:
+    """Retourne toutes les données d'un contact, lues dans une seule transaction.
+    Retourne None si le contact n'existe pas."""
+    d = {"id_contact": id_contact}
+    with connection_manager.transaction(immediate=False) as c:
+        c.execute("""SELECT id, firstname, lastname, profile_picture, birthday, company, job
+                     FROM contact WHERE id=:id_contact""", d)
+        contact = c.fetchone()
+        if not contact:
+            return None
+        c.execute("""SELECT 'group', group_.id, tag, NULL FROM group_
+                     INNER JOIN tag ON group_.tag_id = tag.id WHERE contact_id=:id_contact
+                     UNION ALL
+                     SELECT 'phone', phone.id, tag, number FROM phone
+                     INNER JOIN tag ON phone.tag_id = tag.id WHERE contact_id=:id_contact
+                     UNION ALL
+                     SELECT 'mail', mail.id, tag, mail FROM mail
+                     INNER JOIN tag ON mail.tag_id = tag.id WHERE contact_id=:id_contact
+                     UNION ALL
+                     SELECT 'address', address.id, tag, address FROM address
+                     INNER JOIN tag ON address.tag_id = tag.id WHERE contact_id=:id_contact""", d)
+        rows = c.fetchall()
+
+    details = {"group": [], "phone": [], "mail": [], "address": []}
+    for category, *row in rows:
+        details[category].append(tuple(row))
+    return ContactBundle(*contact,
+                         groups=tuple(tag for _, tag, _ in details["group"]),
+                         phones=tuple(details["phone"]),
+                         mails=tuple(details["mail"]),
+                         addresses=tuple(details["address"]))
+
+
+# Contacts et données associées dans une seule requête triée par contact, puis par nature
+# (0 : contact, 1 : groupe, 2 : téléphone, 3 : mail, 4 : adresse). Le tri suit les index
+# sur contact_id : les lignes sont produites au fil de la lecture, sans tri de l'ensemble.
+ALL_CONTACT_ROWS = """
+    SELECT id, 0, id, firstname, lastname, profile_picture, birthday, company, job FROM contact
+    UNION ALL
+    SELECT contact_id, 1, group_.id, tag, NULL, NULL, NULL, NULL, NULL FROM group_
+    INNER JOIN tag ON group_.tag_id = tag.id
+    UNION ALL
+    SELECT contact_id, 2, phone.id, tag, number, NULL, NULL, NULL, NULL FROM phone
+    INNER JOIN tag ON phone.tag_id = tag.id
+    UNION ALL
+    SELECT contact_id, 3, mail.id, tag, mail, NULL, NULL, NULL, NULL FROM mail
+    INNER JOIN tag ON mail.tag_id = tag.id
+    UNION ALL
+    SELECT contact_id, 4, address.id, tag, address, NULL, NULL, NULL, NULL FROM address
+    INNER JOIN tag ON address.tag_id = tag.id
+    ORDER BY 1, 2, 3
+"""
+
+
+def iter_contact_bundles(batch_size: int = 1000) -> Iterator[ContactBundle]:
+    """Parcourt tous les contacts par id croissant avec l'ensemble de leurs données.
+    Les lignes sont lues par paquets de batch_size au fil de l'itération : la mémoire
+    utilisée ne dépend pas du nombre de contacts."""
+    c = connection_manager.connection().cursor()
+    c.arraysize = batch_size
+    c.execute(ALL_CONTACT_ROWS)
+    rows = (row for batch in iter(c.fetchmany, []) for row in batch)
+    for _, group in groupby(rows, key=itemgetter(0)):
+        contact, *details = group
+        if contact[1] != 0:
+            # Données rattachées à un contact supprimé
+            continue
+        by_kind = {1: [], 2: [], 3: [], 4: []}
+        for _, kind, id_, tag, value, *_ in details:
+            by_kind[kind].append((id_, tag, value))
+        yield ContactBundle(*contact[2:],
+                            groups=tuple(tag for _, tag, _ in by_kind[1]),
+                            phones=tuple(by_kind[2]),
+                            mails=tuple(by_kind[3]),
+                            addresses=tuple(by_kind[4]))
+
 ##############
 #   UPDATE   #
 ##############
 
+@retry_on_busy
 def update_tag(**kwargs):
     """Remplacement de l'intitulé d'un tag."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""UPDATE tag SET tag=:tag 
-                 WHERE id=:id_""", kwargs)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("""UPDATE tag SET tag=:tag 
+                     WHERE id=:id_""", kwargs)
+        connection_manager.after_commit(partial(tag_cache.rename, kwargs["id_"], kwargs["tag"]))
+        notify("tag", kwargs["id_"], UPDATE)
 
 
+@retry_on_busy
 def update_contact(**kwargs):
     """Modification d'un contact hormis 'profile_picture'."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute("""UPDATE contact SET firstname=:firstname, 
-                                    lastname=:lastname, 
-                                    birthday=:birthday, 
-                                    company=:company, 
-                                    job=:job 
-                 WHERE contact.id=:id_contact""", kwargs)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("""UPDATE contact SET firstname=:firstname, 
+                                        lastname=:lastname, 
+                                        birthday=:birthday, 
+                                        company=:company, 
+                                        job=:job 
+                     WHERE contact.id=:id_contact""", kwargs)
+        notify("contact", kwargs["id_contact"], UPDATE, kwargs["id_contact"])
 
 
+@retry_on_busy
 def update_number_phone(number: str, id_tag: int, id_phone: int):
     """Modification d'un numéro de téléphone et du tag associé."""
-    conn = sqlite3.connect(DATA_FILE)
     d = {'number': number, 'id_tag': id_tag, 'id_phone': id_phone}
-    c = conn.cursor()
-    c.execute("UPDATE phone SET number=:number, tag_id=:id_tag WHERE phone.id=:id_phone", d)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("UPDATE phone SET number=:number, tag_id=:id_tag WHERE phone.id=:id_phone", d)
+        notify("phone", id_phone, UPDATE)
 
 
+@retry_on_busy
 def update_mail(mail: str, id_tag: int, id_mail: int):
     """Modification d'un mail et du tag associé."""
-    conn = sqlite3.connect(DATA_FILE)
     d = {'mail': mail, 'id_tag': id_tag, 'id_mail': id_mail}
-    c = conn.cursor()
-    c.execute("UPDATE mail SET mail=:mail, tag_id=:id_tag WHERE mail.id=:id_mail", d)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("UPDATE mail SET mail=:mail, tag_id=:id_tag WHERE mail.id=:id_mail", d)
+        notify("mail", id_mail, UPDATE)
 
 
+@retry_on_busy
 def update_address(address: str, id_tag: int, id_address: int):
     """Modification d'une adresse et du tag associé."""
-    conn = sqlite3.connect(DATA_FILE)
     d = {'address': address, 'id_tag': id_tag, 'id_address': id_address}
-    c = conn.cursor()
-    c.execute("UPDATE address SET address=:address, tag_id=:id_tag WHERE address.id=:id_address", d)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("UPDATE address SET address=:address, tag_id=:id_tag WHERE address.id=:id_address", d)
+        notify("address", id_address, UPDATE)
 
 
+@retry_on_busy
 def update_profil_picture(id_contact: int, filename: str):
     """Remplacement du nom de fichier pour la 'profile_picture' d'un contact."""
-    conn = sqlite3.connect(DATA_FILE)
     d = {'id': id_contact, 'pp': filename}
-    c = conn.cursor()
-    c.execute("UPDATE contact SET profile_picture=:pp WHERE id=:id", d)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute("UPDATE contact SET profile_picture=:pp WHERE id=:id", d)
+        notify("contact", id_contact, UPDATE, id_contact)
 
 ##############
 #   DELETE   #
 ##############
 
+@retry_on_busy
 def del_group_of_contact(id_contact: int, id_tag: int):
     """Suppression d'un groupe asssocié à un contact."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    values = {"contact_id": id_contact, "tag_id": id_tag}
-    c.execute("DELETE FROM group_ WHERE contact_id=:contact_id AND tag_id=:tag_id", values)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        values = {"contact_id": id_contact, "tag_id": id_tag}
+        c.execute("DELETE FROM group_ WHERE contact_id=:contact_id AND tag_id=:tag_id", values)
+        notify("group", None, DELETE, id_contact)
 
 
+@retry_on_busy
 def del_contact_by_id(id_contact: int):
     """Suppression d'un contact :
         - Suppression de tous les liens vers le contact dans les tables jointes.
         - Suppression du contact lui-même."""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    contact = {"contact_id": id_contact}
-    c.execute("DELETE FROM group_ WHERE contact_id=:contact_id", contact)
-    c.execute("DELETE FROM phone WHERE contact_id=:contact_id", contact)
-    c.execute("DELETE FROM address WHERE contact_id=:contact_id", contact)
-    c.execute("DELETE FROM mail WHERE contact_id=:contact_id", contact)
-    c.execute("DELETE FROM contact WHERE id=:contact_id", contact)
-    conn.commit()
-    conn.close()
-
-
+    with connection_manager.transaction() as c:
+        contact = {"contact_id": id_contact}
+        c.execute("DELETE FROM group_ WHERE contact_id=:contact_id", contact)
+        c.execute("DELETE FROM phone WHERE contact_id=:contact_id", contact)
+        c.execute("DELETE FROM address WHERE contact_id=:contact_id", contact)
+        c.execute("DELETE FROM mail WHERE contact_id=:contact_id", contact)
+        c.execute("DELETE FROM contact WHERE id=:contact_id", contact)
+        # Les lignes rattachées disparaissent avec le contact : une seule notification suffit
+        notify("contact", id_contact, DELETE, id_contact)
+
+
+@retry_on_busy
 def del_phone_by_id(id_phone: int):
     """Suppression d'un numéro de téléphone en fonction de son id"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    phone = {"phone_id": id_phone}
-    c.execute("DELETE FROM phone WHERE id=:phone_id", phone)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        phone = {"phone_id": id_phone}
+        c.execute("DELETE FROM phone WHERE id=:phone_id", phone)
+        notify("phone", id_phone, DELETE)
 
 
+@retry_on_busy
 def del_mail_by_id(id_mail: int):
     """Suppression d'un mail en fonction de son id"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    mail = {"mail_id": id_mail}
-    c.execute("DELETE FROM mail WHERE id=:mail_id", mail)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        mail = {"mail_id": id_mail}
+        c.execute("DELETE FROM mail WHERE id=:mail_id", mail)
+        notify("mail", id_mail, DELETE)
 
 
+@retry_on_busy
 def del_address_by_id(id_address: int):
     """Suppression d'une adresse en fonction de son id"""
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    address = {"address_id": id_address}
-    c.execute("DELETE FROM address WHERE id=:address_id", address)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        address = {"address_id": id_address}
+        c.execute("DELETE FROM address WHERE id=:address_id", address)
+        notify("address", id_address, DELETE)
 
 
+@retry_on_busy
 def del_tag_by_id(id_tag: int, category: str) -> bool:
     """Suppression d'un tag seulement s'il n'est pas associé."""
     link_table = {"group": "group_",
@@ -397,18 +782,17 @@ def del_tag_by_id(id_tag: int, category: str) -> bool:
                   "address": "address"}
     table = link_table[category]
 
-    conn = sqlite3.connect(DATA_FILE)
-    c = conn.cursor()
-    c.execute(f"""SELECT {table}.id 
-                  FROM {table} 
-                  WHERE {table}.tag_id={id_tag}""")
-    if c.fetchall():
-        return False
-
     tag = {"id": id_tag}
-    c.execute("DELETE FROM tag WHERE id=:id", tag)
-    conn.commit()
-    conn.close()
+    with connection_manager.transaction() as c:
+        c.execute(f"""SELECT {table}.id 
+                      FROM {table} 
+                      WHERE {table}.tag_id=:id""", tag)
+        if c.fetchall():
+            return False
+
+        c.execute("DELETE FROM tag WHERE id=:id", tag)
+        connection_manager.after_commit(partial(tag_cache.remove, id_tag))
+        notify("tag", id_tag, DELETE)
     return True
 
 
@@ -0,0 +1,257 @@
+"""Module gérant les connexions sqlite3 partagées par les fonctions CRUD du client.
+Chaque connexion est configurée par la section 'storage' de settings.json (voir DEFAULT_STORAGE)."""
+
+import atexit
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable
+
+from crm.api.utils import DATA_FILE, DEFAULT_STORAGE, settings
+
+# Nombre de requêtes préparées conservées en cache par connexion
+CACHED_STATEMENTS = 256
+# Valeurs acceptées par les paramètres textuels de la section storage
+STORAGE_CHOICES = {
+    "journal_mode": ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+}
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+# Nouvelles tentatives après une erreur 'database is locked' (voir retry_on_busy)
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 2.0
+# Codes d'erreur sqlite SQLITE_BUSY et SQLITE_LOCKED (codes étendus compris, voir is_busy)
+BUSY_ERROR_CODES = (5, 6)
+
+
+def storage_pragmas(storage: dict = None) -> list[str]:
+    """Retourne les instructions PRAGMA de la section storage du paramétrage, appliquées
+    à chaque connexion, sqlite3 comme QtSql (voir crm.window.sql).
+    Une valeur absente ou invalide est remplacée par celle de DEFAULT_STORAGE."""
+    if storage is None:
+        storage = settings.get("storage")
+    if not isinstance(storage, dict):
+        storage = {}
+    pragmas = []
+    # Le délai d'attente est appliqué en premier : le passage en WAL attend ainsi les autres connexions
+    for key in sorted(DEFAULT_STORAGE, key=lambda key: key != "busy_timeout_ms"):
+        default = DEFAULT_STORAGE[key]
+        value = storage.get(key, default)
+        if key in STORAGE_CHOICES:
+            value = str(value).upper()
+            if value not in STORAGE_CHOICES[key]:
+                value = default
+        elif isinstance(value, bool) or not isinstance(value, int):
+            value = default
+        pragmas.append(f"PRAGMA {key.removesuffix('_ms')} = {value}")
+    return pragmas
+
+
+class ConnectionManager:
+    """Fournit une connexion sqlite3 par thread, ouverte et configurée une seule fois
+    puis réutilisée à chaque appel."""
+    def __init__(self, database: Path):
+        self.database = database
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: dict[int, sqlite3.Connection] = {}
+        self._begin_callbacks: list[Callable[[sqlite3.Cursor], None]] = []
+        # Threads dont une transaction est ouverte : close_all refuse de fermer leur connexion
+        self._active: set[int] = set()
+        # Incrémenté par close_all : une connexion d'une génération précédente a été fermée
+        self._generation = 0
+        self.metrics = {"opened": 0, "reused": 0, "closed": 0, "checkpoints": 0,
+                        "lock_wait_s": 0.0, "busy_retries": 0, "busy_failures": 0, "retry_wait_s": 0.0}
+
+    def open(self, database: Path):
+        """Change de fichier de base de données. Les connexions existantes sont fermées."""
+        self.close_all()
+        self.database = database
+
+    def connection(self) -> sqlite3.Connection:
+        """Retourne la connexion du thread courant, créée si nécessaire."""
+        conn = getattr(self._local, "connection", None)
+        if conn is not None and self._local.generation == self._generation:
+            with self._lock:
+                self.metrics["reused"] += 1
+            return conn
+
+        # Chaque connexion n'est utilisée que par son thread : la vérification de sqlite3
+        # est désactivée pour permettre à close_all de les fermer depuis n'importe quel thread
+        conn = sqlite3.connect(self.database, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+        self.configure(conn)
+        self._local.connection = conn
+        with self._lock:
+            self._local.generation = self._generation
+            self._connections[threading.get_ident()] = conn
+            self.metrics["opened"] += 1
+        return conn
+
+    @staticmethod
+    def configure(conn: sqlite3.Connection):
+        """Paramètrage appliqué une seule fois à l'ouverture d'une connexion."""
+        for pragma in storage_pragmas():
+            conn.execute(pragma)
+
+    @contextmanager
+    def transaction(self, immediate: bool = True):
+        """Ouvre une transaction sur la connexion du thread courant et retourne un curseur.
+        Validation à la sortie, annulation en cas d'exception.
+        La transaction est ouverte explicitement afin d'y inclure aussi les instructions DDL.
+        Imbriquée dans une transaction déjà ouverte, elle s'y intègre : seule la plus
+        externe valide ou annule.
+        Par défaut, le verrou d'écriture est pris dès l'ouverture (BEGIN IMMEDIATE) : l'attente
+        d'un autre écrivain a lieu à ce moment, sous busy_timeout, et jamais au milieu de la
+        transaction. Les transactions de lecture seule passent immediate=False."""
+        depth = getattr(self._local, "depth", 0)
+        if not depth:
+            # Déclarée avant d'obtenir la connexion : close_all ne peut plus la fermer
+            with self._lock:
+                self._active.add(threading.get_ident())
+        self._local.depth = depth + 1
+        try:
+            conn = self.connection()
+            if depth:
+                yield conn.cursor()
+                return
+            self._local.pending = []
+            with conn:
+                start = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+                self.add_metric("lock_wait_s", time.perf_counter() - start)
+                for callback in self._begin_callbacks:
+                    callback(conn.cursor())
+                yield conn.cursor()
+            callbacks, self._local.pending = self._local.pending, []
+        finally:
+            self._local.depth = depth
+            if not depth:
+                with self._lock:
+                    self._active.discard(threading.get_ident())
+        for callback in callbacks:
+            callback()
+
+    def add_metric(self, name: str, value: float = 1):
+        with self._lock:
+            self.metrics[name] += value
+
+    def on_begin(self, callback: Callable[[sqlite3.Cursor], None]):
+        """Exécute callback à l'ouverture de chaque transaction (la plus externe), avant ses instructions."""
+        self._begin_callbacks.append(callback)
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Exécute callback une fois la transaction en cours validée.
+        Il est abandonné si elle est annulée, et exécuté immédiatement hors transaction."""
+        if self.in_transaction():
+            self._local.pending.append(callback)
+        else:
+            callback()
+
+    def in_transaction(self) -> bool:
+        """Indique si une transaction est ouverte dans le thread courant."""
+        return getattr(self._local, "depth", 0) > 0
+
+    def checkpoint(self, mode: str = "PASSIVE") -> tuple[int, int, int] | None:
+        """Reporte dans la base les pages du journal WAL.
+        PASSIVE, utilisé automatiquement par sqlite (wal_autocheckpoint), n'attend ni les lectures
+        ni l'écriture en cours. TRUNCATE attend la fin des lectures puis vide le journal : il est
+        réservé aux moments où l'application est inactive (fermeture, maintenance).
+        Retourne (bloqué, pages du journal, pages reportées), ou None si la base n'est pas en WAL."""
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Mode de checkpoint inconnu : {mode}")
+        conn = self.connection()
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+            return None
+        result = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        with self._lock:
+            self.metrics["checkpoints"] += 1
+        return result
+
+    def close(self):
+        """Ferme la connexion du thread courant, hors transaction."""
+        if self.in_transaction():
+            raise RuntimeError("Fermeture de la connexion impossible : une transaction est en cours")
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            return
+        self._local.connection = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+            self.metrics["closed"] += 1
+        conn.close()
+
+    def close_all(self):
+        """Ferme toutes les connexions ouvertes, quel que soit le thread propriétaire.
+        Les threads qui les utilisent doivent être à l'arrêt (ex : DatabaseExecutor.shutdown) :
+        la fermeture est refusée tant qu'une transaction est ouverte dans l'un d'eux.
+        Leur état propre (connexion, transaction) n'est pas modifié : ils ouvriront une
+        nouvelle connexion à leur prochain appel."""
+        with self._lock:
+            if self._active:
+                raise RuntimeError(f"Fermeture des connexions impossible : {len(self._active)} "
+                                   f"transaction(s) en cours")
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._generation += 1
+            self.metrics["closed"] += len(connections)
+        if connections:
+            # Le journal est vidé lorsque plus aucune lecture n'est en cours : la base tient en un fichier
+            try:
+                connections[0].execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass
+        for conn in connections:
+            conn.close()
+
+    def stats(self) -> dict:
+        """Retourne les métriques de réutilisation des connexions."""
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["open"] = len(self._connections)
+        total = stats["opened"] + stats["reused"]
+        stats["reuse_ratio"] = stats["reused"] / total if total else 0.0
+        return stats
+
+
+connection_manager = ConnectionManager(DATA_FILE)
+atexit.register(connection_manager.close_all)
+
+
+def is_busy(error: sqlite3.Error) -> bool:
+    """Indique si l'erreur vient d'un verrou détenu par une autre connexion."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in BUSY_ERROR_CODES
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def retry_on_busy(func: Callable) -> Callable:
+    """Réexécute func lorsqu'elle échoue sur un verrou ('database is locked') : jusqu'à RETRY_ATTEMPTS
+    nouvelles tentatives, séparées d'un délai tiré au hasard sous un plafond qui double à chaque
+    fois (backoff exponentiel avec jitter), afin que les processus en conflit ne réessaient
+    pas ensemble.
+    Dans une transaction déjà ouverte, l'erreur est propagée sans nouvelle tentative :
+    seule la transaction entière peut être rejouée, par celui qui l'a ouverte."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(RETRY_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.Error as error:
+                if not is_busy(error) or connection_manager.in_transaction():
+                    raise
+                if attempt == RETRY_ATTEMPTS:
+                    connection_manager.add_metric("busy_failures")
+                    raise
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            connection_manager.add_metric("busy_retries")
+            connection_manager.add_metric("retry_wait_s", delay)
+            time.sleep(delay)
+    return wrapper
@@ -0,0 +1,137 @@
+"""Module diffusant les modifications validées en base aux parties de l'application qui les affichent.
+Les fonctions d'écriture du client publient un Change par ligne modifiée, une fois la transaction
+validée : une vue ne met à jour que les lignes concernées, sans relire toute la table."""
+
+import secrets
+import sqlite3
+import threading
+from functools import partial
+from typing import Callable, NamedTuple
+
+from crm.database.connection import connection_manager
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+# Identifie les lignes de change_journal écrites par ce processus (voir notify et crm.database.watcher)
+ORIGIN = secrets.randbits(62)
+
+# Journal des lignes modifiées, alimenté par des triggers quelle que soit la connexion qui écrit.
+# origin reste NULL tant que le processus auteur ne l'a pas revendiquée : écriture externe (CLI, sqlite3...).
+JOURNAL = """
+    CREATE TABLE IF NOT EXISTS change_journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity TEXT NOT NULL,
+        row_id INTEGER,
+        operation TEXT NOT NULL,
+        contact_id INTEGER,
+        origin INTEGER
+    );
+"""
+JOURNAL_UNCLAIMED = """
+    CREATE INDEX IF NOT EXISTS change_journal_unclaimed ON change_journal (seq) WHERE origin IS NULL
+"""
+# Seules les lignes écrites depuis l'ouverture de la transaction sont revendiquées : celles validées
+# auparavant par d'autres processus, pas encore relevées par le watcher, restent à publier
+CLAIM_JOURNAL = "UPDATE change_journal SET origin = :origin WHERE origin IS NULL AND seq > :start"
+JOURNAL_START = "SELECT COALESCE(MAX(seq), 0) FROM change_journal"
+# Écriture en masse (voir paused_search_index) : une seule ligne, toutes les tables sont à relire
+JOURNAL_BULK = "INSERT INTO change_journal (entity, operation, origin) VALUES ('*', 'update', :origin)"
+
+JOURNAL_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+    WHEN NOT EXISTS (SELECT 1 FROM search_index_paused) BEGIN
+        INSERT INTO change_journal (entity, row_id, operation, contact_id)
+        VALUES ('{entity}', {row}.id, '{operation}', {contact_id});
+    END;
+"""
+
+
+class Change(NamedTuple):
+    """Modification d'une ligne de la table entity ('contact', 'phone', 'mail', 'address', 'group', 'tag').
+    id vaut None après une écriture en masse : toutes les lignes de entity sont à relire.
+    contact_id est le contact auquel la ligne est rattachée, s'il est connu."""
+    entity: str
+    id: int | None
+    operation: str
+    contact_id: int | None = None
+
+
+class ChangeBus:
+    """Liste d'abonnés appelés pour chaque modification, dans le thread qui l'a validée."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: list[Callable[[Change], None]] = []
+        self.metrics = {"published": 0}
+
+    def subscribe(self, callback: Callable[[Change], None]) -> Callable[[], None]:
+        """Abonne callback aux modifications. Retourne la fonction qui le désabonne."""
+        with self._lock:
+            self._subscribers.append(callback)
+        return partial(self.unsubscribe, callback)
+
+    def unsubscribe(self, callback: Callable[[Change], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, change: Change):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.metrics["published"] += 1
+        for callback in subscribers:
+            callback(change)
+
+
+change_bus = ChangeBus()
+# Dernier numéro de change_journal à l'ouverture de la transaction en cours, par thread
+_journal = threading.local()
+
+
+def journal_triggers() -> dict[str, str]:
+    """Retourne, par nom, les triggers alimentant change_journal.
+    Comme ceux de l'index de recherche, ils sont suspendus pendant les écritures en masse."""
+    triggers = {}
+    for table in ("contact", "phone", "mail", "address", "group_", "tag"):
+        entity = table.rstrip("_")
+        for event, operation, row in (("INSERT", INSERT, "NEW"), ("UPDATE", UPDATE, "NEW"), ("DELETE", DELETE, "OLD")):
+            name = f"change_journal_{entity}_{event[0].lower()}"
+            contact_id = {"contact": f"{row}.id", "tag": "NULL"}.get(table, f"{row}.contact_id")
+            triggers[name] = JOURNAL_TRIGGER.format(name=name, event=event, table=table, entity=entity,
+                                                    row=row, operation=operation, contact_id=contact_id)
+    return triggers
+
+
+def mark_journal_start(c: sqlite3.Cursor):
+    """Retient le dernier numéro de change_journal à l'ouverture d'une transaction.
+    Une transaction qui écrit détient le verrou d'écriture : les lignes suivantes sont les siennes."""
+    try:
+        _journal.start = c.execute(JOURNAL_START).fetchone()[0]
+    except sqlite3.OperationalError as error:
+        # Base pas encore migrée (voir crm.database.migrations)
+        if "no such table" not in str(error):
+            raise
+        _journal.start = 0
+
+
+def claim_journal():
+    """Attribue à ce processus les lignes de change_journal écrites par la transaction en cours :
+    elles sont déjà publiées par notify, le watcher ne les publiera pas une seconde fois."""
+    try:
+        connection_manager.connection().execute(CLAIM_JOURNAL, {"origin": ORIGIN, "start": _journal.start})
+    except sqlite3.OperationalError as error:
+        # Base pas encore migrée (voir crm.database.migrations)
+        if "no such table" not in str(error):
+            raise
+
+
+connection_manager.on_begin(mark_journal_start)
+
+
+def notify(entity: str, id_: int | None, operation: str, contact_id: int | None = None):
+    """Publie la modification une fois la transaction en cours validée.
+    Elle n'est pas publiée si la transaction est annulée."""
+    if connection_manager.in_transaction():
+        claim_journal()
+    connection_manager.after_commit(partial(change_bus.publish, Change(entity, id_, operation, contact_id)))
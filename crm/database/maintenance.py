@@ -0,0 +1,42 @@
+"""Module regroupant les opérations de maintenance de la base de données."""
+
+from pathlib import Path
+
+from crm.database.connection import connection_manager
+from crm.database.watcher import prune_change_journal
+
+TABLES = ("contact", "phone", "mail", "address", "group_", "tag")
+
+
+def database_stats() -> dict:
+    """Retourne le nombre de lignes de chaque table et l'occupation du fichier de la base."""
+    c = connection_manager.connection().cursor()
+    stats = {"database": str(connection_manager.database)}
+    for table in TABLES:
+        c.execute(f"SELECT COUNT(*) FROM {table}")
+        stats[table] = c.fetchone()[0]
+    for pragma in ("user_version", "page_size", "page_count", "freelist_count", "journal_mode"):
+        c.execute(f"PRAGMA {pragma}")
+        stats[pragma] = c.fetchone()[0]
+    path = Path(connection_manager.database)
+    stats["size_bytes"] = path.stat().st_size
+    wal = path.with_name(path.name + "-wal")
+    stats["wal_bytes"] = wal.stat().st_size if wal.exists() else 0
+    return stats
+
+
+def vacuum() -> tuple[int, int]:
+    """Élague le journal des modifications, compacte l'index de recherche et le fichier de la base,
+    vide le journal WAL puis met à jour les statistiques de l'optimiseur.
+    Retourne la taille du fichier avant et après."""
+    path = Path(connection_manager.database)
+    before = path.stat().st_size
+    prune_change_journal()
+    with connection_manager.transaction() as c:
+        c.execute("INSERT INTO contact_search (contact_search) VALUES ('optimize')")
+    conn = connection_manager.connection()
+    # VACUUM ne peut pas être exécuté dans une transaction
+    conn.execute("VACUUM")
+    connection_manager.checkpoint("TRUNCATE")
+    conn.execute("PRAGMA optimize")
+    return before, path.stat().st_size
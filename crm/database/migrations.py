@@ -0,0 +1,106 @@
+"""Module gérant les évolutions du schéma de la base de données.
+La version du schéma est conservée dans PRAGMA user_version."""
+
+import sqlite3
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, NamedTuple
+
+from crm.database.client import SEARCH, SEARCH_PAUSED, INDEX_SEARCH, search_triggers, init_database_structure, \
+    init_database_tag
+from crm.database.connection import connection_manager
+from crm.database.events import JOURNAL, JOURNAL_UNCLAIMED, journal_triggers
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+
+def add_search_index(c: sqlite3.Cursor):
+    """Création de l'index de recherche plein texte, de ses triggers et alimentation."""
+    c.execute(SEARCH)
+    c.execute(SEARCH_PAUSED)
+    for trigger in search_triggers().values():
+        c.execute(trigger)
+    c.execute("DELETE FROM contact_search")
+    c.execute(INDEX_SEARCH.format(ids="SELECT id FROM contact"))
+
+
+def add_secondary_indexes(c: sqlite3.Cursor):
+    """Création des index sur les clés étrangères et sur la catégorie des tags."""
+    c.execute("CREATE INDEX IF NOT EXISTS phone_contact_id ON phone (contact_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS phone_tag_id ON phone (tag_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS mail_contact_id ON mail (contact_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS mail_tag_id ON mail (tag_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS address_contact_id ON address (contact_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS address_tag_id ON address (tag_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS group_contact_id_tag_id ON group_ (contact_id, tag_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS group_tag_id ON group_ (tag_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS tag_category ON tag (category)")
+
+
+def add_contact_sort_indexes(c: sqlite3.Cursor):
+    """Création des index utilisés pour trier et paginer la liste des contacts."""
+    c.execute("CREATE INDEX IF NOT EXISTS contact_firstname ON contact (IFNULL(firstname, ''))")
+    c.execute("CREATE INDEX IF NOT EXISTS contact_lastname ON contact (IFNULL(lastname, ''))")
+
+
+def add_search_index_pause(c: sqlite3.Cursor):
+    """Recréation des triggers de l'index de recherche afin qu'ils puissent être suspendus
+    pendant les écritures en masse."""
+    c.execute(SEARCH_PAUSED)
+    for name, trigger in search_triggers().items():
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(trigger)
+
+
+def add_change_journal(c: sqlite3.Cursor):
+    """Création du journal des modifications lu par le watcher des autres instances, et de ses triggers."""
+    c.execute(JOURNAL)
+    c.execute(JOURNAL_UNCLAIMED)
+    for trigger in journal_triggers().values():
+        c.execute(trigger)
+
+
+# Migrations appliquées dans l'ordre. Chacune doit pouvoir être rejouée sans effet de bord.
+MIGRATIONS = (
+    Migration(1, "Index de recherche plein texte", add_search_index),
+    Migration(2, "Index secondaires", add_secondary_indexes),
+    Migration(3, "Index de tri des contacts", add_contact_sort_indexes),
+    Migration(4, "Suspension de l'index de recherche", add_search_index_pause),
+    Migration(5, "Journal des modifications", add_change_journal),
+)
+
+
+def get_schema_version() -> int:
+    """Retourne la version actuelle du schéma de la base de données."""
+    c = connection_manager.connection().cursor()
+    c.execute("PRAGMA user_version")
+    return c.fetchone()[0]
+
+
+def migrate() -> list[tuple[Migration, float]]:
+    """Applique les migrations manquantes, chacune dans sa propre transaction.
+    Retourne les migrations appliquées avec leur durée en secondes."""
+    version = get_schema_version()
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        start = perf_counter()
+        with connection_manager.transaction() as c:
+            migration.apply(c)
+            c.execute(f"PRAGMA user_version = {migration.version}")
+        applied.append((migration, perf_counter() - start))
+    return applied
+
+
+def check_database() -> list[tuple[Migration, float]]:
+    """Crée la base de données avec les tags par défaut si son fichier n'existe pas,
+    puis applique les migrations manquantes. Retourne les migrations appliquées."""
+    if not Path(connection_manager.database).exists():
+        init_database_structure()
+        init_database_tag()
+    return migrate()
@@ -0,0 +1,124 @@
+"""Module détectant les modifications validées par un autre processus (seconde instance, CLI, sqlite3...).
+PRAGMA data_version ne change que lorsqu'une autre connexion a validé une transaction : tant qu'il
+est inchangé, un relevé ne lit rien d'autre. Sinon les nouvelles lignes de change_journal indiquent
+les lignes modifiées. Celles écrites par ce processus, déjà publiées par notify, sont ignorées ;
+les autres sont publiées sur change_bus comme des modifications locales."""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+from crm.database.cache import tag_cache
+from crm.database.connection import connection_manager, is_busy, retry_on_busy
+from crm.database.events import ORIGIN, UPDATE, Change, change_bus
+
+# Au-delà, les modifications d'une table sont publiées comme une écriture en masse (id None)
+BULK_THRESHOLD = 200
+# Nombre de lignes conservées dans change_journal par prune_change_journal
+JOURNAL_KEEP = 10_000
+ENTITIES = ("contact", "phone", "mail", "address", "group", "tag")
+
+
+class ChangeWatcher:
+    """Relève les modifications des autres processus depuis le relevé précédent.
+    read peut être appelée depuis n'importe quel thread (ex : DatabaseExecutor) ; publish
+    diffuse ensuite les modifications relevées, depuis le thread de leurs abonnés."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._database: Path | None = None
+        # PRAGMA data_version est propre à chaque connexion : dernière valeur lue par thread
+        self._data_versions: dict[int, int] = {}
+        self._last_seq = 0
+        self.metrics = {"polls": 0, "reads": 0, "published": 0, "skipped": 0, "lost": 0}
+
+    def reset(self):
+        """Ignore les modifications passées : seules celles validées après l'appel seront publiées."""
+        conn = connection_manager.connection()
+        with self._lock:
+            self._database = connection_manager.database
+            self._data_versions = {threading.get_ident(): conn.execute("PRAGMA data_version").fetchone()[0]}
+            self._last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_journal").fetchone()[0]
+
+    def poll(self) -> list[Change]:
+        """Relève puis publie, dans le thread appelant, les modifications des autres processus."""
+        return self.publish(self.read())
+
+    def publish(self, changes: list[Change]) -> list[Change]:
+        """Publie sur change_bus les modifications relevées par read, et les retourne."""
+        with self._lock:
+            self.metrics["published"] += len(changes)
+        for change in changes:
+            change_bus.publish(change)
+        return changes
+
+    def read(self) -> list[Change]:
+        """Retourne les modifications validées par d'autres processus depuis le relevé précédent.
+        Une base verrouillée reporte le relevé au suivant."""
+        try:
+            return self._read()
+        except sqlite3.Error as error:
+            if not is_busy(error):
+                raise
+            return []
+
+    def _read(self) -> list[Change]:
+        if self._database != connection_manager.database:
+            self.reset()
+            return []
+        conn = connection_manager.connection()
+        with self._lock:
+            self.metrics["polls"] += 1
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._data_versions.get(threading.get_ident()) == data_version:
+                return []
+            self._data_versions[threading.get_ident()] = data_version
+            self.metrics["reads"] += 1
+            rows = conn.execute("""SELECT seq, entity, row_id, operation, contact_id, origin
+                                   FROM change_journal WHERE seq > ? ORDER BY seq""",
+                                (self._last_seq,)).fetchall()
+            if not rows:
+                return []
+            # Le journal est élagué (prune_change_journal) : des modifications ont pu être perdues
+            lost = rows[0][0] != self._last_seq + 1
+            self._last_seq = rows[-1][0]
+
+            changes = {}
+            for _, entity, row_id, operation, contact_id, origin in rows:
+                if origin == ORIGIN:
+                    self.metrics["skipped"] += 1
+                    continue
+                changes.setdefault(entity, []).append(Change(entity, row_id, operation, contact_id))
+            if lost:
+                self.metrics["lost"] += 1
+                changes["*"] = []
+        return self.collapse(changes)
+
+    @staticmethod
+    def collapse(changes: dict[str, list[Change]]) -> list[Change]:
+        """Remplace les modifications trop nombreuses d'une table par une écriture en masse.
+        L'entité '*' (écriture en masse, voir JOURNAL_BULK) fait relire toutes les tables."""
+        if "*" in changes:
+            tag_cache.invalidate()
+            return [Change(entity, None, UPDATE) for entity in ENTITIES]
+        if "tag" in changes:
+            # Le catalogue des tags n'est tenu à jour que par les écritures de ce processus
+            tag_cache.invalidate()
+        collapsed = []
+        for entity, entity_changes in changes.items():
+            if len(entity_changes) > BULK_THRESHOLD:
+                collapsed.append(Change(entity, None, UPDATE))
+            else:
+                collapsed.extend(entity_changes)
+        return collapsed
+
+
+@retry_on_busy
+def prune_change_journal(keep: int = JOURNAL_KEEP) -> int:
+    """Supprime les lignes les plus anciennes de change_journal pour n'en conserver que keep.
+    Retourne le nombre de lignes supprimées."""
+    with connection_manager.transaction() as c:
+        c.execute("DELETE FROM change_journal WHERE seq <= (SELECT MAX(seq) FROM change_journal) - ?", (keep,))
+        return c.rowcount
+
+
+change_watcher = ChangeWatcher()
@@ -0,0 +1,46 @@
+"""Module chronométrant les étapes du démarrage de l'interface graphique (python -m crm --profile-startup)."""
+
+import sys
+from time import perf_counter
+
+# Durée maximale acceptée entre le lancement de main() et le premier affichage de la fenêtre
+STARTUP_BUDGET_MS = 1500
+
+
+class StartupProfile:
+    """Enregistre la durée de chaque étape depuis la précédente.
+    Désactivé, mark ne fait rien : les appels peuvent rester dans le code."""
+    def __init__(self):
+        self.enabled = False
+        self.start = self.last = perf_counter()
+        self.steps: list[tuple[str, float]] = []
+
+    def enable(self):
+        self.enabled = True
+        self.start = self.last = perf_counter()
+        self.steps.clear()
+
+    def mark(self, step: str):
+        """Clôt l'étape step, commencée à la fin de la précédente."""
+        if not self.enabled:
+            return
+        now = perf_counter()
+        self.steps.append((step, now - self.last))
+        self.last = now
+
+    def total(self) -> float:
+        return self.last - self.start
+
+    def report(self, budget_ms: float = STARTUP_BUDGET_MS) -> bool:
+        """Affiche la durée de chaque étape et indique si le budget est respecté."""
+        width = max((len(step) for step, _ in self.steps), default=0)
+        for step, duration in self.steps:
+            print(f"{step:<{width}}  {duration * 1000:8.1f} ms", file=sys.stderr)
+        total_ms = self.total() * 1000
+        within_budget = total_ms <= budget_ms
+        print(f"{'Total':<{width}}  {total_ms:8.1f} ms (budget {budget_ms:.0f} ms"
+              f"{'' if within_budget else ', DÉPASSÉ'})", file=sys.stderr)
+        return within_budget
+
+
+startup_profile = StartupProfile()
@@ -0,0 +1,99 @@
+"""Module générant en mémoire les photos de profil rondes affichées par ProfilePicture."""
+
+from collections import OrderedDict
+from pathlib import Path
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QImage, QPainter, QPainterPath, QPixmap
+
+AVATAR_SIZE = 128
+# Mémoire maximale occupée par les avatars conservés (un avatar de 128 px occupe 64 Kio)
+AVATAR_CACHE_BYTES = 16 * 1024 * 1024
+
+
+def render_avatar(path_image: Path, background: QColor, size: int = AVATAR_SIZE) -> QImage:
+    """Compose en une seule fois l'avatar rond : fond uni de la couleur du thème,
+    portrait redimensionné et centré, le tout découpé par un cercle.
+    Retourne une QImage, utilisable en dehors du thread graphique."""
+    avatar = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    avatar.fill(Qt.transparent)
+    portrait = QImage(str(path_image))
+    if not portrait.isNull():
+        portrait = portrait.scaled(size, size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+
+    painter = QPainter(avatar)
+    painter.setRenderHint(QPainter.Antialiasing, True)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+    clip = QPainterPath()
+    clip.addEllipse(0, 0, size, size)
+    painter.setClipPath(clip)
+    painter.fillRect(avatar.rect(), background)
+    if not portrait.isNull():
+        painter.drawImage((size - portrait.width()) // 2, (size - portrait.height()) // 2, portrait)
+    painter.end()
+    return avatar
+
+
+def render_avatars(paths: list[Path], background: QColor) -> list[tuple[Path, QImage]]:
+    """Compose plusieurs avatars, en tâche de fond (voir AvatarCache.put)."""
+    return [(path_image, render_avatar(path_image, background)) for path_image in paths]
+
+
+class AvatarCache:
+    """Avatars déjà composés, par (image, couleur du thème), du moins récemment affiché
+    au plus récent. Les plus anciens sont oubliés au-delà de max_bytes :
+    réafficher une photo récente ne lit plus le disque."""
+    def __init__(self, max_bytes: int = AVATAR_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.pixmaps: OrderedDict[tuple[str, str], QPixmap] = OrderedDict()
+        self.metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def key(path_image: Path, background: QColor) -> tuple[str, str]:
+        return str(path_image), background.name()
+
+    @staticmethod
+    def size_of(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self.pixmaps
+
+    def get(self, path_image: Path, background: QColor) -> QPixmap | None:
+        """Retourne l'avatar s'il est en mémoire, sans le composer."""
+        key = self.key(path_image, background)
+        if key not in self.pixmaps:
+            self.metrics["misses"] += 1
+            return None
+        self.metrics["hits"] += 1
+        self.pixmaps.move_to_end(key)
+        return self.pixmaps[key]
+
+    def put(self, path_image: Path, background: QColor, avatar: QImage) -> QPixmap:
+        """Conserve un avatar composé par render_avatar. La conversion en QPixmap
+        doit avoir lieu dans le thread graphique."""
+        key = self.key(path_image, background)
+        if key in self.pixmaps:
+            self.bytes -= self.size_of(self.pixmaps.pop(key))
+        pixmap = QPixmap.fromImage(avatar)
+        self.pixmaps[key] = pixmap
+        self.bytes += self.size_of(pixmap)
+        while self.bytes > self.max_bytes and len(self.pixmaps) > 1:
+            _, evicted = self.pixmaps.popitem(last=False)
+            self.bytes -= self.size_of(evicted)
+            self.metrics["evictions"] += 1
+        return pixmap
+
+    def render(self, path_image: Path, background: QColor) -> QPixmap:
+        """Retourne l'avatar, composé immédiatement s'il n'est pas en mémoire (thread graphique)."""
+        pixmap = self.get(path_image, background)
+        if pixmap is None:
+            pixmap = self.put(path_image, background, render_avatar(path_image, background))
+        return pixmap
+
+    def stats(self) -> dict:
+        return dict(self.metrics, entries=len(self.pixmaps), bytes=self.bytes, max_bytes=self.max_bytes)
+
+
+avatar_cache = AvatarCache()
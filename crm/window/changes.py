@@ -0,0 +1,20 @@
+"""Module relayant les modifications de la base (crm.database.events) vers le thread graphique."""
+
+from PySide6.QtCore import QObject, Signal
+
+from crm.database.events import change_bus
+
+
+class ChangeRelay(QObject):
+    """Émet changed pour chaque Change publié par change_bus.
+    Les modifications validées par les threads de DatabaseExecutor sont reçues
+    par les slots connectés dans le thread graphique."""
+    changed = Signal(object)
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+        self.unsubscribe = change_bus.subscribe(self.changed.emit)
+
+    def close(self):
+        """Cesse de relayer les modifications."""
+        self.unsubscribe()
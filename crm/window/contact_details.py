@@ -4,17 +4,20 @@ d'ajout ou modification d'un contact."""
 from datetime import datetime
 from functools import partial
 
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap, QIcon
-from PySide6.QtSql import QSqlDatabase, QSqlQueryModel
+from PySide6.QtSql import QSqlQueryModel
 from PySide6.QtWidgets import QWidget, QGridLayout, QLineEdit, QLabel, QDataWidgetMapper, QDateEdit, \
     QPushButton, QVBoxLayout, QHBoxLayout, QSpacerItem, QSizePolicy, QListWidget, QMessageBox
 
-from crm.api.utils import DATA_FILE, RESOURCE_DIR
+from crm.api.utils import RESOURCE_DIR
 from crm.window.list_item import CustomListWidgetItem
 from crm.database.client import get_tag_to_category_group, get_tag_to_category_group_by_contact, \
-    add_tag_group_at_contact, del_group_of_contact, update_contact, add_contact, add_tag
+    add_tag_groups_bulk, del_group_of_contact, update_contact, add_contact, add_tag, unit_of_work
+from crm.window.dialogs import submit_from
+from crm.window.executor import DatabaseExecutor
 from crm.window.input_tag import InputTag
+from crm.window.sql import qt_connections
 
 
 def change_etat_group(item: CustomListWidgetItem):
@@ -22,43 +25,76 @@ def change_etat_group(item: CustomListWidgetItem):
     item.change_etat()
 
 
+def save_contact(mode_action: str, id_contact: int, contact: dict, added: list[int], removed: list[int]) -> int:
+    """Enregistre le contact et ses groupes dans une seule transaction. Retourne l'id du contact.
+    Exécutée par DatabaseExecutor : ne reçoit que les valeurs lues dans la fenêtre."""
+    with unit_of_work():
+        if mode_action == "modify":
+            update_contact(id_contact=id_contact, **contact)
+        else:
+            id_contact = add_contact(**contact)
+        for id_tag in removed:
+            del_group_of_contact(id_contact, id_tag)
+        add_tag_groups_bulk([{"contact_id": id_contact, "tag_id": id_tag} for id_tag in added])
+    return id_contact
+
+
 # noinspection PyAttributeOutsideInit
 class DetailsContact(QWidget):
-    update_main_window = Signal()
-
     def __init__(self,
                  mode_action: str,
-                 id_contact: int = 0):
+                 id_contact: int = 0,
+                 executor: DatabaseExecutor = None):
         super().__init__()
 
-        self.id_contact = id_contact
-        self.mode_action = mode_action
+        # Les enregistrements sont exécutés en dehors du thread graphique
+        self.executor = DatabaseExecutor(self) if executor is None else executor
         self.connect_db()
         self.setup_model()
         self.setup_ui()
         self.setObjectName("tag")
-        if mode_action == "modify":
+        self.bind(mode_action, id_contact)
+
+    def bind(self, mode_action: str, id_contact: int = 0):
+        """Associe la fenêtre à un contact, sans reconstruire ses widgets :
+        la fenêtre est réutilisée d'une ouverture à l'autre (voir DialogPool)."""
+        self.id_contact = id_contact
+        self.mode_action = mode_action
+        self.model.setQuery(f"""
+            SELECT id, firstname, lastname, birthday, company, job 
+            FROM contact 
+            WHERE id={int(id_contact)}
+        """, db=self.db)
+        if self.mode_action == "modify":
+            self.mapper.addMapping(self.date_birthday, 3)
+            self.mapper.toFirst()
             self.setWindowTitle("Editer un contact")
         else:
+            self.mapper.removeMapping(self.date_birthday)
+            for line_edit in (self.le_firstname, self.le_lastname, self.le_company, self.le_job):
+                line_edit.clear()
+            self.date_birthday.setDate(datetime(year=1899, month=12, day=31))
             self.setWindowTitle("Ajouter un contact")
 
+        self.all_items = get_tag_to_category_group()
+        contact_items, self.contact_ids = get_tag_to_category_group_by_contact(self.id_contact)
+        self.lw_group.clear()
+        for tag, id_tag in self.all_items:
+            lw_item = CustomListWidgetItem(item=tag, idx=id_tag)
+            if tag in contact_items:
+                lw_item.checked
+            else:
+                lw_item.unchecked
+            self.lw_group.addItem(lw_item)
+
     def connect_db(self):
-        self.db = QSqlDatabase("QSQLITE")
-        self.db.setDatabaseName(str(DATA_FILE))
-        self.db.open()
+        self.db = qt_connections.database()
 
     def setup_model(self):
         self.model = QSqlQueryModel()
         self.mapper = QDataWidgetMapper()
         self.mapper.setModel(self.model)
 
-        query = f"""
-            SELECT id, firstname, lastname, birthday, company, job 
-            FROM contact 
-            WHERE id={self.id_contact}
-        """
-        self.model.setQuery(query, db=self.db)
-
     def setup_ui(self):
         self.create_widgets()
         self.modify_widgets()
@@ -80,27 +116,12 @@ class DetailsContact(QWidget):
     def modify_widgets(self):
         self.mapper.addMapping(self.le_firstname, 1)
         self.mapper.addMapping(self.le_lastname, 2)
-        if self.mode_action == "modify":
-            self.mapper.addMapping(self.date_birthday, 3)
-        else:
-            self.date_birthday.setDate(datetime(year=1899, month=12, day=31))
         self.mapper.addMapping(self.le_company, 4)
         self.mapper.addMapping(self.le_job, 5)
-        self.mapper.toFirst()
         self.lw_group.setObjectName("group")
         self.btn_new_tag.setIcon(QIcon(QPixmap(RESOURCE_DIR / "tag--plus.png")))
         self.btn_new_tag.setStyleSheet("QPushButton {min-width: 0px;}")
 
-        self.all_items = get_tag_to_category_group()
-        contact_items, self.contact_ids = get_tag_to_category_group_by_contact(self.id_contact)
-        for tag, id_tag in self.all_items:
-            lw_item = CustomListWidgetItem(item=tag, idx=id_tag)
-            if tag in contact_items:
-                lw_item.checked
-            else:
-                lw_item.unchecked
-            self.lw_group.addItem(lw_item)
-
     def create_layouts(self):
         self.main_layout = QVBoxLayout(self)
         self.contact_layout = QGridLayout()
@@ -152,39 +173,40 @@ class DetailsContact(QWidget):
         self.new_tag.show()
 
     def add_tag(self, category: str, new_tag: str):
-        id_ = add_tag(tag=new_tag, category=category)
+        request = submit_from(self, self.executor, add_tag, tag=new_tag, category=category)
+        request.finished.connect(partial(self.append_tag, new_tag))
+
+    def append_tag(self, new_tag: str, id_: int):
+        """Ajoute à la liste le tag enregistré par add_tag, coché."""
         self.all_items.append((new_tag, id_))
         lw_item = CustomListWidgetItem(item=new_tag, idx=id_)
         lw_item.checked
         self.lw_group.addItem(lw_item)
 
     def save_changes(self):
-        """Sauvegarde en bdd du contact après vérification"""
+        """Sauvegarde en bdd du contact après vérification.
+        La fenêtre est fermée une fois l'enregistrement terminé."""
         if not self.check_data():
             return
 
         date = datetime.strptime(self.date_birthday.text(), "%d/%m/%Y")
-        if self.mode_action == "modify":
-            update_contact(id_contact=self.id_contact,
-                           firstname=self.le_firstname.text().capitalize(),
-                           lastname=self.le_lastname.text().upper(),
-                           birthday=date.strftime("%Y-%m-%d"),
-                           company=self.le_company.text(),
-                           job=self.le_job.text())
-        else:
-            self.id_contact = add_contact(firstname=self.le_firstname.text().capitalize(),
-                                          lastname=self.le_lastname.text().upper(),
-                                          birthday=date.strftime("%Y-%m-%d"),
-                                          company=self.le_company.text(),
-                                          job=self.le_job.text())
-
+        contact = {"firstname": self.le_firstname.text().capitalize(),
+                   "lastname": self.le_lastname.text().upper(),
+                   "birthday": date.strftime("%Y-%m-%d"),
+                   "company": self.le_company.text(),
+                   "job": self.le_job.text()}
+        added, removed = [], []
         for item in [self.lw_group.item(i) for i in range(self.lw_group.count())]:
             if item.is_checked and item.id not in self.contact_ids:
-                add_tag_group_at_contact(self.id_contact, item.id)
+                added.append(item.id)
             elif not item.is_checked and item.id in self.contact_ids:
-                del_group_of_contact(self.id_contact, item.id)
-        # Emission à la fenêtre parente qu'une modification a eu lieu
-        self.update_main_window.emit()
+                removed.append(item.id)
+        request = submit_from(self, self.executor, save_contact, self.mode_action, self.id_contact,
+                              contact, added, removed)
+        request.finished.connect(self.end_save_changes)
+
+    def end_save_changes(self, id_contact: int):
+        self.id_contact = id_contact
         self.close()
 
     def check_data(self) -> bool:
@@ -0,0 +1,103 @@
+"""Module conservant les fenêtres de détails entre deux ouvertures.
+Chaque fenêtre est construite à sa première ouverture puis réassociée (bind) à l'enregistrement
+à modifier : les ouvertures suivantes ne recréent ni widgets, ni modèle, ni connexion."""
+
+from collections import deque
+from time import perf_counter
+from typing import Callable
+
+from PySide6.QtCore import QEvent, QObject, Qt
+from PySide6.QtWidgets import QWidget, QMessageBox
+
+from crm.window.executor import DatabaseExecutor, DatabaseRequest
+
+# Nombre de durées d'ouverture conservées par fenêtre
+LATENCY_SAMPLES = 100
+
+
+class VisibleTimer(QObject):
+    """Mesure la durée entre l'ouverture d'une fenêtre (start) et son premier affichage."""
+    def __init__(self, on_visible: Callable[[float], None], parent: QObject = None):
+        super().__init__(parent)
+        self.on_visible = on_visible
+        self.started: float | None = None
+
+    def start(self, started: float = None):
+        self.started = perf_counter() if started is None else started
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Paint and self.started is not None:
+            duration, self.started = perf_counter() - self.started, None
+            self.on_visible(duration)
+        return False
+
+
+def submit_from(dialog: QWidget, executor: DatabaseExecutor, func: Callable, *args, **kwargs) -> DatabaseRequest:
+    """Exécute func(*args, **kwargs) par executor en désactivant dialog jusqu'au résultat.
+    Un échec est signalé à l'utilisateur ; la fenêtre est alors réactivée pour corriger la saisie."""
+    dialog.setEnabled(False)
+    request = executor.submit(func, *args, **kwargs)
+    request.failed.connect(lambda error: QMessageBox.critical(dialog, "Enregistrement impossible",
+                                                              f"Opération interrompue : {error}"))
+    request.released.connect(lambda _: dialog.setEnabled(True))
+    return request
+
+
+class DialogPool:
+    """Fenêtres de détails par nom, construites une seule fois.
+    latencies conserve, par nom, les dernières durées entre l'appel à open et le premier affichage."""
+    def __init__(self):
+        self.dialogs: dict[str, QWidget] = {}
+        self.timers: dict[str, VisibleTimer] = {}
+        self.latencies: dict[str, deque[float]] = {}
+        self.metrics = {"built": 0, "reused": 0}
+
+    def prepare(self, name: str, factory: Callable[..., QWidget], *args, **kwargs) -> QWidget:
+        """Construit la fenêtre name sans l'afficher, si elle ne l'est pas déjà."""
+        if name not in self.dialogs:
+            dialog = factory(*args, **kwargs)
+            dialog.setWindowModality(Qt.ApplicationModal)
+            timer = VisibleTimer(self.latencies.setdefault(name, deque(maxlen=LATENCY_SAMPLES)).append)
+            dialog.installEventFilter(timer)
+            self.dialogs[name] = dialog
+            self.timers[name] = timer
+            self.metrics["built"] += 1
+        return self.dialogs[name]
+
+    def open(self, name: str, factory: Callable[..., QWidget], *args, **kwargs) -> QWidget:
+        """Affiche la fenêtre name associée à l'enregistrement décrit par args et kwargs.
+        Elle est construite par factory(*args, **kwargs) à la première ouverture,
+        puis réassociée par sa méthode bind(*args, **kwargs)."""
+        start = perf_counter()
+        if name in self.dialogs:
+            dialog = self.dialogs[name]
+            dialog.bind(*args, **kwargs)
+            self.metrics["reused"] += 1
+        else:
+            dialog = self.prepare(name, factory, *args, **kwargs)
+        self.timers[name].start(start)
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+        return dialog
+
+    def get(self, name: str) -> QWidget | None:
+        return self.dialogs.get(name)
+
+    def clear(self):
+        """Ferme toutes les fenêtres. Sans référence, elles sont détruites avec leurs modèles."""
+        for dialog in self.dialogs.values():
+            dialog.close()
+        self.dialogs.clear()
+        self.timers.clear()
+
+    def stats(self) -> dict:
+        """Retourne, par fenêtre, le nombre d'ouvertures mesurées et leurs durées en millisecondes."""
+        stats = dict(self.metrics)
+        for name, latencies in self.latencies.items():
+            timings = sorted(latency * 1000 for latency in latencies)
+            if timings:
+                stats[name] = {"samples": len(timings),
+                               "mean_ms": sum(timings) / len(timings),
+                               "max_ms": timings[-1]}
+        return stats
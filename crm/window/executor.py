@@ -0,0 +1,104 @@
+"""Module contenant l'exécuteur des appels à la base de données en dehors du thread graphique."""
+
+from typing import Any, Callable
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class DatabaseRequest(QObject):
+    """Appel au client de la base de données exécuté par un DatabaseExecutor.
+    finished et failed sont émis dans le thread graphique, sauf si la requête a été annulée."""
+    progressed = Signal(object)
+    finished = Signal(object)
+    failed = Signal(object)
+    released = Signal(object)
+    _done = Signal(bool, object)
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self._done.connect(self._deliver)
+
+    def cancel(self):
+        """Annule la requête : elle ne sera pas exécutée si elle ne l'est pas encore
+        et son résultat ne sera pas transmis."""
+        self.cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled
+
+    def _deliver(self, success: bool, result: Any):
+        """Transmission du résultat, dans le thread graphique."""
+        self.released.emit(self)
+        if self.cancelled:
+            return
+        if success:
+            self.finished.emit(result)
+        else:
+            self.failed.emit(result)
+
+
+class _Task(QRunnable):
+    """Exécution d'une DatabaseRequest dans un thread du pool."""
+    def __init__(self, request: DatabaseRequest):
+        super().__init__()
+        self.request = request
+
+    def run(self):
+        request = self.request
+        if request.is_cancelled():
+            # Rien à exécuter : le signal permet seulement de libérer la requête
+            request._done.emit(False, None)
+            return
+        try:
+            result = request.func(*request.args, **request.kwargs)
+        except Exception as error:
+            request._done.emit(False, error)
+        else:
+            request._done.emit(True, result)
+
+
+class DatabaseExecutor(QObject):
+    """Exécute les fonctions du client de la base de données dans un pool de threads.
+    Une requête soumise avec une clé annule la précédente requête de même clé
+    (ex : recherche remplacée par une saisie plus récente)."""
+    def __init__(self, parent: QObject = None, max_threads: int = 2):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # Les threads sont conservés afin de réutiliser leur connexion à la base de données
+        self.pool.setExpiryTimeout(-1)
+        self.latest: dict[str, DatabaseRequest] = {}
+        self.pending: set[DatabaseRequest] = set()
+
+    def submit(self, func: Callable, *args, key: str = None, reporting: bool = False, **kwargs) -> DatabaseRequest:
+        """Planifie l'appel func(*args, **kwargs) et retourne la requête correspondante.
+        Avec reporting, func reçoit aussi les arguments progress, relié au signal progressed
+        de la requête, et cancelled, indiquant si la requête a été annulée en cours d'exécution."""
+        if key:
+            self.cancel(key)
+        request = DatabaseRequest(func, args, kwargs)
+        if reporting:
+            kwargs.update(progress=request.progressed.emit, cancelled=request.is_cancelled)
+        if key:
+            self.latest[key] = request
+        # Référence conservée jusqu'à la transmission du résultat
+        self.pending.add(request)
+        request.released.connect(self.pending.discard)
+        self.pool.start(_Task(request))
+        return request
+
+    def cancel(self, key: str):
+        """Annule la dernière requête soumise avec cette clé."""
+        if request := self.latest.pop(key, None):
+            request.cancel()
+
+    def shutdown(self):
+        """Annule les requêtes en attente et attend la fin de celles en cours."""
+        for request in self.pending:
+            request.cancel()
+        self.pool.clear()
+        self.pool.waitForDone()
@@ -3,56 +3,67 @@ d'ajout ou modification d'un mail."""
 
 from functools import partial
 
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap, QIcon
-from PySide6.QtSql import QSqlDatabase, QSqlQueryModel
+from PySide6.QtSql import QSqlQueryModel
 from PySide6.QtWidgets import QWidget, QGridLayout, QLineEdit, QLabel, QDataWidgetMapper, QPushButton, \
     QVBoxLayout, QHBoxLayout, QComboBox, QSpacerItem, QSizePolicy, QMessageBox
 
-from crm.api.utils import DATA_FILE, check_mail_format, RESOURCE_DIR
+from crm.api.utils import check_mail_format, RESOURCE_DIR
 from crm.database.client import update_mail, get_tag_to_category_mail, add_mail, add_tag
+from crm.window.dialogs import submit_from
+from crm.window.executor import DatabaseExecutor
 from crm.window.input_tag import InputTag
+from crm.window.sql import qt_connections
 
 
 # noinspection PyAttributeOutsideInit
 class DetailsMail(QWidget):
-    update_main_window = Signal()
-
     def __init__(self,
                  id_mail: int,
                  mode_action: str,
-                 id_contact: int = 0):
+                 id_contact: int = 0,
+                 executor: DatabaseExecutor = None):
         super().__init__()
 
-        self.id_mail = id_mail
-        self.id_contact = id_contact
-        self.mode_action = mode_action
+        # Les enregistrements sont exécutés en dehors du thread graphique
+        self.executor = DatabaseExecutor(self) if executor is None else executor
         self.connect_db()
         self.setup_model()
         self.setup_ui()
         self.setObjectName("details")
         self.setMinimumWidth(350)
-        if mode_action == "modify":
+        self.bind(id_mail, mode_action, id_contact)
+
+    def bind(self, id_mail: int, mode_action: str, id_contact: int = 0):
+        """Associe la fenêtre à une adresse mail, sans reconstruire ses widgets :
+        la fenêtre est réutilisée d'une ouverture à l'autre (voir DialogPool)."""
+        self.id_mail = id_mail
+        self.id_contact = id_contact
+        self.mode_action = mode_action
+        self.model.setQuery(f"SELECT id, mail, tag_id FROM mail WHERE id={int(id_mail)}", db=self.db)
+        if self.mode_action == "modify":
+            self.mapper.toFirst()
+        else:
+            self.le_mail.clear()
+
+        self.tags, self.idx = get_tag_to_category_mail()
+        self.cbx_tag.clear()
+        self.cbx_tag.addItems(self.tags)
+        if self.mode_action == "modify":
+            self.cbx_tag.setCurrentText(self.tags[self.idx.index(self.model.record(0).value("tag_id"))])
             self.setWindowTitle("Modifier une adresse mail")
         else:
             self.setWindowTitle("Ajouter une adresse mail")
 
     def connect_db(self):
-        self.db = QSqlDatabase("QSQLITE")
-        self.db.setDatabaseName(str(DATA_FILE))
-        self.db.open()
+        self.db = qt_connections.database()
 
     def setup_model(self):
         self.model = QSqlQueryModel()
         self.mapper = QDataWidgetMapper()
         self.mapper.setModel(self.model)
 
-        query = f"""
-            SELECT id, mail, tag_id FROM mail
-            WHERE id={self.id_mail}
-        """
-        self.model.setQuery(query, db=self.db)
-
     def setup_ui(self):
         self.create_widgets()
         self.modify_widgets()
@@ -69,11 +80,6 @@ class DetailsMail(QWidget):
 
     def modify_widgets(self):
         self.mapper.addMapping(self.le_mail, 1)
-        self.mapper.toFirst()
-        self.tags, self.idx = get_tag_to_category_mail()
-        self.cbx_tag.addItems(self.tags)
-        if self.mode_action == "modify":
-            self.cbx_tag.setCurrentText(self.tags[self.idx.index(self.model.query().value(2))])
         self.cbx_tag.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
         self.cbx_tag.setObjectName("mail")
         self.btn_new_tag.setIcon(QIcon(QPixmap(RESOURCE_DIR / "tag--plus.png")))
@@ -113,7 +119,11 @@ class DetailsMail(QWidget):
         self.new_tag.show()
 
     def add_tag(self, category: str, new_tag: str):
-        id_ = add_tag(tag=new_tag, category=category)
+        request = submit_from(self, self.executor, add_tag, tag=new_tag, category=category)
+        request.finished.connect(partial(self.append_tag, new_tag))
+
+    def append_tag(self, new_tag: str, id_: int):
+        """Ajoute à la liste le tag enregistré par add_tag et le sélectionne."""
         self.tags.append(new_tag)
         self.idx.append(id_)
         self.cbx_tag.addItem(new_tag)
@@ -126,12 +136,12 @@ class DetailsMail(QWidget):
 
         id_tag = self.idx[self.tags.index(self.cbx_tag.currentText())]
         if self.mode_action == "modify":
-            update_mail(self.le_mail.text(), id_tag, self.id_mail)
+            request = submit_from(self, self.executor, update_mail, self.le_mail.text(), id_tag, self.id_mail)
         else:
-            add_mail(mail=self.le_mail.text(), contact_id=self.id_contact, tag_id=id_tag)
-        # Emission à la fenêtre parente qu'une modification a eu lieu
-        self.update_main_window.emit()
-        self.close()
+            request = submit_from(self, self.executor, add_mail, mail=self.le_mail.text(),
+                                  contact_id=self.id_contact, tag_id=id_tag)
+        # La fenêtre est fermée une fois l'enregistrement terminé
+        request.finished.connect(self.close)
 
     def validate_mail(self):
         """Vérification de la validité du mail renseigné"""
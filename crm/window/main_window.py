@@ -1,26 +1,38 @@
-import shutil
+"""Module contenant la fenêtre principale de l'application.
+Les fenêtres secondaires et les bibliothèques lourdes (PIL, QtSql) sont importées
+à leur première utilisation afin de ne pas ralentir le démarrage."""
+
 from datetime import datetime
 from functools import partial
 from pathlib import Path
 
-from PySide6.QtCore import QSize, QModelIndex, Qt, Signal, QSortFilterProxyModel
-from PySide6.QtGui import QPixmap, QPainter, QPainterPath, QPalette, QAction, QIcon, QKeySequence
-from PySide6.QtSql import QSqlDatabase, QSqlQueryModel
+from PySide6.QtCore import QSize, QModelIndex, Qt, Signal, QSortFilterProxyModel, QAbstractItemModel, QTimer
+from PySide6.QtGui import QPixmap, QPalette, QAction, QIcon, QKeySequence, QColor, QImage
 from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QTableView, QGridLayout, QHeaderView, QLineEdit, \
     QLabel, QAbstractItemView, QVBoxLayout, QFormLayout, QHBoxLayout, QMenuBar, QMenu, QPushButton, QMessageBox, \
-    QSpacerItem, QSizePolicy, QFileDialog
-from PIL import Image
-
-from crm.api.utils import DATA_FILE, RESOURCE_DIR, get_dark_style_sheet, update_theme_setting, get_light_style_sheet, \
-    get_age_from_birthday
-from crm.window.contact_details import DetailsContact
-from crm.window.phone_details import DetailsPhone
-from crm.window.mail_details import DetailsMail
-from crm.window.address_details import DetailsAddress
-from crm.window.tag import Tag
-from crm.window.about import About
-from crm.database.client import QUERY_PHONE, QUERY_MAIL, QUERY_ADDRESS, del_contact_by_id, del_address_by_id, \
-    del_mail_by_id, del_phone_by_id, update_profil_picture, get_contact_informations, get_contact_group
+    QSpacerItem, QSizePolicy, QFileDialog, QProgressDialog
+
+from crm.api.pictures import DEFAULT_PICTURE, ingest_picture, picture_path
+from crm.api.utils import RESOURCE_DIR, update_theme_setting, get_age_from_birthday
+from crm.startup import startup_profile
+from crm.window.avatar import AVATAR_SIZE, avatar_cache, render_avatar, render_avatars
+from crm.window.changes import ChangeRelay
+from crm.window.dialogs import DialogPool
+from crm.window.executor import DatabaseExecutor, DatabaseRequest
+from crm.window.search import SearchPipeline
+from crm.window.table_model import RowsTableModel, ContactTableModel
+from crm.window.theme import theme_engine
+from crm.database.client import del_contact_by_id, del_address_by_id, del_mail_by_id, del_phone_by_id, \
+    update_profil_picture, load_contact_bundle, get_contact_detail, ContactBundle
+from crm.database.events import Change, DELETE
+from crm.database.watcher import change_watcher
+
+# Nombre de lignes de part et d'autre du contact sélectionné dont la photo est préparée à l'avance
+PREFETCH_ROWS = 2
+# Délai regroupant les écritures en masse (import) en un seul rafraichissement (ms)
+BULK_REFRESH_DELAY = 200
+# Intervalle de relevé des modifications faites par les autres instances (ms)
+WATCH_INTERVAL = 1000
 
 column_titles = {
     "phone": "Téléphone",
@@ -29,58 +41,54 @@ column_titles = {
 }
 
 
-def create_background_picture(color: tuple[int]):
-    """Enregistre dans le dossier resources une image png de la couleur passé en paramètre."""
-    bg = Image.new('RGB', (128, 128), color)
-    bg.save(RESOURCE_DIR / "bg.png", 'PNG')
-
-
 class ProfilePicture(QLabel):
-    """Génére une image ronde dans un QLabel"""
+    """Affiche une photo de profil ronde dans un QLabel.
+    Les avatars sont composés en mémoire et conservés par avatar_cache."""
     doubleClicked = Signal()
 
     def __init__(self, path_image, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.setMaximumSize(128, 128)
-        self.setMinimumSize(128, 128)
-        self.radius = 64
-
-        self.setAutoFillBackground(True)
-        self.target = QPixmap(self.size())
-        self.target.fill(Qt.transparent)
-
-        self.set_image(path_image=path_image)
+        self.setMaximumSize(AVATAR_SIZE, AVATAR_SIZE)
+        self.setMinimumSize(AVATAR_SIZE, AVATAR_SIZE)
+        self.background = self.palette().color(QPalette.Window)
+        self.path_image = path_image
+        self.set_image(path_image)
 
     def set_image(self, path_image):
-        p = QPixmap(path_image).scaled(
-            128, 128, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
-
-        painter = QPainter(self.target)
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        """Affiche la photo path_image, composée immédiatement si elle n'est pas en mémoire."""
+        self.set_avatar(path_image, avatar_cache.render(path_image, self.background))
 
-        path = QPainterPath()
-        path.addRoundedRect(0, 0, self.width(), self.height(), self.radius, self.radius, Qt.AbsoluteSize)
+    def set_avatar(self, path_image, pixmap: QPixmap):
+        """Affiche l'avatar déjà composé de la photo path_image."""
+        self.path_image = path_image
+        self.setPixmap(pixmap)
 
-        painter.setClipPath(path)
-        painter.drawPixmap(0, 0, p)
-        self.setPixmap(self.target)
+    def set_background(self, color: QColor):
+        """Change la couleur de fond (celle du thème) et réaffiche la photo courante."""
+        self.background = color
+        self.set_image(self.path_image)
 
     def mouseDoubleClickEvent(self, ev):
         self.doubleClicked.emit()
 
 
 class CustomTableView(QTableView):
-    """Personnalisation des QTableView"""
+    """Personnalisation des QTableView.
+    Le tri est délégué au modèle s'il le réalise lui-même (sort_in_model),
+    sinon à un QSortFilterProxyModel."""
     def __init__(self,
                  name: str,
-                 model: QSqlQueryModel,
-                 header_stretch: str):
+                 model: QAbstractItemModel,
+                 header_stretch: str,
+                 sort_in_model: bool = False):
         super().__init__()
 
-        proxy_model = QSortFilterProxyModel()
-        proxy_model.setSourceModel(model)
-        self.setModel(proxy_model)
+        if sort_in_model:
+            self.setModel(model)
+        else:
+            proxy_model = QSortFilterProxyModel()
+            proxy_model.setSourceModel(model)
+            self.setModel(proxy_model)
         self.setSortingEnabled(True)
         self.sortByColumn(1, Qt.AscendingOrder)
         self.verticalHeader().setHidden(True)
@@ -137,33 +145,54 @@ class Crm(QMainWindow):
         super().__init__()
 
         self.parent = parent
-        self.theme = None
-        self.background_color = None
+        self.id_contact = None
+        self.contact_bundle: ContactBundle | None = None
         self.setMinimumSize(QSize(1024, 512))
-        self.connect_db()
+        self.executor = DatabaseExecutor(self)
+        # Les photos sont décodées à part pour ne pas retarder les requêtes à la base de données
+        self.avatar_executor = DatabaseExecutor(self, max_threads=1)
+        self.search_pipeline = SearchPipeline(self.executor, self)
+        self.change_relay = ChangeRelay(self)
+        self.dialog_pool = DialogPool()
+        self.change_relay.changed.connect(self.apply_change)
+        self.bulk_refresh = QTimer(self, singleShot=True, interval=BULK_REFRESH_DELAY)
+        self.bulk_refresh.timeout.connect(self.refresh_tv_contact)
+        # Les modifications des autres processus sont publiées par change_watcher, relayées par change_relay
+        change_watcher.reset()
+        self.watch_request: DatabaseRequest | None = None
+        self.watch_timer = QTimer(self, interval=WATCH_INTERVAL)
+        self.watch_timer.timeout.connect(self.poll_changes)
+        self.watch_timer.start()
         self.setup_model()
+        startup_profile.mark("Crm : modèles")
         self.setup_menu()
+        startup_profile.mark("Crm : menus")
         self.setup_ui()
         self.setWindowTitle("CRM Docstring by Rocket")
+        startup_profile.mark("Crm : widgets")
 
-    def connect_db(self):
-        self.db = QSqlDatabase("QSQLITE")
-        self.db.setDatabaseName(str(DATA_FILE))
-        self.db.open()
+    def showEvent(self, event):
+        # La palette issue de la feuille de style n'est connue qu'une fois la fenêtre affichée
+        super().showEvent(event)
+        self.update_avatar_background()
+
+    def closeEvent(self, event):
+        from crm.window.sql import qt_connections
+
+        self.watch_timer.stop()
+        self.change_relay.close()
+        self.executor.shutdown()
+        self.avatar_executor.shutdown()
+        # Les fenêtres secondaires et leurs modèles sont détruits avant les connexions QtSql
+        self.dialog_pool.clear()
+        qt_connections.close_all()
+        super().closeEvent(event)
 
     def setup_model(self):
-        self.model_contact = QSqlQueryModel()
-        self.query_contact = 'SELECT id, firstname, lastname FROM contact'
-        self.model_contact.setQuery(self.query_contact, db=self.db)
-        self.model_phone = QSqlQueryModel()
-        self.query_phone = QUERY_PHONE.format(id=0)
-        self.model_phone.setQuery(self.query_phone, db=self.db)
-        self.model_mail = QSqlQueryModel()
-        self.query_mail = QUERY_MAIL.format(id=0)
-        self.model_mail.setQuery(self.query_mail, db=self.db)
-        self.model_address = QSqlQueryModel()
-        self.query_address = QUERY_ADDRESS.format(id=0)
-        self.model_address.setQuery(self.query_address, db=self.db)
+        self.model_contact = ContactTableModel()
+        self.model_phone = RowsTableModel(column_count=3)
+        self.model_mail = RowsTableModel(column_count=3)
+        self.model_address = RowsTableModel(column_count=3)
 
     def setup_menu(self):
         self.menu = QMenuBar(self)
@@ -195,6 +224,12 @@ class Crm(QMainWindow):
         self.action_deleting.setShortcut(QKeySequence("Del"))
         self.action_deleting.triggered.connect(self.distribution_deleting_action)
         self.action_deleting.setIcon(QIcon(QPixmap(RESOURCE_DIR / "cross.png")))
+        self.action_import = QAction(self, text="&Importer...")
+        self.action_import.setShortcut(QKeySequence("Ctrl+i"))
+        self.action_import.triggered.connect(self.import_contacts_file)
+        self.action_export = QAction(self, text="E&xporter...")
+        self.action_export.setShortcut(QKeySequence("Ctrl+Shift+e"))
+        self.action_export.triggered.connect(self.export_contacts_file)
         self.menu.addAction(self.menu_contact.menuAction())
         self.menu_contact.addAction(self.action_editing)
         self.menu_contact.addAction(self.menu_insertion.menuAction())
@@ -203,6 +238,9 @@ class Crm(QMainWindow):
         self.menu_insertion.addAction(self.action_add_mail)
         self.menu_insertion.addAction(self.action_add_address)
         self.menu_contact.addAction(self.action_deleting)
+        self.menu_contact.addSeparator()
+        self.menu_contact.addAction(self.action_import)
+        self.menu_contact.addAction(self.action_export)
 
         self.menu_tag = QMenu(self.menu, title="&Tag")
         self.action_tag = QAction(self, text="&Gestion")
@@ -303,7 +341,7 @@ class Crm(QMainWindow):
 
     def create_widgets(self):
         self.le_search = QLineEdit()
-        self.tv_contact = CustomTableView("contact", self.model_contact, header_stretch="all")
+        self.tv_contact = CustomTableView("contact", self.model_contact, header_stretch="all", sort_in_model=True)
         self.btn_modify_contact = QPushButton()
         self.btn_add_contact = QPushButton()
         self.btn_del_contact = QPushButton()
@@ -316,10 +354,11 @@ class Crm(QMainWindow):
         self.btn_add_mail = QPushButton()
         self.btn_del_mail = QPushButton()
         self.tv_address = CustomTableView("address", self.model_address, header_stretch="last")
+        self.detail_views = {"phone": self.tv_phone, "mail": self.tv_mail, "address": self.tv_address}
         self.btn_modify_address = QPushButton()
         self.btn_add_address = QPushButton()
         self.btn_del_address = QPushButton()
-        self.la_profile_picture = ProfilePicture(RESOURCE_DIR / "pp_00000.png")
+        self.la_profile_picture = ProfilePicture(picture_path(DEFAULT_PICTURE))
         self.la_birthday = QLabel("Age :")
         self.la_birthday_value = QLabel("")
         self.la_company = QLabel("Société :")
@@ -426,6 +465,7 @@ class Crm(QMainWindow):
 
     def setup_connections(self):
         self.le_search.textChanged.connect(self.update_tv_contact)
+        self.search_pipeline.results_ready.connect(self.display_search_result)
         self.tv_contact.selectionModel().currentRowChanged.connect(self.update_other_display)
         self.tv_contact.doubleClicked.connect(partial(self.open_details_contact, "modify"))
         self.btn_modify_contact.clicked.connect(partial(self.distribution_editing_action, "contact"))
@@ -447,8 +487,8 @@ class Crm(QMainWindow):
 
     def get_filename_image(self):
         """Ouvre une boite de dialogue afin de récupérer le chemin d'une image.
-        La sauvegarde (resources et bdd) et l'applique à interface.
-        Beaucoup trop d'action : À décomposer"""
+        Ses miniatures sont enregistrées en tâche de fond (voir ingest_picture),
+        puis associées au contact sélectionné."""
         row = self.tv_contact.currentIndex().row()
         if row == -1:
             return
@@ -458,17 +498,67 @@ class Crm(QMainWindow):
         if not selected_file:
             return
 
-        path = Path(selected_file)
         id_: int = self.tv_contact.currentIndex().sibling(row, 0).data()
-        new_filename = RESOURCE_DIR / f"pp_{str(id_).zfill(5)}{path.suffix}"
-        if new_filename.exists():
-            new_filename.unlink()
-        shutil.copy(path, new_filename)
-        update_profil_picture(id_contact=id_, filename=new_filename.name)
-        self.update_other_display(self.tv_contact.currentIndex())
+        request = self.avatar_executor.submit(ingest_picture, Path(selected_file))
+        request.finished.connect(partial(self.save_profile_picture, id_))
+        request.failed.connect(lambda error: QMessageBox.critical(self, "Photo", f"Image non reconnue : {error}"))
+
+    def save_profile_picture(self, id_contact: int, picture: str):
+        """Associe au contact la photo enregistrée par ingest_picture puis l'affiche."""
+        self.executor.submit(update_profil_picture, id_contact=id_contact, filename=picture)
+
+    def import_contacts_file(self):
+        """Ouvre une boite de dialogue afin de choisir un fichier CSV ou vCard,
+        puis importe ses contacts en tâche de fond en affichant la progression."""
+        from crm.api.importer import import_file
+
+        filters = "Carnet d'adresses (*.csv *.vcf *.vcard)"
+        selected_file, _ = QFileDialog.getOpenFileName(self, dir=str(Path.home()), filter=filters)
+        if not selected_file:
+            return
+
+        request = self.start_file_task("Importer", "importés", import_file, Path(selected_file))
+        request.finished.connect(lambda report: QMessageBox.information(
+            self, "Importer", f"{report.contacts} contacts importés, {report.tags} tags créés."))
+
+    def export_contacts_file(self):
+        """Ouvre une boite de dialogue afin de choisir le fichier de destination,
+        puis y exporte tous les contacts en tâche de fond en affichant la progression."""
+        from crm.api.exporter import export_file
+
+        filters = "CSV (*.csv);;vCard (*.vcf);;JSON Lines (*.jsonl)"
+        selected_file, _ = QFileDialog.getSaveFileName(self, dir=str(Path.home() / "contacts.csv"), filter=filters)
+        if not selected_file:
+            return
+
+        request = self.start_file_task("Exporter", "exportés", export_file, Path(selected_file))
+        request.finished.connect(lambda report: QMessageBox.information(
+            self, "Exporter", f"{report.contacts} contacts exportés."))
+
+    def start_file_task(self, title: str, participle: str, func, path: Path) -> DatabaseRequest:
+        """Exécute en tâche de fond un import ou un export de fichier, avec une fenêtre
+        de progression permettant de l'annuler."""
+        progress_dialog = QProgressDialog(f"Contacts {participle}...", "Annuler", 0, 100, self)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setAutoClose(False)
+
+        def display_progress(report):
+            progress_dialog.setValue(int(report.progress * 100))
+            progress_dialog.setLabelText(f"{report.contacts} contacts {participle}...")
+
+        request = self.executor.submit(func, path, reporting=True)
+        progress_dialog.canceled.connect(request.cancel)
+        request.progressed.connect(display_progress)
+        request.failed.connect(lambda error: QMessageBox.critical(self, title, f"Opération interrompue : {error}"))
+        request.released.connect(lambda _: progress_dialog.close())
+        return request
 
     def open_details_contact(self, mode_action: str, selected: QModelIndex = None):
         """Ouvre la fenêtre pour l'ajout ou la modification d'un contact."""
+        from crm.window.contact_details import DetailsContact
+
         if mode_action == "modify":
             row = selected.row()
             selected_row_index = self.tv_contact.currentIndex()
@@ -476,14 +566,7 @@ class Crm(QMainWindow):
         else:
             id_contact = 0
 
-        self.details_contact = DetailsContact(mode_action=mode_action, id_contact=id_contact)
-        if mode_action == "modify":
-            self.details_contact.update_main_window.connect(partial(self.refresh_tv_contact, selected_row_index))
-        else:
-            self.details_contact.update_main_window.connect(self.refresh_tv_contact)
-
-        self.details_contact.setWindowModality(Qt.ApplicationModal)
-        self.details_contact.show()
+        self.dialog_pool.open("contact", partial(DetailsContact, executor=self.executor), mode_action, id_contact)
 
     def open_details_phone(self, mode_action: str, selected: QModelIndex = None):
         """Ouvre la fenêtre pour l'ajout ou la modification d'un numéro de téléphone."""
@@ -497,13 +580,9 @@ class Crm(QMainWindow):
         else:
             id_phone = 0
 
-        self.details_phone = DetailsPhone(id_phone, mode_action=mode_action, id_contact=self.id_contact)
-        if mode_action == "modify":
-            self.details_phone.update_main_window.connect(partial(self.refresh_tv_phone, selected_row_index))
-        else:
-            self.details_phone.update_main_window.connect(self.refresh_tv_phone)
-        self.details_phone.setWindowModality(Qt.ApplicationModal)
-        self.details_phone.show()
+        from crm.window.phone_details import DetailsPhone
+
+        self.dialog_pool.open("phone", partial(DetailsPhone, executor=self.executor), id_phone, mode_action, self.id_contact)
 
     def open_details_mail(self, mode_action: str, selected: QModelIndex = None):
         """Ouvre la fenêtre pour l'ajout ou la modification d'un mail."""
@@ -517,13 +596,9 @@ class Crm(QMainWindow):
         else:
             id_mail = 0
 
-        self.details_mail = DetailsMail(id_mail, mode_action=mode_action, id_contact=self.id_contact)
-        if mode_action == "modify":
-            self.details_mail.update_main_window.connect(partial(self.refresh_tv_mail, selected_row_index))
-        else:
-            self.details_mail.update_main_window.connect(self.refresh_tv_mail)
-        self.details_mail.setWindowModality(Qt.ApplicationModal)
-        self.details_mail.show()
+        from crm.window.mail_details import DetailsMail
+
+        self.dialog_pool.open("mail", partial(DetailsMail, executor=self.executor), id_mail, mode_action, self.id_contact)
 
     def open_details_address(self, mode_action: str, selected: QModelIndex = None):
         """Ouvre la fenêtre pour l'ajout ou la modification d'une adresse."""
@@ -537,103 +612,145 @@ class Crm(QMainWindow):
         else:
             id_address = 0
 
-        self.details_address = DetailsAddress(id_address, mode_action=mode_action, id_contact=self.id_contact)
-        if mode_action == "modify":
-            self.details_address.update_main_window.connect(partial(self.refresh_tv_address, selected_row_index))
-        else:
-            self.details_address.update_main_window.connect(self.refresh_tv_address)
-        self.details_address.setWindowModality(Qt.ApplicationModal)
-        self.details_address.show()
+        from crm.window.address_details import DetailsAddress
+
+        self.dialog_pool.open("address", partial(DetailsAddress, executor=self.executor), id_address, mode_action, self.id_contact)
 
     def manage_tag(self):
         """Ouvre la fenêtre de gestion des tags."""
-        self.win = Tag()
+        from crm.window.tag import Tag
+
+        self.win = Tag(self.executor)
         self.win.setWindowModality(Qt.ApplicationModal)
         self.win.show()
 
     def open_about(self):
         """Ouvre la fenêtre 'A propos' de l'application"""
+        from crm.window.about import About
+
         self.win = About()
         self.win.setWindowModality(Qt.ApplicationModal)
         self.win.show()
 
-    def refresh_tv_contact(self, selected_row: QModelIndex = None):
-        """Rafraichi les données de tv_contact après ajout ou modification d'une donnée"""
-        self.model_contact.setQuery(self.query_contact, db=self.db)
-        if selected_row:
-            self.tv_contact.setCurrentIndex(selected_row)
-
-    def refresh_tv_phone(self, selected_row: QModelIndex = None):
-        """Rafraichi les données de tv_phone après ajout ou modification d'une donnée"""
-        self.model_phone.setQuery(self.query_phone, db=self.db)
-        if selected_row:
-            self.tv_phone.setCurrentIndex(selected_row)
-
-    def refresh_tv_mail(self, selected_row: QModelIndex = None):
-        """Rafraichi les données de tv_mail après ajout ou modification d'une donnée"""
-        self.model_mail.setQuery(self.query_mail, db=self.db)
-        if selected_row:
-            self.tv_mail.setCurrentIndex(selected_row)
-
-    def refresh_tv_address(self, selected_row: QModelIndex = None):
-        """Rafraichi les données de tv_address après ajout ou modification d'une donnée"""
-        self.model_address.setQuery(self.query_address, db=self.db)
-        if selected_row:
-            self.tv_address.setCurrentIndex(selected_row)
+    def refresh_tv_contact(self):
+        """Relit entièrement tv_contact, après une écriture en masse (import)."""
+        self.model_contact.refresh()
+        # Les résultats de recherche conservés ne reflètent plus les données
+        self.search_pipeline.forget()
+        self.refresh_contact_details()
+
+    def poll_changes(self):
+        """Relève par l'exécuteur les modifications des autres processus. Elles sont publiées
+        dans le thread graphique, puis appliquées par apply_change via change_relay.
+        Un relevé n'est pas annulé par le suivant : celui en cours a déjà avancé dans le journal."""
+        if self.watch_request is not None:
+            return
+        self.watch_request = self.executor.submit(change_watcher.read)
+        self.watch_request.finished.connect(change_watcher.publish)
+        self.watch_request.released.connect(self.end_poll_changes)
+
+    def end_poll_changes(self, _request: DatabaseRequest):
+        self.watch_request = None
+
+    def apply_change(self, change: Change):
+        """Répercute une modification validée en base sur les seules lignes affichées concernées."""
+        # Le texte des contacts conservé par la recherche ne reflète plus les données. La liste
+        # filtrée n'est pas relue : les contacts affichés sont mis à jour par apply_contact_change.
+        self.search_pipeline.forget()
+        if change.id is None and change.entity == "contact":
+            # Les écritures en masse sont regroupées en un seul rafraichissement
+            self.bulk_refresh.start()
+        elif change.entity == "contact":
+            self.apply_contact_change(change)
+        elif change.entity in self.detail_views and change.id is not None:
+            self.apply_detail_change(change)
+        elif change.contact_id in (None, self.id_contact):
+            # Groupes, tags et écritures en masse : seules les données du contact affiché sont relues
+            self.refresh_contact_details()
+
+    def apply_contact_change(self, change: Change):
+        # Retirer la ligne sélectionnée déplace la sélection, et update_other_display remplace id_contact
+        selected = self.id_contact
+        row = self.model_contact.apply_change(change)
+        if change.id != selected:
+            return
+        if change.operation == DELETE:
+            self.update_other_display(self.tv_contact.currentIndex())
+            return
+        if row is not None and row != self.tv_contact.currentIndex().row():
+            # Le contact modifié a changé de place dans le tri : il reste sélectionné
+            self.tv_contact.setCurrentIndex(self.model_contact.index(row, 1))
+        else:
+            self.id_contact = selected
+            self.refresh_contact_details()
+
+    def apply_detail_change(self, change: Change):
+        """Met à jour la ligne modifiée d'un téléphone, d'un mail ou d'une adresse."""
+        table_view = self.detail_views[change.entity]
+        if change.operation == DELETE:
+            table_view.model().sourceModel().remove_row(change.id)
+            return
+        request = self.executor.submit(get_contact_detail, change.entity, change.id)
+        request.finished.connect(partial(self.display_detail_row, table_view))
+
+    def display_detail_row(self, table_view: CustomTableView, row: tuple | None):
+        if row is None or row[3] != self.id_contact:
+            return
+        proxy_model = table_view.model()
+        model = proxy_model.sourceModel()
+        model.put_row(row[:3])
+        table_view.setCurrentIndex(proxy_model.mapFromSource(model.index(model.row_of(row[0]), 1)))
+
+    def refresh_contact_details(self):
+        """Relit en tâche de fond les données du contact sélectionné puis les affiche."""
+        request = self.executor.submit(load_contact_bundle, self.id_contact, key="bundle")
+        request.finished.connect(self.display_contact_bundle)
 
     def update_tv_contact(self):
         """Actualisation des données affichées dans tv_contact suite à une
-        saisie dans la barre de recherche le_search."""
-        if search := self.le_search.text():
-            self.query_contact = f'''SELECT DISTINCT contact.id, firstname, lastname FROM contact 
-                             LEFT OUTER JOIN mail ON contact.id = mail.contact_id 
-                             LEFT OUTER JOIN phone ON contact.id = phone.contact_id 
-                             LEFT OUTER JOIN address ON contact.id = address.contact_id 
-                             LEFT OUTER JOIN group_ ON contact.id = group_.contact_id 
-                             LEFT OUTER JOIN tag ON group_.tag_id = tag.id 
-                             WHERE lastname LIKE "%{search}%" 
-                             OR firstname LIKE "%{search}%" 
-                             OR mail LIKE "%{search}%" 
-                             OR number LIKE "%{search}%" 
-                             OR address LIKE "%{search}%" 
-                             OR tag LIKE "%{search}%"'''
-        else:
-            self.query_contact = 'SELECT id, firstname, lastname FROM contact'
+        saisie dans la barre de recherche le_search.
+        Le résultat est transmis à display_search_result par search_pipeline."""
+        self.search_pipeline.set_query(self.le_search.text())
 
-        self.model_contact.setQuery(self.query_contact, db=self.db)
+    def display_search_result(self, ids: list[int] | None):
+        """Affichage dans tv_contact des contacts trouvés, ou de tous les contacts si ids vaut None."""
+        self.model_contact.set_filter(ids)
         self.clean_other_display()
         self.update_other_display(self.tv_contact.currentIndex())
 
     def clean_other_display(self):
         """Nettoyage de toutes les données affichées hormis tv_contact."""
-        self.model_phone.setQuery("")
-        self.model_mail.setQuery("")
-        self.model_address.setQuery("")
+        self.contact_bundle = None
+        self.model_phone.set_rows([])
+        self.model_mail.set_rows([])
+        self.model_address.set_rows([])
         self.la_birthday_value.setText("")
         self.la_company_value.setText("")
         self.la_job_value.setText("")
         self.la_group_value.setText("")
-        self.la_profile_picture.set_image(RESOURCE_DIR / "bg.png")
-        self.la_profile_picture.set_image(RESOURCE_DIR / "pp_00000.png")
+        self.la_profile_picture.set_image(picture_path(DEFAULT_PICTURE))
 
     def update_other_display(self, selected: QModelIndex):
         """Actualisation des données affichées hormis tv_contact.
-        Beaucoup trop long : À décomposer."""
+        Les données du contact sont chargées en tâche de fond."""
         row = selected.row()
         selected_row_index = self.tv_contact.currentIndex()
         self.id_contact = selected_row_index.sibling(row, 0).data()
+        self.refresh_contact_details()
+        self.prefetch_avatars(row)
 
-        informations = get_contact_informations(id_contact=self.id_contact)
-        if not informations:
+    def display_contact_bundle(self, bundle: ContactBundle | None):
+        """Affichage des données d'un contact hormis tv_contact."""
+        if not bundle:
+            self.clean_other_display()
             return
 
-        if file_picture := informations[0]:
-            if not self.background_color:
-                self.generate_background_picture()
-            self.la_profile_picture.set_image(RESOURCE_DIR / "bg.png")
-            self.la_profile_picture.set_image(RESOURCE_DIR / file_picture)
+        self.contact_bundle = bundle
+
+        if file_picture := bundle.profile_picture:
+            self.display_avatar(picture_path(file_picture, AVATAR_SIZE))
 
-        birthday = informations[1]
+        birthday = bundle.birthday
         if birthday and birthday != "1899-12-31":
             birthday = datetime.strptime(birthday, '%Y-%m-%d')
             age = get_age_from_birthday(birthday)
@@ -641,50 +758,77 @@ class Crm(QMainWindow):
         else:
             self.la_birthday_value.setText("")
 
-        if company := informations[2]:
+        if company := bundle.company:
             self.la_company_value.setText(company)
         else:
             self.la_company_value.setText("")
 
-        if job := informations[3]:
+        if job := bundle.job:
             self.la_job_value.setText(job)
         else:
             self.la_job_value.setText("")
 
-        self.la_group_value.setText(get_contact_group(self.id_contact))
+        self.la_group_value.setText(", ".join(bundle.groups))
 
-        self.query_phone = QUERY_PHONE.format(id=self.id_contact)
-        self.model_phone.setQuery(self.query_phone, db=self.db)
+        self.model_phone.set_rows(bundle.phones)
         self.tv_phone.hide_first_column()
 
-        self.query_mail = QUERY_MAIL.format(id=self.id_contact)
-        self.model_mail.setQuery(self.query_mail, db=self.db)
+        self.model_mail.set_rows(bundle.mails)
         self.tv_mail.hide_first_column()
 
-        self.query_address = QUERY_ADDRESS.format(id=self.id_contact)
-        self.model_address.setQuery(self.query_address, db=self.db)
+        self.model_address.set_rows(bundle.addresses)
         self.tv_address.hide_first_column()
 
-    def change_theme(self, theme: str):
-        """Permet la bascule entre les thèmes clair et sombre"""
-        if self.theme == theme:
+    def display_avatar(self, path_image: Path):
+        """Affiche la photo du contact, décodée en tâche de fond si elle n'est pas en mémoire."""
+        background = self.la_profile_picture.background
+        if pixmap := avatar_cache.get(path_image, background):
+            self.la_profile_picture.set_avatar(path_image, pixmap)
             return
+        request = self.avatar_executor.submit(render_avatar, path_image, background, key="avatar")
+        request.finished.connect(partial(self.display_rendered_avatar, path_image, background))
+
+    def display_rendered_avatar(self, path_image: Path, background: QColor, avatar: QImage):
+        pixmap = avatar_cache.put(path_image, background, avatar)
+        bundle = self.contact_bundle
+        if bundle and bundle.profile_picture and picture_path(bundle.profile_picture, AVATAR_SIZE) == path_image:
+            self.la_profile_picture.set_avatar(path_image, pixmap)
+
+    def prefetch_avatars(self, row: int):
+        """Prépare en tâche de fond les photos des contacts voisins de la ligne row."""
+        if row < 0:
+            return
+        background = self.la_profile_picture.background
+        paths = []
+        last_row = self.model_contact.rowCount() - 1
+        for neighbour in range(max(row - PREFETCH_ROWS, 0), min(row + PREFETCH_ROWS, last_row) + 1):
+            if neighbour == row or not (file_picture := self.model_contact.profile_picture(neighbour)):
+                continue
+            path_image = picture_path(file_picture, AVATAR_SIZE)
+            if avatar_cache.key(path_image, background) not in avatar_cache and path_image not in paths:
+                paths.append(path_image)
+        if not paths:
+            return
+        request = self.avatar_executor.submit(render_avatars, paths, background, key="avatar_prefetch")
+        request.finished.connect(partial(self.store_avatars, background))
+
+    @staticmethod
+    def store_avatars(background: QColor, avatars: list[tuple[Path, QImage]]):
+        for path_image, avatar in avatars:
+            avatar_cache.put(path_image, background, avatar)
 
-        if theme == "light":
-            self.parent.setStyleSheet(get_light_style_sheet())
-            self.theme = "light"
-        elif theme == "dark":
-            self.parent.setStyleSheet(get_dark_style_sheet())
-            self.theme = "dark"
+    def change_theme(self, theme: str):
+        """Permet la bascule entre les thèmes clair et sombre.
+        Seules la feuille de style et la couleur de fond de la photo de profil changent :
+        les données affichées ne sont pas relues."""
+        if not theme_engine.apply(self.parent, theme):
+            return
         update_theme_setting(theme)
-        self.generate_background_picture()
-        selected_row_index = self.tv_contact.currentIndex()
-        self.update_other_display(selected_row_index)
+        self.update_avatar_background()
 
-    def generate_background_picture(self):
-        """Génération d'une image de la couleur de fond de l'application."""
-        self.background_color = self.palette().color(QPalette.Window).toTuple()
-        create_background_picture(self.background_color)
+    def update_avatar_background(self):
+        """Applique la couleur de fond du thème à la photo de profil."""
+        self.la_profile_picture.set_background(self.palette().color(QPalette.Window))
 
     def deleting_contact(self, selected: QModelIndex):
         """Suppression après confirmation d'un contact."""
@@ -698,11 +842,7 @@ class Crm(QMainWindow):
             return
 
         id_contact = selected.sibling(selected.row(), 0).data()
-        del_contact_by_id(id_contact)
-        self.refresh_tv_contact(selected)
-        self.refresh_tv_mail(selected)
-        self.refresh_tv_address(selected)
-        self.refresh_tv_phone(selected)
+        self.executor.submit(del_contact_by_id, id_contact)
 
     def deleting_phone(self, selected: QModelIndex):
         """Suppression après confirmation d'un numéro de téléphone."""
@@ -715,8 +855,7 @@ class Crm(QMainWindow):
             return
 
         id_phone = selected.sibling(selected.row(), 0).data()
-        del_phone_by_id(id_phone)
-        self.refresh_tv_phone(selected)
+        self.executor.submit(del_phone_by_id, id_phone)
 
     def deleting_mail(self, selected: QModelIndex):
         """Suppression après confirmation d'un mail."""
@@ -729,8 +868,7 @@ class Crm(QMainWindow):
             return
 
         id_mail = selected.sibling(selected.row(), 0).data()
-        del_mail_by_id(id_mail)
-        self.refresh_tv_mail(selected)
+        self.executor.submit(del_mail_by_id, id_mail)
 
     def deleting_address(self, selected: QModelIndex):
         """Suppression après confirmation d'une adresse."""
@@ -743,15 +881,14 @@ class Crm(QMainWindow):
             return
 
         id_address = selected.sibling(selected.row(), 0).data()
-        del_address_by_id(id_address)
-        self.refresh_tv_address(selected)
+        self.executor.submit(del_address_by_id, id_address)
 
 
 if __name__ == '__main__':
     import sys
 
     app = QApplication(sys.argv)
-    app.setStyleSheet(get_dark_style_sheet())
+    theme_engine.apply(app, "dark")
     window = Crm(app)
     window.show()
     app.exec()
@@ -3,15 +3,18 @@ d'ajout ou modification d'un numéro de téléphone."""
 
 from functools import partial
 
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap, QIcon
-from PySide6.QtSql import QSqlDatabase, QSqlQueryModel
+from PySide6.QtSql import QSqlQueryModel
 from PySide6.QtWidgets import QWidget, QGridLayout, QLineEdit, QLabel, QDataWidgetMapper, QPushButton, \
     QVBoxLayout, QHBoxLayout, QComboBox, QSpacerItem, QSizePolicy, QMessageBox
 
-from crm.api.utils import DATA_FILE, check_phone_number_format, RESOURCE_DIR
+from crm.api.utils import check_phone_number_format, RESOURCE_DIR
 from crm.database.client import update_number_phone, get_tag_to_category_phone, add_phone, add_tag
+from crm.window.dialogs import submit_from
+from crm.window.executor import DatabaseExecutor
 from crm.window.input_tag import InputTag
+from crm.window.sql import qt_connections
 
 
 class MessageConfirm(QMessageBox):
@@ -29,43 +32,51 @@ class MessageConfirm(QMessageBox):
 
 # noinspection PyAttributeOutsideInit
 class DetailsPhone(QWidget):
-    update_main_window = Signal()
-
     def __init__(self,
                  id_phone: int,
                  mode_action: str,
-                 id_contact: int = 0):
+                 id_contact: int = 0,
+                 executor: DatabaseExecutor = None):
         super().__init__()
 
-        self.id_phone = id_phone
-        self.id_contact = id_contact
-        self.mode_action = mode_action
+        # Les enregistrements sont exécutés en dehors du thread graphique
+        self.executor = DatabaseExecutor(self) if executor is None else executor
         self.connect_db()
         self.setup_model()
         self.setup_ui()
         self.setObjectName("details")
         self.setMinimumWidth(350)
+        self.bind(id_phone, mode_action, id_contact)
+
+    def bind(self, id_phone: int, mode_action: str, id_contact: int = 0):
+        """Associe la fenêtre à un numéro de téléphone, sans reconstruire ses widgets :
+        la fenêtre est réutilisée d'une ouverture à l'autre (voir DialogPool)."""
+        self.id_phone = id_phone
+        self.id_contact = id_contact
+        self.mode_action = mode_action
+        self.model.setQuery(f"SELECT id, number, tag_id FROM phone WHERE id={int(id_phone)}", db=self.db)
+        if self.mode_action == "modify":
+            self.mapper.toFirst()
+        else:
+            self.le_number.clear()
+
+        self.tags, self.idx = get_tag_to_category_phone()
+        self.cbx_tag.clear()
+        self.cbx_tag.addItems(self.tags)
         if self.mode_action == "modify":
+            self.cbx_tag.setCurrentText(self.tags[self.idx.index(self.model.record(0).value("tag_id"))])
             self.setWindowTitle("Modifier un numéro de téléphone")
         else:
             self.setWindowTitle("Ajouter un numéro de téléphone")
 
     def connect_db(self):
-        self.db = QSqlDatabase("QSQLITE")
-        self.db.setDatabaseName(str(DATA_FILE))
-        self.db.open()
+        self.db = qt_connections.database()
 
     def setup_model(self):
         self.model = QSqlQueryModel()
         self.mapper = QDataWidgetMapper()
         self.mapper.setModel(self.model)
 
-        query = f"""
-            SELECT id, number, tag_id FROM phone
-            WHERE id={self.id_phone}
-        """
-        self.model.setQuery(query, db=self.db)
-
     def setup_ui(self):
         self.create_widgets()
         self.modify_widgets()
@@ -82,11 +93,6 @@ class DetailsPhone(QWidget):
 
     def modify_widgets(self):
         self.mapper.addMapping(self.le_number, 1)
-        self.mapper.toFirst()
-        self.tags, self.idx = get_tag_to_category_phone()
-        self.cbx_tag.addItems(self.tags)
-        if self.mode_action == "modify":
-            self.cbx_tag.setCurrentText(self.tags[self.idx.index(self.model.query().value(2))])
         self.cbx_tag.setSizePolicy(QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed))
         self.cbx_tag.setObjectName("phone")
         self.btn_new_tag.setIcon(QIcon(QPixmap(RESOURCE_DIR / "tag--plus.png")))
@@ -126,7 +132,11 @@ class DetailsPhone(QWidget):
         self.new_tag.show()
 
     def add_tag(self, category: str, new_tag: str):
-        id_ = add_tag(tag=new_tag, category=category)
+        request = submit_from(self, self.executor, add_tag, tag=new_tag, category=category)
+        request.finished.connect(partial(self.append_tag, new_tag))
+
+    def append_tag(self, new_tag: str, id_: int):
+        """Ajoute à la liste le tag enregistré par add_tag et le sélectionne."""
         self.tags.append(new_tag)
         self.idx.append(id_)
         self.cbx_tag.addItem(new_tag)
@@ -139,12 +149,12 @@ class DetailsPhone(QWidget):
 
         id_tag = self.idx[self.tags.index(self.cbx_tag.currentText())]
         if self.mode_action == "modify":
-            update_number_phone(self.le_number.text(), id_tag, self.id_phone)
+            request = submit_from(self, self.executor, update_number_phone, self.le_number.text(), id_tag, self.id_phone)
         else:
-            add_phone(number=self.le_number.text(), contact_id=self.id_contact, tag_id=id_tag)
-        # Emission à la fenêtre parente qu'une modification a eu lieu
-        self.update_main_window.emit()
-        self.close()
+            request = submit_from(self, self.executor, add_phone, number=self.le_number.text(),
+                                  contact_id=self.id_contact, tag_id=id_tag)
+        # La fenêtre est fermée une fois l'enregistrement terminé
+        request.finished.connect(self.close)
 
     def validate_phone(self) -> bool:
         """Vérification de la validité du numéro de téléphone renseigné.
@@ -0,0 +1,106 @@
+"""Module contenant la chaîne de traitement de la barre de recherche."""
+
+from collections import deque
+from functools import partial
+from time import perf_counter
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from crm.database.client import search_contacts, search_contact_documents
+from crm.window.executor import DatabaseExecutor
+from crm.window.table_model import MAX_FILTER_IDS, PAGE_SIZE
+
+# Délai sans nouvelle saisie avant de lancer la recherche
+DEBOUNCE_MS = 200
+# En dessous de cette longueur, une recherche retourne trop de contacts pour conserver leur texte
+MIN_NARROWING_LENGTH = 3
+
+
+def find_contacts(query: str) -> tuple[list[int], list[tuple[int, str]] | None]:
+    """Exécuté par l'exécuteur : retourne les id des contacts trouvés, au plus MAX_FILTER_IDS,
+    et leur texte s'ils tiennent dans une page (PAGE_SIZE), None sinon."""
+    documents = search_contact_documents(query, limit=PAGE_SIZE + 1)
+    if len(documents) <= PAGE_SIZE:
+        return [id_ for id_, _ in documents], documents
+    return search_contacts(query, limit=MAX_FILTER_IDS), None
+
+
+class SearchPipeline(QObject):
+    """Recherche de contacts au fil de la saisie :
+        - la recherche n'est lancée qu'après DEBOUNCE_MS sans nouvelle saisie,
+        - une recherche dépassée par une saisie plus récente est annulée,
+        - une saisie contenant la précédente affine en mémoire les résultats déjà obtenus,
+          lorsqu'ils tiennent dans une page.
+    results_ready transmet la liste des id trouvés, ou None si la recherche est vide.
+    latency_measured transmet la recherche, sa durée en ms et sa source ('database' ou 'memory')."""
+    results_ready = Signal(object)
+    latency_measured = Signal(str, float, str)
+
+    def __init__(self, executor: DatabaseExecutor, parent: QObject = None):
+        super().__init__(parent)
+        self.executor = executor
+        self.query = ""
+        # Dernière recherche dont le texte des contacts trouvés est conservé
+        self.last_query = None
+        self.last_documents: list[tuple[int, str]] = []
+        self.latencies = deque(maxlen=100)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_MS)
+        self.timer.timeout.connect(self.run)
+
+    def set_query(self, query: str):
+        """Nouvelle saisie : relance le délai d'attente."""
+        self.query = query
+        self.timer.start()
+
+    def run(self):
+        """Lancement de la recherche correspondant à la dernière saisie."""
+        query = self.query
+        start = perf_counter()
+        if not query:
+            self.executor.cancel("search")
+            self.forget()
+            self.results_ready.emit(None)
+            return
+
+        if self.last_query is not None and self.last_query in query.lower():
+            self.executor.cancel("search")
+            self.deliver_documents(query, start, "memory", self.last_documents)
+        elif len(query) >= MIN_NARROWING_LENGTH:
+            request = self.executor.submit(find_contacts, query, key="search")
+            request.finished.connect(partial(self.deliver_found, query, start))
+        else:
+            self.forget()
+            request = self.executor.submit(search_contacts, query, limit=MAX_FILTER_IDS, key="search")
+            request.finished.connect(partial(self.deliver_ids, query, start))
+
+    def deliver_found(self, query: str, start: float, found: tuple[list[int], list[tuple[int, str]] | None]):
+        ids, documents = found
+        if documents is None:
+            # Trop de résultats pour conserver leur texte : la saisie suivante interrogera la base
+            self.forget()
+            self.deliver_ids(query, start, ids)
+        else:
+            self.deliver_documents(query, start, "database", documents)
+
+    def deliver_documents(self, query: str, start: float, source: str, documents: list[tuple[int, str]]):
+        """Conserve les résultats pour les saisies suivantes, après les avoir filtrés
+        sur la recherche s'ils proviennent d'une recherche précédente."""
+        needle = query.lower()
+        if source == "memory":
+            documents = [(id_, text) for id_, text in documents if needle in text]
+        self.last_query = needle
+        self.last_documents = documents
+        self.deliver_ids(query, start, [id_ for id_, _ in self.last_documents], source)
+
+    def deliver_ids(self, query: str, start: float, ids: list[int], source: str = "database"):
+        latency = (perf_counter() - start) * 1000
+        self.latencies.append((query, latency, source))
+        self.latency_measured.emit(query, latency, source)
+        self.results_ready.emit(ids)
+
+    def forget(self):
+        """Oubli des résultats conservés : la prochaine recherche interrogera la base."""
+        self.last_query = None
+        self.last_documents = []
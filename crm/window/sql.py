@@ -0,0 +1,66 @@
+"""Module gérant les connexions QtSql utilisées par les modèles des fenêtres.
+Comme ConnectionManager pour sqlite3, il fournit une connexion nommée par thread,
+ouverte et configurée une seule fois (storage_pragmas) sur la base de connection_manager."""
+
+import threading
+
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+from crm.database.connection import connection_manager, storage_pragmas
+
+
+class QtConnectionRegistry:
+    """Connexions QSqlDatabase nommées, une par thread : une connexion QtSql
+    ne peut être utilisée que par le thread qui l'a ouverte."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: set[str] = set()
+        self.metrics = {"opened": 0, "reused": 0, "closed": 0}
+
+    @staticmethod
+    def name() -> str:
+        return f"crm_{threading.get_ident()}"
+
+    def database(self) -> QSqlDatabase:
+        """Retourne la connexion du thread courant, ouverte si nécessaire.
+        Elle est rouverte si connection_manager a changé de fichier entre temps."""
+        name = self.name()
+        database = str(connection_manager.database)
+        if QSqlDatabase.contains(name):
+            db = QSqlDatabase.database(name, open=False)
+            if db.isOpen() and db.databaseName() == database:
+                with self._lock:
+                    self.metrics["reused"] += 1
+                return db
+            db.close()
+        else:
+            db = QSqlDatabase.addDatabase("QSQLITE", name)
+        db.setDatabaseName(database)
+        if not db.open():
+            raise OSError(f"Ouverture de {database} impossible : {db.lastError().text()}")
+        query = QSqlQuery(db)
+        for pragma in storage_pragmas():
+            query.exec(pragma)
+        with self._lock:
+            self._names.add(name)
+            self.metrics["opened"] += 1
+        return db
+
+    def close_all(self):
+        """Ferme toutes les connexions. Les modèles qui les utilisent doivent avoir été détruits."""
+        with self._lock:
+            names = list(self._names)
+            self._names.clear()
+            self.metrics["closed"] += len(names)
+        for name in names:
+            QSqlDatabase.database(name, open=False).close()
+            QSqlDatabase.removeDatabase(name)
+
+    def stats(self) -> dict:
+        """Retourne le nombre de connexions ouvertes, QtSql et sqlite3 (connection_manager)."""
+        with self._lock:
+            stats = dict(self.metrics, open=len(self._names))
+        return {"qt": stats, "sqlite3": connection_manager.stats()}
+
+
+qt_connections = QtConnectionRegistry()
@@ -0,0 +1,242 @@
+"""Module contenant les modèles de table utilisés par les CustomTableView."""
+
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from crm.database.client import count_contacts, count_contacts_before, get_contact_page, get_contact_row
+from crm.database.events import Change, DELETE, INSERT
+
+# Nombre de contacts lus par requête et nombre de pages conservées en mémoire
+PAGE_SIZE = 256
+MAX_CACHED_PAGES = 16
+# Nombre maximal de contacts retenus par un filtre : leurs id sont transmis à chaque lecture
+MAX_FILTER_IDS = PAGE_SIZE * MAX_CACHED_PAGES
+
+
+class HeaderTableModel(QAbstractTableModel):
+    """Modèle de table conservant les titres de colonnes définis par setHeaderData."""
+    def __init__(self, column_count: int):
+        super().__init__()
+        self.column_count = column_count
+        self.headers: dict[int, Any] = {}
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.column_count
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section in self.headers:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def setHeaderData(self, section: int, orientation: Qt.Orientation, value: Any, role: int = Qt.EditRole) -> bool:
+        if orientation != Qt.Horizontal or role not in (Qt.DisplayRole, Qt.EditRole):
+            return False
+        self.headers[section] = value
+        self.headerDataChanged.emit(orientation, section, section)
+        return True
+
+
+class RowsTableModel(HeaderTableModel):
+    """Modèle de table affichant une liste de tuples, sans accès à la base de données."""
+    def __init__(self, column_count: int):
+        super().__init__(column_count)
+        self.rows: list[tuple] = []
+
+    def set_rows(self, rows: Iterable[tuple]):
+        """Remplace l'ensemble des lignes affichées."""
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.rows[index.row()][index.column()]
+
+    def row_of(self, id_: int) -> int | None:
+        """Retourne la position de la ligne dont la première colonne vaut id_."""
+        for row, values in enumerate(self.rows):
+            if values[0] == id_:
+                return row
+        return None
+
+    def put_row(self, values: tuple):
+        """Remplace la ligne de même id, ou l'ajoute à la fin si elle n'est pas affichée."""
+        row = self.row_of(values[0])
+        if row is None:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows))
+            self.rows.append(values)
+            self.endInsertRows()
+            return
+        self.rows[row] = values
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.column_count - 1))
+
+    def remove_row(self, id_: int):
+        """Retire la ligne dont la première colonne vaut id_."""
+        row = self.row_of(id_)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
+
+
+class ContactTableModel(HeaderTableModel):
+    """Modèle de la liste des contacts (id, prénom, nom) lue page par page.
+    Le tri est réalisé par la base de données et seules MAX_CACHED_PAGES pages
+    sont conservées, quel que soit le nombre de contacts."""
+    def __init__(self):
+        super().__init__(column_count=3)
+        self.sort_column = 1
+        self.descending = False
+        # id des contacts affichés par une recherche, None pour afficher tous les contacts
+        self.filter_ids: list[int] | None = None
+        self.row_count = 0
+        self.pages: OrderedDict[int, list[tuple]] = OrderedDict()
+        # Clé (tri, id) de la dernière ligne de chaque page en mémoire
+        self.boundaries: dict[int, tuple] = {}
+        self.refresh()
+
+    def refresh(self):
+        """Relit le nombre de contacts et vide les pages en mémoire."""
+        self.beginResetModel()
+        self.pages.clear()
+        self.boundaries.clear()
+        self.row_count = count_contacts(self.filter_ids)
+        self.endResetModel()
+
+    def set_filter(self, ids: list[int] | None):
+        """Restreint la liste aux contacts dont l'id est donné, ou l'affiche entière si ids vaut None.
+        Seuls les MAX_FILTER_IDS premiers id sont retenus. Le filtre n'est pas écrit en base :
+        les id sont transmis aux lectures des pages."""
+        self.filter_ids = None if ids is None else ids[:MAX_FILTER_IDS]
+        self.refresh()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder):
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.row_count
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        page = self.page(index.row() // PAGE_SIZE)
+        position = index.row() % PAGE_SIZE
+        if position >= len(page):
+            return None
+        return page[position][index.column()]
+
+    def apply_change(self, change: Change) -> int | None:
+        """Met à jour la seule ligne du contact modifié, sans relire la liste.
+        Retourne la ligne où le contact est affiché après la modification, s'il l'est."""
+        if change.id is None:
+            self.refresh()
+            return None
+
+        row = self.cached_row_of(change.id)
+        if change.operation == DELETE:
+            if row is None:
+                # Contact jamais lu : sa position est inconnue
+                self.refresh()
+            else:
+                self.remove_rows(row)
+            return None
+
+        if change.operation == INSERT:
+            # Un contact ajouté pendant une recherche n'en fait pas partie
+            values = None if self.filter_ids is not None else get_contact_row(change.id, self.sort_column)
+            return self.insert_row(values) if values else None
+        values = get_contact_row(change.id, self.sort_column)
+        if values is None:
+            return None
+        if row is None:
+            if self.filter_ids is not None and change.id not in self.filter_ids:
+                return None
+            return self.move_unread_row(values)
+
+        page = self.pages[row // PAGE_SIZE]
+        if page[row % PAGE_SIZE][3] == values[3]:
+            page[row % PAGE_SIZE] = values
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.column_count - 1))
+            return row
+        # La clé de tri a changé : le contact est déplacé à sa nouvelle position
+        self.remove_rows(row)
+        return self.insert_row(values)
+
+    def move_unread_row(self, values: tuple) -> int:
+        """Le contact modifié ne figure dans aucune page en mémoire : sa clé de tri a pu changer.
+        Sa position précédente est inconnue, mais se trouve au plus tôt dans la première page
+        absente de la mémoire. Les pages à partir de celle-ci, ou de sa nouvelle position si elle
+        la précède, sont oubliées. Retourne sa nouvelle position."""
+        unread = next(number for number in range(len(self.pages) + 1) if number not in self.pages)
+        row = count_contacts_before(self.sort_column, self.descending, (values[3], values[0]), self.filter_ids)
+        first = min(unread * PAGE_SIZE, row)
+        self.forget_pages_from(first // PAGE_SIZE)
+        if first < self.row_count:
+            self.dataChanged.emit(self.index(first, 0), self.index(self.row_count - 1, self.column_count - 1))
+        return row
+
+    def cached_row_of(self, id_contact: int) -> int | None:
+        """Retourne la ligne du contact s'il figure dans une page en mémoire."""
+        for number, page in self.pages.items():
+            for position, values in enumerate(page):
+                if values[0] == id_contact:
+                    return number * PAGE_SIZE + position
+        return None
+
+    def insert_row(self, values: tuple) -> int:
+        row = count_contacts_before(self.sort_column, self.descending, (values[3], values[0]), self.filter_ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.forget_pages_from(row // PAGE_SIZE)
+        self.row_count += 1
+        self.endInsertRows()
+        return row
+
+    def remove_rows(self, row: int):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.forget_pages_from(row // PAGE_SIZE)
+        self.row_count -= 1
+        self.endRemoveRows()
+
+    def forget_pages_from(self, number: int):
+        """Oublie les pages décalées par un ajout ou une suppression.
+        Les pages précédentes et leurs clés de pagination restent valables."""
+        for cached in [cached for cached in self.pages if cached >= number]:
+            del self.pages[cached]
+        for cached in [cached for cached in self.boundaries if cached >= number]:
+            del self.boundaries[cached]
+
+    def profile_picture(self, row: int) -> str | None:
+        """Retourne le nom du fichier de la photo du contact affiché à la ligne row."""
+        page = self.page(row // PAGE_SIZE)
+        position = row % PAGE_SIZE
+        return page[position][4] if position < len(page) else None
+
+    def page(self, number: int) -> list[tuple]:
+        """Retourne une page de contacts, lue en base si elle n'est pas en mémoire."""
+        if number in self.pages:
+            self.pages.move_to_end(number)
+            return self.pages[number]
+
+        rows = get_contact_page(self.sort_column,
+                                self.descending,
+                                PAGE_SIZE,
+                                after=self.boundaries.get(number - 1),
+                                offset=number * PAGE_SIZE,
+                                ids=self.filter_ids)
+        if rows:
+            self.boundaries[number] = (rows[-1][3], rows[-1][0])
+        self.pages[number] = rows
+        if len(self.pages) > MAX_CACHED_PAGES:
+            # La clé de pagination est oubliée avec sa page : la page suivante sera lue par décalage
+            evicted, _ = self.pages.popitem(last=False)
+            self.boundaries.pop(evicted, None)
+        return rows
@@ -8,15 +8,19 @@ from PySide6.QtWidgets import QWidget, QLabel, QListWidget, QPushButton, QGridLa
 from crm.api.utils import RESOURCE_DIR
 from crm.database.client import get_tag_to_category_group, get_tag_to_category_phone, get_tag_to_category_mail, \
     get_tag_to_category_address, del_tag_by_id, add_tag, update_tag
+from crm.window.dialogs import submit_from
+from crm.window.executor import DatabaseExecutor
 from crm.window.list_item import CustomListWidgetItem
 from crm.window.input_tag import InputTag
 
 
 # noinspection PyAttributeOutsideInit
 class Tag(QWidget):
-    def __init__(self):
+    def __init__(self, executor: DatabaseExecutor = None):
         super().__init__()
 
+        # Les enregistrements sont exécutés en dehors du thread graphique
+        self.executor = DatabaseExecutor(self) if executor is None else executor
         self.setup_ui()
         self.resize(600, 300)
         self.setWindowTitle("Gestion des tags")
@@ -167,10 +171,9 @@ class Tag(QWidget):
         self.alter_tag.save_tag.connect(partial(self.modify_tag, item))
         self.alter_tag.show()
 
-    @staticmethod
-    def modify_tag(item: CustomListWidgetItem, new_tag: str):
-        item.setText(new_tag)
-        update_tag(tag=new_tag, id_=item.id)
+    def modify_tag(self, item: CustomListWidgetItem, new_tag: str):
+        request = submit_from(self, self.executor, update_tag, tag=new_tag, id_=item.id)
+        request.finished.connect(lambda _: item.setText(new_tag))
 
     def open_add_tag(self, category: str):
         """Ouvre la fenêtre de saisi utilisateur pour ajouter un tag."""
@@ -180,7 +183,11 @@ class Tag(QWidget):
         self.new_tag.show()
 
     def add_tag(self, category: str, new_tag: str):
-        id_ = add_tag(tag=new_tag, category=category)
+        request = submit_from(self, self.executor, add_tag, tag=new_tag, category=category)
+        request.finished.connect(partial(self.append_tag, category, new_tag))
+
+    def append_tag(self, category: str, new_tag: str, id_: int):
+        """Ajoute à la liste de sa catégorie le tag enregistré par add_tag."""
         lw_item = CustomListWidgetItem(item=new_tag, idx=id_)
         list_widget: QListWidget = self.findChild(QListWidget, category)
         list_widget.addItem(lw_item)
@@ -192,7 +199,11 @@ class Tag(QWidget):
             return
 
         item = widget.currentItem()
-        if not del_tag_by_id(item.id, category):
+        request = submit_from(self, self.executor, del_tag_by_id, item.id, category)
+        request.finished.connect(partial(self.end_del_tag, widget, item))
+
+    def end_del_tag(self, widget: QListWidget, item: CustomListWidgetItem, deleted: bool):
+        if not deleted:
             msg = QMessageBox(self)
             msg.setWindowTitle("Suppression impossible")
             msg.setText(f"Le tag {item.text()} ne peut pas être supprimé tant qu'il est associé "
@@ -202,7 +213,6 @@ class Tag(QWidget):
 
         widget.takeItem(widget.row(item))
 
-
 if __name__ == '__main__':
     import sys
     from PySide6.QtWidgets import QApplication
@@ -0,0 +1,91 @@
+"""Module gérant les thèmes de l'application.
+Les deux feuilles de style sont lues et préparées une seule fois, au premier besoin :
+changer de thème n'accède ni au disque ni à la base de données."""
+
+import re
+from time import perf_counter
+from typing import Callable
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+
+from crm.api.utils import RESOURCE_DIR, get_dark_style_sheet, get_light_style_sheet, settings
+
+THEMES = {
+    "light": get_light_style_sheet,
+    "dark": get_dark_style_sheet,
+}
+DEFAULT_THEME = "dark"
+
+COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE = re.compile(r"\s+")
+PUNCTUATION_SPACES = re.compile(r"\s*([{};,>])\s*")
+# Un espace avant ':' sépare deux sélecteurs (QWidget :hover) : seul l'espace qui suit est retiré
+COLON_SPACES = re.compile(r":\s+")
+RESOURCE_URL = re.compile(r"url\((['\"]?)resource/")
+
+
+def preprocess_style_sheet(style: str) -> str:
+    """Retire les commentaires et les espaces inutiles d'une feuille de style, et remplace
+    les chemins 'resource/...' par des chemins absolus : les images sont trouvées quel que soit
+    le répertoire de lancement de l'application."""
+    style = COMMENT.sub("", style)
+    style = WHITESPACE.sub(" ", style)
+    style = PUNCTUATION_SPACES.sub(r"\1", style)
+    style = COLON_SPACES.sub(":", style)
+    return RESOURCE_URL.sub(lambda match: f"url({match.group(1)}{RESOURCE_DIR.as_posix()}/", style).strip()
+
+
+class ThemeEngine:
+    """Feuilles de style préparées, par thème.
+    on_switch, s'il est renseigné, reçoit après chaque changement de thème le nom du thème,
+    la durée de l'application de la feuille de style (les widgets sont repolis à ce moment)
+    et la durée totale jusqu'à ce que les événements en attente, dont l'affichage, soient traités."""
+    def __init__(self):
+        self.style_sheets: dict[str, str] = {}
+        self.current: str | None = None
+        self.on_switch: Callable[[str, float, float], None] | None = None
+        self.metrics = {"switches": 0, "last_apply_ms": 0.0, "last_total_ms": 0.0}
+
+    def preload(self):
+        """Lit et prépare toutes les feuilles de style."""
+        for theme in THEMES:
+            self.style_sheet(theme)
+
+    def style_sheet(self, theme: str) -> str:
+        if theme not in THEMES:
+            theme = DEFAULT_THEME
+        if theme not in self.style_sheets:
+            self.style_sheets[theme] = preprocess_style_sheet(THEMES[theme]())
+        return self.style_sheets[theme]
+
+    def saved_theme(self) -> str:
+        """Thème enregistré dans le paramétrage."""
+        theme = settings.get("theme")
+        return theme if theme in THEMES else DEFAULT_THEME
+
+    def apply(self, app: QApplication, theme: str) -> bool:
+        """Applique le thème s'il n'est pas déjà actif. Retourne True s'il a changé."""
+        if theme not in THEMES:
+            theme = DEFAULT_THEME
+        if theme == self.current:
+            return False
+
+        style = self.style_sheet(theme)
+        start = perf_counter()
+        app.setStyleSheet(style)
+        applied = perf_counter()
+        self.current = theme
+        self.metrics["switches"] += 1
+        self.metrics["last_apply_ms"] = (applied - start) * 1000
+        # Exécuté une fois traités les événements déjà en attente, dont le réaffichage des widgets
+        QTimer.singleShot(0, lambda: self.report(theme, applied - start, perf_counter() - start))
+        return True
+
+    def report(self, theme: str, apply_duration: float, total_duration: float):
+        self.metrics["last_total_ms"] = total_duration * 1000
+        if self.on_switch:
+            self.on_switch(theme, apply_duration, total_duration)
+
+
+theme_engine = ThemeEngine()
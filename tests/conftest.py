@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from crm.benchmark.dataset import generate_database
+from crm.database.connection import connection_manager
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Base de 500 contacts générée pour le test, utilisée par le client le temps du test."""
+    previous_database = connection_manager.database
+    path = tmp_path / "test.sqlite3"
+    generate_database(path, 500)
+    yield path
+    connection_manager.open(previous_database)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    widgets = pytest.importorskip("PySide6.QtWidgets")
+    return widgets.QApplication.instance() or widgets.QApplication([])
@@ -0,0 +1,24 @@
+from crm.database import client
+from crm.database.connection import connection_manager
+from crm.database.events import change_bus
+
+CONTACT = {"birthday": "2000-01-01", "company": "", "job": ""}
+
+
+def test_bulk_insert_returns_the_ids_assigned_by_sqlite(database):
+    # Au plus grand id possible, sqlite attribue les id suivants au hasard parmi les id libres
+    with connection_manager.transaction() as c:
+        c.execute("INSERT INTO contact (id, firstname, lastname) VALUES (9223372036854775807, 'max', '')")
+    names = ["un", "deux", "trois"]
+    ids = client.add_contacts_bulk({"firstname": name, "lastname": "", **CONTACT} for name in names)
+    assert [client.load_contact_bundle(id_).firstname for id_ in ids] == names
+
+
+def test_empty_bulk_insert_is_not_published(database):
+    changes = []
+    unsubscribe = change_bus.subscribe(changes.append)
+    try:
+        assert client.add_contacts_bulk([]) == []
+    finally:
+        unsubscribe()
+    assert changes == []
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from crm.database.connection import connection_manager
+
+
+def test_close_all_is_refused_while_another_thread_is_in_a_transaction(database):
+    started, release = threading.Event(), threading.Event()
+    connections = []
+
+    def worker():
+        with connection_manager.transaction() as c:
+            connections.append(connection_manager.connection())
+            started.set()
+            release.wait(5)
+            c.execute("UPDATE contact SET job = 'x' WHERE id = 1")
+            connections.append(connection_manager.connection())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait(5)
+    with pytest.raises(RuntimeError):
+        connection_manager.close_all()
+    release.set()
+    thread.join()
+
+    assert connections[0] is connections[1]
+    assert connection_manager.connection().execute("SELECT job FROM contact WHERE id = 1").fetchone() == ("x",)
+    connection_manager.close_all()
+
+
+def test_threads_reopen_their_connection_after_close_all(database):
+    before = connection_manager.connection()
+    connection_manager.close_all()
+    after = connection_manager.connection()
+    assert after is not before
+    assert after.execute("SELECT COUNT(*) FROM contact").fetchone()[0] == 500
@@ -0,0 +1,30 @@
+import sqlite3
+import threading
+
+from crm.database import client
+from crm.database.connection import connection_manager
+
+CONTACT = {"firstname": "Bench", "lastname": "MARK", "birthday": "2000-01-01", "company": "", "job": ""}
+
+
+def hold_write_lock(path, seconds: float) -> threading.Timer:
+    """Prend le verrou d'écriture depuis une autre connexion et le libère après seconds."""
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(seconds, lambda: (other.execute("COMMIT"), other.close()))
+    release.start()
+    return release
+
+
+def test_bulk_insert_from_a_generator_survives_a_busy_retry(database):
+    connection_manager.connection().execute("PRAGMA busy_timeout = 0")
+    retries = connection_manager.metrics["busy_retries"]
+    before = client.count_contacts()
+
+    release = hold_write_lock(database, 0.2)
+    ids = client.add_contacts_bulk(dict(CONTACT) for _ in range(10))
+    release.join()
+
+    assert connection_manager.metrics["busy_retries"] > retries
+    assert len(ids) == 10
+    assert client.count_contacts() == before + 10
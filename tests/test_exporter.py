@@ -0,0 +1,31 @@
+import csv
+import sqlite3
+
+import pytest
+
+from crm.api.exporter import export_file, write_csv
+from crm.database import client
+from crm.database.cache import tag_cache
+
+
+def test_csv_columns_include_tags_added_by_another_process(database, tmp_path):
+    tag_cache.category("phone")
+    conn = sqlite3.connect(database)
+    with conn:
+        id_tag = conn.execute("INSERT INTO tag (tag, category) VALUES ('Externe', 'phone')").lastrowid
+        conn.execute("INSERT INTO phone (number, contact_id, tag_id) VALUES ('0102030405', 1, ?)", (id_tag,))
+    conn.close()
+
+    path = tmp_path / "contacts.csv"
+    export_file(path)
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 500
+    assert "0102030405" in [row["phone:Externe"] for row in rows]
+
+
+def test_csv_rejects_a_tag_without_column(database, tmp_path):
+    bundle = client.load_contact_bundle(1)._replace(phones=((1, "Inconnu", "0102030405"),))
+    with open(tmp_path / "contacts.csv", "w", encoding="utf-8", newline="") as f:
+        with pytest.raises(ValueError):
+            list(write_csv([bundle], f))
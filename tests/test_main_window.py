@@ -0,0 +1,93 @@
+import sqlite3
+from time import monotonic
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from crm.database import client
+
+
+@pytest.fixture
+def window(database, qapp):
+    from crm.window.main_window import Crm
+
+    crm = Crm(qapp)
+    crm.show()
+    qapp.processEvents()
+    yield crm
+    crm.close()
+    qapp.processEvents()
+
+
+def select_row(window, qapp, row: int) -> int:
+    window.tv_contact.setCurrentIndex(window.model_contact.index(row, 1))
+    qapp.processEvents()
+    return window.id_contact
+
+
+def current_id(window) -> int:
+    current = window.tv_contact.currentIndex()
+    return current.sibling(current.row(), 0).data()
+
+
+def test_selected_contact_stays_selected_when_its_sort_position_changes(window, qapp):
+    selected = select_row(window, qapp, 3)
+    client.update_contact(firstname="Zzz", lastname="ZZZ", birthday="2000-01-01", company="", job="",
+                          id_contact=selected)
+    qapp.processEvents()
+    assert window.id_contact == selected
+    assert current_id(window) == selected
+    current = window.tv_contact.currentIndex()
+    assert current.sibling(current.row(), 1).data() == "Zzz"
+
+
+def test_selected_contact_is_patched_in_place(window, qapp):
+    selected = select_row(window, qapp, 3)
+    firstname = window.model_contact.index(3, 1).data()
+    client.update_contact(firstname=firstname, lastname="PATCHED", birthday="2000-01-01", company="", job="",
+                          id_contact=selected)
+    qapp.processEvents()
+    assert window.id_contact == selected
+    assert current_id(window) == selected
+
+
+def test_detail_dialogs_are_built_on_first_use(window, qapp):
+    assert window.dialog_pool.metrics == {"built": 0, "reused": 0}
+    select_row(window, qapp, 0)
+    window.open_details_contact("modify", window.tv_contact.currentIndex())
+    window.dialog_pool.get("contact").close()
+    window.open_details_contact("modify", window.tv_contact.currentIndex())
+    assert window.dialog_pool.metrics == {"built": 1, "reused": 1}
+
+
+def test_external_change_is_polled_on_the_executor(window, qapp, database):
+    id_contact = window.model_contact.index(0, 0).data()
+    conn = sqlite3.connect(database)
+    with conn:
+        conn.execute("UPDATE contact SET lastname = 'EXTERNE' WHERE id = ?", (id_contact,))
+    conn.close()
+
+    window.poll_changes()
+    assert window.watch_request is not None
+    deadline = monotonic() + 5
+    while window.watch_request is not None and monotonic() < deadline:
+        qapp.processEvents()
+    assert window.model_contact.index(0, 2).data() == "EXTERNE"
+
+
+def test_detail_dialog_saves_on_the_executor(window, qapp):
+    selected = select_row(window, qapp, 0)
+    window.open_details_contact("modify", window.tv_contact.currentIndex())
+    dialog = window.dialog_pool.get("contact")
+    dialog.le_lastname.setText("enregistre")
+    # Format d'affichage de la locale française, attendu par save_changes
+    dialog.date_birthday.setDisplayFormat("dd/MM/yyyy")
+    dialog.save_changes()
+    assert not dialog.isEnabled()
+    deadline = monotonic() + 5
+    while dialog.isVisible() and monotonic() < deadline:
+        qapp.processEvents()
+    assert not dialog.isVisible()
+    assert dialog.isEnabled()
+    assert client.load_contact_bundle(selected).lastname == "ENREGISTRE"
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from crm.database.client import add_contact, get_contact_page, search_contacts, update_contact
+from crm.database.events import UPDATE, Change
+from crm.window.search import find_contacts
+from crm.window import table_model
+from crm.window.table_model import MAX_CACHED_PAGES, MAX_FILTER_IDS, PAGE_SIZE, ContactTableModel
+
+
+def test_find_contacts_keeps_documents_of_a_single_page(database):
+    ids, documents = find_contacts("docstring.fr")
+    assert documents is not None
+    assert len(documents) <= PAGE_SIZE
+    assert ids == [id_ for id_, _ in documents]
+
+
+def test_find_contacts_drops_documents_beyond_a_page(database):
+    ids, documents = find_contacts("@")
+    assert documents is None
+    assert len(ids) > PAGE_SIZE
+    assert ids == search_contacts("@", limit=MAX_FILTER_IDS)
+
+
+def test_filter_is_capped(database, qapp):
+    model = ContactTableModel()
+    model.set_filter(list(range(1, MAX_FILTER_IDS + 100)))
+    assert model.rowCount() <= MAX_FILTER_IDS
+    model.set_filter(None)
+    assert model.rowCount() == 500
+
+
+def test_short_query_matches_wildcards_literally(database):
+    assert search_contacts("%") == []
+    assert search_contacts("_") == []
+    id_contact = add_contact(firstname="A_b", lastname="", birthday="2000-01-01", company="", job="")
+    assert search_contacts("_") == [id_contact]
+
+
+def test_boundaries_are_evicted_with_their_pages(database, qapp, monkeypatch):
+    monkeypatch.setattr(table_model, "PAGE_SIZE", 10)
+    model = ContactTableModel()
+    first_page = model.page(0)
+    for number in range(50):
+        model.page(number)
+    assert len(model.boundaries) <= MAX_CACHED_PAGES
+    assert set(model.boundaries) <= set(model.pages)
+    # La page oubliée est relue par décalage
+    assert model.page(0) == first_page
+
+
+def test_filter_is_read_from_any_thread(database, qapp):
+    model = ContactTableModel()
+    model.set_filter(search_contacts("@")[:20])
+    pages = []
+    thread = threading.Thread(target=lambda: pages.append(get_contact_page(1, False, PAGE_SIZE,
+                                                                           ids=model.filter_ids)))
+    thread.start()
+    thread.join()
+    assert model.rowCount() == 20
+    assert pages == [model.page(0)]
+
+
+def test_unread_contact_moved_by_an_update_is_shown_at_its_new_position(database, qapp, monkeypatch):
+    monkeypatch.setattr(table_model, "PAGE_SIZE", 10)
+    model = ContactTableModel()
+    model.page(0)
+    model.page(1)
+    id_contact = model.page(4)[5][0]
+    model.pages.pop(4)
+    update_contact(firstname="", lastname="", birthday="2000-01-01", company="", job="", id_contact=id_contact)
+    assert model.apply_change(Change("contact", id_contact, UPDATE, id_contact)) == 0
+    assert model.page(0)[0][0] == id_contact
+    assert id_contact not in [values[0] for values in model.page(4)]
@@ -0,0 +1,26 @@
+import json
+
+from crm.api.settings import SettingsService
+
+
+def test_ensure_file_writes_defaults(tmp_path):
+    path = tmp_path / "settings.json"
+    SettingsService(path, {"theme": "dark"}).ensure_file()
+    assert json.loads(path.read_text()) == {"theme": "dark"}
+
+
+def test_ensure_file_keeps_existing_settings(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"theme": "light"}))
+    SettingsService(path, {"theme": "dark"}).ensure_file()
+    assert json.loads(path.read_text()) == {"theme": "light"}
+
+
+def test_partial_section_keeps_its_defaults(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"storage": {"cache_size": -2000}}))
+    service = SettingsService(path, {"theme": "dark", "storage": {"cache_size": -16000, "temp_store": "MEMORY"}})
+    assert service.get("storage") == {"cache_size": -2000, "temp_store": "MEMORY"}
+    service.ensure_file()
+    assert json.loads(path.read_text()) == {"storage": {"cache_size": -2000, "temp_store": "MEMORY"},
+                                            "theme": "dark"}
@@ -0,0 +1,60 @@
+import sqlite3
+import threading
+
+import pytest
+
+from crm.database import client
+from crm.database.events import DELETE, INSERT, UPDATE, Change
+from crm.database.watcher import change_watcher, prune_change_journal
+
+
+@pytest.fixture
+def external(database):
+    """Connexion d'un autre processus (CLI, sqlite3...) et watcher positionné en fin de journal."""
+    change_watcher.reset()
+    conn = sqlite3.connect(database, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def test_local_changes_are_not_published_twice(external):
+    id_contact = client.add_contact(firstname="a", lastname="b", birthday="", company="", job="")
+    thread = threading.Thread(target=client.add_phone, kwargs={"number": "1", "contact_id": id_contact, "tag_id": 3})
+    thread.start()
+    thread.join()
+    assert change_watcher.poll() == []
+
+
+def test_external_changes_are_published(external):
+    external.execute("UPDATE contact SET firstname = 'x' WHERE id = 5")
+    external.execute("DELETE FROM mail WHERE id = 3")
+    assert change_watcher.poll() == [Change("contact", 5, UPDATE, 5), Change("mail", 3, DELETE, 3)]
+
+
+def test_external_change_followed_by_a_local_write_is_published(external):
+    external.execute("UPDATE contact SET firstname = 'x' WHERE id = 5")
+    client.add_phone(number="1", contact_id=7, tag_id=3)
+    assert change_watcher.poll() == [Change("contact", 5, UPDATE, 5)]
+
+
+def test_external_change_read_from_another_thread(external):
+    external.execute("INSERT INTO phone (number, contact_id, tag_id) VALUES ('2', 7, 3)")
+    changes = []
+    thread = threading.Thread(target=lambda: changes.extend(change_watcher.read()))
+    thread.start()
+    thread.join()
+    assert [(change.entity, change.operation, change.contact_id) for change in changes] == [("phone", INSERT, 7)]
+    assert change_watcher.poll() == []
+
+
+def test_many_changes_are_collapsed(external):
+    external.execute("UPDATE phone SET number = '3'")
+    assert change_watcher.poll() == [Change("phone", None, UPDATE)]
+
+
+def test_pruned_changes_trigger_a_full_refresh(external):
+    external.execute("UPDATE contact SET firstname = 'x' WHERE id = 5")
+    external.execute("UPDATE contact SET firstname = 'y' WHERE id = 6")
+    prune_change_journal(keep=0)
+    external.execute("UPDATE contact SET firstname = 'z' WHERE id = 7")
+    assert Change("contact", None, UPDATE) in change_watcher.poll()